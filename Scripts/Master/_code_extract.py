@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+_code_extract.py
+- Ekstraksi kode master dari file .txt order (dipakai wisuda, manasik, pasfoto).
+- Pola per produk dikompilasi sekali (PFM/PFB, WSD, MSK, 10RP/8R, prefix umum); setiap file
+  dibaca sekali dan teks upper() dihitung sekali, bukan per angka yang ketemu.
+- Hasil per file disimpan di cache persisten (key: path + size + mtime), sehingga order file
+  di share hanya di-parse ulang kalau berubah. Beberapa skrip bisa jalan bersamaan: save()
+  membaca ulang cache di disk dan menggabungkannya, jadi entry proses lain tidak tertimpa.
+"""
+
+import atexit
+import json
+import os
+import re
+import sys
+import time
+
+# Naikkan jika pola/logika berubah supaya cache lama otomatis diabaikan
+ENGINE_VERSION = 1
+MAX_CACHE_ENTRIES = 20000
+
+CACHE_FILE = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"),
+    "BMachine", "cache", "code_extract_cache.json",
+)
+
+# ---------- Pola (dikompilasi sekali) ----------
+_CODE = r'\d{1,3}(?:\s*[A-Za-z])?'
+
+# WSD: WSD-006 B | 10RP 006 | KRA_001 | 013 B (fallback umum)
+WSD_CODE = re.compile(r'WSD[\s-]*(' + _CODE + r')\b', re.IGNORECASE)
+TYPE_CODE = re.compile(r'(?:10RP|8R)[\s-]*(' + _CODE + r')\b', re.IGNORECASE)
+PREFIX_CODE = re.compile(r'\b[A-Za-z]+[\s_-]+(' + _CODE + r')\b', re.IGNORECASE)
+GENERIC_CODE = re.compile(r'\b(' + _CODE + r')\b')
+
+# MSK: MSK-012 | 8R 012 | angka 1-3 digit yang berdiri sendiri
+MSK_NUM = re.compile(r'MSK[\s-]*(\d{1,3})', re.IGNORECASE)
+TYPE_NUM = re.compile(r'(?:10RP|8R)[\s-]*(\d{1,3})', re.IGNORECASE)
+RAW_NUM = re.compile(r'(?<!\d)(\d{1,3})(?!\d)')
+
+# Pas foto: PFM-06 / PFB 6
+PF_CODE = re.compile(r'PF[MB][\s-]*\d+', re.IGNORECASE)
+_PF_SEPARATORS = re.compile(r'[\s\-]+')
+_LEADING_DIGITS = re.compile(r'\d+')
+
+
+# ---------- Ekstraktor murni (tanpa I/O) ----------
+def extract_wsd(search_text):
+    """Return dict kode -> high_priority untuk satu teks (nama file + isi)."""
+    upper = search_text.upper()
+    has_10rp = '10RP' in upper
+    has_8r = '8R' in upper
+    found = {}
+    for pattern in (WSD_CODE, TYPE_CODE, PREFIX_CODE):
+        for val in pattern.findall(search_text):
+            found[val.strip().upper()] = True
+    for val in GENERIC_CODE.findall(search_text):
+        num_val = int(_LEADING_DIGITS.match(val).group(0))
+        if num_val == 10 and has_10rp:
+            continue
+        if num_val == 8 and has_8r:
+            continue
+        # Angka dengan suffix (misal "02 B") = high priority, angka polos = low priority
+        key = val.strip().upper()
+        found[key] = found.get(key, False) or any(c.isalpha() for c in val)
+    return found
+
+
+def extract_msk(search_text):
+    """Return list kode berurutan (MSK, lalu 10RP/8R, lalu angka umum), unik per teks."""
+    upper = search_text.upper()
+    has_10rp = '10RP' in upper
+    has_8r = '8R' in upper
+    nums = [n for n in RAW_NUM.findall(search_text)
+            if not (n == '8' and has_8r) and not (n == '10' and has_10rp)]
+    out, seen = [], set()
+    for x in MSK_NUM.findall(search_text) + TYPE_NUM.findall(search_text) + nums:
+        if x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+
+def extract_pf(content, filename):
+    """Return [layer_code, show_ribbon] dari isi .txt (fallback: nama file)."""
+    match = PF_CODE.search(content) or PF_CODE.search(filename)
+    # Normalisasi: "PFM 06" / "PFM-06" -> "PFM06"
+    layer_code = _PF_SEPARATORS.sub('', match.group(0)).upper() if match else None
+    show_ribbon = "pakai nama sekolah" in (content + " " + filename).lower()
+    return [layer_code, show_ribbon]
+
+
+_KINDS = {
+    'wsd': lambda content, filename: extract_wsd(f"{filename}\n{content}"),
+    'msk': lambda content, filename: extract_msk(f"{filename}\n{content}"),
+    'pf': extract_pf,
+}
+
+
+# ---------- Cache persisten ----------
+class CodeExtractor:
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self._entries = None
+        self._touched = set()   # key yang ditulis/diperbarui proses ini (menang saat merge)
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _read_disk(self):
+        """Entry cache di disk untuk ENGINE_VERSION ini ({} jika tidak ada/rusak/versi lain)."""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == ENGINE_VERSION:
+                return data.get("entries") or {}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARNING] Cache kode .txt diabaikan: {e}", file=sys.stderr)
+        return {}
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = self._read_disk()
+
+    def extract(self, kind, path, stat=None):
+        """
+        Hasil ekstraksi `kind` ('wsd' | 'msk' | 'pf') untuk satu file .txt.
+        `stat` = (size, mtime) jika sudah ada dari scan, supaya tidak stat ulang.
+        Return None jika file tidak bisa dibaca.
+        """
+        self._load()
+        if stat is None:
+            try:
+                st = os.stat(path)
+                stat = (st.st_size, st.st_mtime)
+            except OSError:
+                return None
+        key = f"{kind}|{os.path.normcase(os.path.abspath(path))}"
+        entry = self._entries.get(key)
+        if entry and entry["size"] == stat[0] and entry["mtime"] == stat[1]:
+            self.hits += 1
+            # Tandai terakhir dipakai (untuk eviction), cukup sekali sehari supaya run ulang tidak selalu menulis cache
+            now = time.time()
+            if now - entry.get("used", 0) > 86400:
+                entry["used"] = now
+                self._touched.add(key)
+                self._dirty = True
+            return entry["result"]
+
+        try:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+        except Exception:
+            return None
+        result = _KINDS[kind](content, os.path.basename(path))
+        self.misses += 1
+        self._entries[key] = {"size": stat[0], "mtime": stat[1], "used": time.time(), "result": result}
+        self._touched.add(key)
+        self._dirty = True
+        return result
+
+    def save(self):
+        if not self._dirty or self._entries is None:
+            return
+        # Merge dengan isi disk terbaru: entry proses lain yang ditulis sejak _load() ikut disimpan,
+        # entry yang disentuh proses ini tetap menang
+        entries = dict(self._entries)
+        entries.update(self._read_disk())
+        entries.update((k, self._entries[k]) for k in self._touched)
+        if len(entries) > MAX_CACHE_ENTRIES:
+            keep = sorted(entries.items(), key=lambda kv: kv[1].get("used", 0), reverse=True)[:MAX_CACHE_ENTRIES]
+            entries = dict(keep)
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"version": ENGINE_VERSION, "entries": entries}, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+            self._entries = entries
+            self._touched.clear()
+            self._dirty = False
+        except Exception as e:
+            print(f"[WARNING] Gagal menyimpan cache kode .txt: {e}", file=sys.stderr)
+
+
+# Satu instance per proses; disimpan otomatis saat skrip selesai
+EXTRACTOR = CodeExtractor()
+atexit.register(EXTRACTOR.save)
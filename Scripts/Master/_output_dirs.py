@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+_output_dirs.py
+- Kerangka folder output bersama untuk skrip Master (pasfoto, manasik, wisuda, profesi_flat).
+- Kumpulkan semua folder tujuan dari hasil scan/plan, urutkan parent -> child,
+  lalu buat masing-masing TEPAT SEKALI (opsional paralel antar saudara satu level).
+- Folder yang sudah dibuat/diketahui ada diingat, jadi tidak ada stat/makedirs ulang dalam satu run.
+"""
+
+import os
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Jumlah thread untuk membuat folder saudara (satu level) sekaligus; 1 = berurutan.
+DEFAULT_WORKERS = 4
+
+
+class OutputDirs:
+    """
+    Registri folder output per run.
+
+    Pemakaian:
+        dirs = OutputDirs(final_output_folder)
+        dirs.add(path_a); dirs.add(path_b)   # plan
+        dirs.materialize()                   # buat sekaligus
+        dirs.ensure(path_c)                  # on-demand, no-op jika sudah diketahui
+    """
+
+    def __init__(self, root, max_workers=DEFAULT_WORKERS):
+        self.root = os.path.normpath(root)
+        self.max_workers = max(1, int(max_workers or 1))
+        self.created = 0
+        self._known = set()
+        self._planned = set()
+        self._fresh = set()
+
+    def _is_under_root(self, path):
+        return path == self.root or path.startswith(self.root.rstrip(os.sep) + os.sep)
+
+    def add(self, path):
+        """Daftarkan folder (beserta parent-nya sampai root) untuk dibuat saat materialize()."""
+        path = os.path.normpath(path)
+        while path not in self._known and path not in self._planned:
+            self._planned.add(path)
+            parent = os.path.dirname(path)
+            if path == self.root or parent == path or not self._is_under_root(parent):
+                break
+            path = parent
+        return path
+
+    def add_many(self, paths):
+        for p in paths:
+            self.add(p)
+
+    def is_known(self, path):
+        return os.path.normpath(path) in self._known
+
+    def is_fresh(self, path):
+        """True jika folder baru dibuat di run ini (pasti kosong sebelumnya, tak perlu di-list)."""
+        return os.path.normpath(path) in self._fresh
+
+    def _mkdir(self, path):
+        # Parent sudah dibuat di level sebelumnya, jadi cukup satu os.mkdir (tanpa stat dulu).
+        try:
+            os.mkdir(path)
+            return True
+        except FileExistsError:
+            return False
+        except FileNotFoundError:
+            # Parent di luar root (mis. root sendiri belum ada) -> buat rantai lengkap.
+            os.makedirs(path, exist_ok=True)
+            return True
+
+    def _mkdir_safe(self, path):
+        try:
+            return self._mkdir(path), None
+        except OSError as e:
+            return False, e
+
+    def materialize(self, strict=False):
+        """
+        Buat semua folder yang di-plan, urut per kedalaman (parent selalu lebih dulu).
+        Default best-effort: folder yang gagal hanya di-warning. strict=True -> OSError pertama
+        di-raise (dipakai ensure()).
+        """
+        pending = self._planned - self._known
+        self._planned.clear()
+        if not pending:
+            return 0
+
+        levels = defaultdict(list)
+        for p in pending:
+            levels[p.count(os.sep)].append(p)
+
+        created = 0
+        pool = None
+        try:
+            for depth in sorted(levels):
+                batch = sorted(levels[depth])
+                if self.max_workers > 1 and len(batch) > 1:
+                    if pool is None:
+                        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+                    results = list(pool.map(self._mkdir_safe, batch))
+                else:
+                    results = [self._mkdir_safe(p) for p in batch]
+
+                for path, (made, err) in zip(batch, results):
+                    if err is not None:
+                        if strict:
+                            raise err
+                        print(f"[WARNING] Gagal membuat folder '{path}': {err}", file=sys.stderr)
+                        continue
+                    self._known.add(path)
+                    if made:
+                        self._fresh.add(path)
+                        created += 1
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+        self.created += created
+        return created
+
+    def ensure(self, path):
+        """
+        Pastikan satu folder ada; hanya menyentuh filesystem jika belum pernah diketahui.
+        Gagal membuat folder -> OSError (sama seperti os.makedirs), bukan warning.
+        """
+        path = os.path.normpath(path)
+        if path not in self._known:
+            self.add(path)
+            self.materialize(strict=True)
+        return path
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+"""
+_pipeline.py
+- Pipeline bertahap scan -> resolve -> copy untuk skrip Master (wisuda, manasik, pasfoto, profesi_flat).
+- Scanner (1 thread) me-list folder, resolver (1 thread) memetakan isi folder ke master + file tujuan,
+  writer pool (N thread) menyalin. Copy sudah berjalan selagi tree masih di-list, jadi latency share
+  tertutup dan output pertama muncul lebih cepat di event besar.
+- Antar tahap memakai antrean terbatas (bounded queue): scanner tidak lari jauh di depan writer.
+- Semua print terjadi di thread pemanggil (lewat event), jadi baris log tidak pernah tercampur.
+- Begitu satu folder output lengkap, dicetak `FOLDER_READY:{json}` (path, jumlah, bytes) supaya
+  BMachine bisa memberi tahu editor tanpa menunggu "--- Proses Selesai ---".
+  Di akhir run dicetak `BENCHMARK_JSON:{json}` termasuk waktu sampai folder pertama siap.
+
+Env:
+  BMACHINE_COPY_WORKERS=N        -> jumlah thread writer (default 4)
+  BMACHINE_FOLDER_ORDER=natural  -> urutan proses folder: natural (default) | kelas | listing
+"""
+
+import json
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+
+DEFAULT_WRITERS = 4
+DEFAULT_QUEUE_SIZE = 64
+
+# Hasil writer per job (selain exception)
+COPIED = "copied"
+SKIPPED = "skipped"
+
+_DONE = object()
+
+# Titik nol benchmark: modul ini di-import di awal skrip, jadi ~ waktu skrip mulai
+PROCESS_START = time.perf_counter()
+
+# Folder kelas/grup didahulukan pada mode "kelas"
+_KELAS_PREFIX = re.compile(r'^(?:KELAS|KLS|GROUP|KELOMPOK)\b', re.IGNORECASE)
+
+
+def _env_workers():
+    try:
+        return max(1, int(os.environ.get("BMACHINE_COPY_WORKERS", "")))
+    except ValueError:
+        return DEFAULT_WRITERS
+
+
+def _natural_key(name):
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r'([0-9]+)', name)]
+
+
+def folder_priority_key(mode=None):
+    """
+    Key sort nama folder sesuai BMACHINE_FOLDER_ORDER (atau `mode`).
+    Return None untuk "listing" (urutan asli dari filesystem).
+    """
+    mode = (mode or os.environ.get("BMACHINE_FOLDER_ORDER") or "natural").strip().lower()
+    if mode == "listing":
+        return None
+    if mode == "kelas":
+        return lambda name: (0 if _KELAS_PREFIX.match(name) else 1, _natural_key(name))
+    return _natural_key
+
+
+class CopyJob:
+    """Satu file yang akan disalin. `tag` bebas diisi skrip pemanggil (untuk print/summary)."""
+
+    __slots__ = ("src", "dst", "check_exists", "tag", "bytes")
+
+    def __init__(self, src, dst, check_exists=True, tag=None):
+        self.src = src
+        self.dst = dst
+        # False jika folder tujuan baru dibuat di run ini (pasti kosong, tak perlu stat)
+        self.check_exists = check_exists
+        self.tag = tag
+        self.bytes = 0  # diisi writer setelah berhasil disalin
+
+
+def copy_if_missing(job):
+    """Writer default: salin master ke tujuan, lewati jika tujuan sudah ada."""
+    if job.check_exists and os.path.exists(job.dst):
+        return SKIPPED
+    shutil.copy2(job.src, job.dst)
+    job.bytes = os.path.getsize(job.dst)
+    return COPIED
+
+
+class FolderStats:
+    """Rekap job satu item (folder sumber) atau satu folder output di pipeline."""
+
+    def __init__(self, item, total=0):
+        self.item = item
+        self.total = total
+        self.pending = total
+        self.copied = 0
+        self.skipped = 0
+        self.errors = 0
+        self.bytes = 0
+
+    def add_result(self, job, result):
+        if isinstance(result, Exception):
+            self.errors += 1
+        elif result == COPIED:
+            self.copied += 1
+            self.bytes += job.bytes
+        else:
+            self.skipped += 1
+        self.pending -= 1
+
+
+class CopyPipeline:
+    """
+    Pemakaian:
+        pipe = CopyPipeline(resolve)
+        for event in pipe.run(scan.walk(path)):
+            if event[0] == "resolved": _, item, jobs = event
+            elif event[0] == "written": _, job, result = event   # COPIED | SKIPPED | Exception
+            elif event[0] == "done": _, item, stats = event      # semua job item ini selesai
+            elif event[0] == "ready": _, out_dir, stats = event  # folder output lengkap
+        pipe.print_benchmark()
+
+    `resolve(item, log)` jalan di thread resolver dan mengembalikan list CopyJob untuk item itu;
+    pesan dikirim lewat `log(msg, err=False, end="\\n")` supaya dicetak di thread pemanggil.
+    Event "resolved" satu item selalu keluar sebelum event "written" job-job miliknya,
+    dan "done" keluar tepat sekali per item setelah job terakhirnya selesai.
+
+    Folder output (dirname dari job.dst) dianggap lengkap ("ready") jika semua job-nya selesai
+    DAN tidak ada item berikutnya yang bisa menulis ke sana:
+    - tanpa `scope`: langsung setelah item yang menulis ke sana selesai di-resolve (folder sumber
+      -> folder output 1:1, seperti wisuda/manasik/pasfoto);
+    - dengan `scope(item) -> (source_root, scope_root)`: setelah walk (top-down, DFS) keluar dari
+      subtree `scope_root` (untuk struktur yang di-flatten seperti profesi_flat).
+    """
+
+    def __init__(self, resolve, write=copy_if_missing, writers=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 scope=None):
+        self.resolve = resolve
+        self.write = write
+        self.writers = max(1, int(writers or _env_workers()))
+        self.queue_size = max(1, int(queue_size))
+        self.scope = scope
+        self.first_ready = None   # detik sejak PROCESS_START
+        self.folders_ready = 0
+        self.copied = 0
+        self.bytes = 0
+
+    def _emit_ready(self, out_dir, stats):
+        elapsed = time.perf_counter() - PROCESS_START
+        if self.first_ready is None:
+            self.first_ready = elapsed
+        self.folders_ready += 1
+        self.copied += stats.copied
+        self.bytes += stats.bytes
+        payload = {
+            "path": out_dir, "copied": stats.copied, "skipped": stats.skipped,
+            "errors": stats.errors, "bytes": stats.bytes, "t": round(elapsed, 3),
+        }
+        print(f"FOLDER_READY:{json.dumps(payload, ensure_ascii=False)}", flush=True)
+
+    def print_benchmark(self):
+        total = time.perf_counter() - PROCESS_START
+        payload = {
+            "total_s": round(total, 3),
+            "first_ready_s": round(self.first_ready, 3) if self.first_ready is not None else None,
+            "folders_ready": self.folders_ready,
+            "copied": self.copied,
+            "bytes": self.bytes,
+            "writers": self.writers,
+        }
+        print(f"BENCHMARK_JSON:{json.dumps(payload)}", flush=True)
+
+    def run(self, items):
+        scan_q = queue.Queue(maxsize=self.queue_size)
+        write_q = queue.Queue(maxsize=self.queue_size)
+        events = queue.Queue()
+        stop = threading.Event()
+
+        def put(q, item):
+            # Put yang tetap bisa dibatalkan saat pemanggil berhenti di tengah jalan
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def log(msg, err=False, end="\n"):
+            events.put(("log", msg, err, end))
+
+        def scanner():
+            try:
+                for item in items:
+                    if not put(scan_q, item):
+                        return
+            except Exception as e:
+                log(f"[ERROR] Gagal scan folder: {e}", err=True)
+            finally:
+                put(scan_q, _DONE)
+
+        def under(path, root):
+            return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+        def resolver():
+            claimed = set()
+            open_scopes = {}  # scope_root -> set folder output
+            try:
+                while True:
+                    item = get(scan_q)
+                    if item is _DONE:
+                        return
+                    source_root = scope_root = None
+                    if self.scope:
+                        source_root, scope_root = (os.path.normpath(p) for p in self.scope(item))
+                        # Walk DFS: scope yang bukan leluhur item ini sudah selesai semua
+                        for root in [r for r in open_scopes if not under(source_root, r)]:
+                            events.put(("sealed", open_scopes.pop(root)))
+                    try:
+                        jobs = list(self.resolve(item, log) or [])
+                    except Exception as e:
+                        log(f"[ERROR] Gagal memproses folder: {e}", err=True)
+                        continue
+                    events.put(("resolved", item, jobs))
+                    out_dirs = {os.path.dirname(job.dst) for job in jobs}
+                    if scope_root is not None:
+                        open_scopes.setdefault(scope_root, set()).update(out_dirs)
+                    elif out_dirs:
+                        events.put(("sealed", out_dirs))
+                    for job in jobs:
+                        key = os.path.normcase(job.dst)
+                        if key in claimed:
+                            # Tujuan sama dalam satu run: yang pertama menang (sama seperti urutan lama)
+                            events.put(("written", job, SKIPPED))
+                            continue
+                        claimed.add(key)
+                        if not put(write_q, job):
+                            return
+            finally:
+                for dirs in open_scopes.values():
+                    events.put(("sealed", dirs))
+                for _ in range(self.writers):
+                    put(write_q, _DONE)
+
+        def writer():
+            try:
+                while True:
+                    job = get(write_q)
+                    if job is _DONE:
+                        return
+                    try:
+                        result = self.write(job)
+                    except Exception as e:
+                        result = e
+                    events.put(("written", job, result))
+            finally:
+                events.put(("writer_done",))
+
+        threads = [threading.Thread(target=scanner, daemon=True),
+                   threading.Thread(target=resolver, daemon=True)]
+        threads += [threading.Thread(target=writer, daemon=True) for _ in range(self.writers)]
+        for t in threads:
+            t.start()
+
+        owners = {}      # id(job) -> FolderStats item
+        dir_stats = {}   # folder output -> FolderStats
+        sealed = set()
+
+        def ready(out_dir):
+            stats = dir_stats.pop(out_dir)
+            sealed.discard(out_dir)
+            self._emit_ready(out_dir, stats)
+            return ("ready", out_dir, stats)
+
+        def dispatch(event):
+            kind = event[0]
+            if kind == "log":
+                print(event[1], file=sys.stderr if event[2] else sys.stdout, end=event[3], flush=True)
+            elif kind == "resolved":
+                stats = FolderStats(event[1], len(event[2]))
+                for job in event[2]:
+                    owners[id(job)] = stats
+                    d = dir_stats.setdefault(os.path.dirname(job.dst), FolderStats(os.path.dirname(job.dst)))
+                    d.total += 1
+                    d.pending += 1
+                yield event
+                if not stats.pending:
+                    yield ("done", stats.item, stats)
+            elif kind == "written":
+                job, result = event[1], event[2]
+                stats = owners.pop(id(job))
+                stats.add_result(job, result)
+                out_dir = os.path.dirname(job.dst)
+                d = dir_stats[out_dir]
+                d.add_result(job, result)
+                yield event
+                if not stats.pending:
+                    yield ("done", stats.item, stats)
+                if not d.pending and out_dir in sealed:
+                    yield ready(out_dir)
+            elif kind == "sealed":
+                for out_dir in sorted(event[1]):
+                    if out_dir not in dir_stats:
+                        continue
+                    sealed.add(out_dir)
+                    if not dir_stats[out_dir].pending:
+                        yield ready(out_dir)
+
+        try:
+            running = self.writers
+            while running:
+                event = events.get()
+                if event[0] == "writer_done":
+                    running -= 1
+                else:
+                    yield from dispatch(event)
+        finally:
+            stop.set()
+            for t in threads:
+                t.join(timeout=1.0)
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+_scan_index.py
+- Indeks hasil scan folder (os.scandir) yang dipakai bersama dalam satu run skrip Master.
+- Setiap folder hanya di-list SEKALI; os.walk/os.listdir berikutnya dilayani dari cache.
+- Stat file diambil dari DirEntry (gratis di Windows, di-cache oleh DirEntry di OS lain).
+- Folder yang gagal di-list (tidak bisa dibaca, share putus) tidak di-cache: listdir/subdirs/files
+  dan top walk() melempar OSError seperti os.listdir; subfolder di dalam walk() dilewati seperti
+  os.walk.
+"""
+
+import os
+
+
+class ScanIndex:
+    def __init__(self):
+        # path -> (list nama subfolder, dict nama file -> DirEntry)
+        self._dirs = {}
+
+    def _load(self, path, strict=True):
+        path = os.path.normpath(path)
+        cached = self._dirs.get(path)
+        if cached is not None:
+            return cached
+        subdirs, files = [], {}
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                        else:
+                            files[entry.name] = entry
+                    except OSError:
+                        continue
+        except OSError:
+            if strict:
+                raise
+            return [], {}
+        cached = (subdirs, files)
+        self._dirs[path] = cached
+        return cached
+
+    def listdir(self, path):
+        subdirs, files = self._load(path)
+        return list(subdirs) + list(files)
+
+    def subdirs(self, path, key=None):
+        subdirs = self._load(path)[0]
+        return sorted(subdirs, key=key) if key else list(subdirs)
+
+    def files(self, path):
+        return list(self._load(path)[1])
+
+    def stat(self, folder, name):
+        """(size, mtime) untuk file di folder; None jika tidak ada / gagal stat."""
+        entry = self._load(folder, strict=False)[1].get(name)
+        if entry is None:
+            return None
+        try:
+            st = entry.stat()
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def walk(self, top, key=None):
+        """
+        Pengganti os.walk(top) (top-down) yang memakai cache.
+        `key` (opsional) mengurutkan subfolder, mis. untuk memproses folder prioritas lebih dulu.
+        """
+        top = os.path.normpath(top)
+        stack = [top]
+        while stack:
+            root = stack.pop()
+            subdirs, files = self._load(root, strict=root == top)
+            dirs = sorted(subdirs, key=key) if key else list(subdirs)
+            yield root, dirs, list(files)
+            # Urutan sama dengan os.walk: anak pertama diproses lebih dulu
+            for d in reversed(dirs):
+                stack.append(os.path.join(root, d))
+
+    def invalidate(self, path):
+        self._dirs.pop(os.path.normpath(path), None)
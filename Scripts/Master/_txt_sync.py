@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+_txt_sync.py
+- Sinkronisasi file sidecar .txt (order file) dari folder pilihan ke folder output.
+- Hanya menyalin file yang BERUBAH (size/mtime, opsional hash isi), bukan copy2 ulang setiap run.
+- Opsional: hapus .txt di output yang sumbernya sudah tidak ada (seluruh tree output, termasuk
+  subfolder yang folder sumbernya sudah dihapus/di-rename).
+
+Env:
+  BMACHINE_TXT_HASH=1   -> jika size sama tapi mtime beda, bandingkan hash isi dulu sebelum menyalin
+  BMACHINE_TXT_PRUNE=1  -> hapus .txt di output yang sumbernya sudah hilang
+"""
+
+import hashlib
+import os
+import shutil
+
+from _output_dirs import OutputDirs
+from _scan_index import ScanIndex
+
+# Toleransi mtime (detik): FAT/SMB menyimpan mtime dengan resolusi 2 detik
+MTIME_TOLERANCE = 2.0
+
+
+def _env_flag(name):
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _file_digest(path):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.digest()
+
+
+class TxtSyncResult:
+    def __init__(self):
+        self.copied = []    # path relatif terhadap output_folder
+        self.skipped = []   # sama persis, tidak disentuh
+        self.removed = []   # dihapus karena sumber hilang (prune)
+        self.errors = []    # (nama file, exception)
+
+
+def sync_txt_files(source_folder, output_folder, out_dirs=None, scan=None, check_hash=None, prune=None):
+    """
+    Sinkronkan semua .txt di source_folder (rekursif) ke output_folder dengan struktur yang sama.
+    `scan` adalah ScanIndex bersama milik run, jadi tree sumber tidak di-list ulang oleh langkah lain.
+    """
+    out_dirs = out_dirs or OutputDirs(output_folder)
+    scan = scan or ScanIndex()
+    check_hash = _env_flag("BMACHINE_TXT_HASH") if check_hash is None else check_hash
+    prune = _env_flag("BMACHINE_TXT_PRUNE") if prune is None else prune
+    result = TxtSyncResult()
+
+    # 1. Plan: pasangan (folder sumber, folder tujuan, daftar .txt)
+    plan = []
+    source_txts = set()     # path relatif (lower) semua .txt sumber, untuk prune
+    for root, dirs, files in scan.walk(source_folder):
+        txts = [f for f in files if f.lower().endswith('.txt')]
+        if not txts:
+            continue
+        rel_path = os.path.relpath(root, source_folder)
+        dest_dir = os.path.join(output_folder, rel_path) if rel_path != '.' else output_folder
+        out_dirs.add(dest_dir)
+        plan.append((root, dest_dir, txts))
+        source_txts.update(os.path.normpath(os.path.join(rel_path, n)).lower() for n in txts)
+    out_dirs.materialize()
+
+    # 2. Bandingkan dengan tujuan (satu scandir per folder tujuan; folder baru pasti kosong)
+    dest_scan = ScanIndex()
+    for root, dest_dir, txts in plan:
+        fresh = out_dirs.is_fresh(dest_dir)
+        for name in txts:
+            src_path = os.path.join(root, name)
+            dest_path = os.path.join(dest_dir, name)
+            rel_dest = os.path.relpath(dest_path, output_folder)
+            try:
+                src_st = scan.stat(root, name)
+                dst_st = None if fresh else dest_scan.stat(dest_dir, name)
+                if src_st and dst_st and src_st[0] == dst_st[0]:
+                    if abs(src_st[1] - dst_st[1]) <= MTIME_TOLERANCE:
+                        result.skipped.append(rel_dest)
+                        continue
+                    if check_hash and _file_digest(src_path) == _file_digest(dest_path):
+                        # Isi sama, hanya mtime beda: samakan mtime agar run berikutnya cukup cek stat
+                        shutil.copystat(src_path, dest_path)
+                        result.skipped.append(rel_dest)
+                        continue
+                shutil.copy2(src_path, dest_path)
+                result.copied.append(rel_dest)
+            except Exception as e:
+                result.errors.append((name, e))
+
+    # 3. Prune: walk seluruh tree tujuan, jadi .txt di bawah subfolder sumber yang sudah
+    #    dihapus/di-rename ikut dibuang (bukan hanya folder tujuan yang sumbernya masih ada)
+    if prune:
+        source_root = os.path.normpath(os.path.abspath(source_folder))
+        try:
+            for root, dirs, files in dest_scan.walk(output_folder):
+                # Jangan turun ke tree sumber jika sumber ada di dalam output
+                dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != source_root]
+                rel_dir = os.path.relpath(root, output_folder)
+                for name in files:
+                    rel_dest = os.path.normpath(os.path.join(rel_dir, name))
+                    if not name.lower().endswith('.txt') or rel_dest.lower() in source_txts:
+                        continue
+                    try:
+                        os.remove(os.path.join(root, name))
+                        result.removed.append(rel_dest)
+                    except Exception as e:
+                        result.errors.append((name, e))
+        except FileNotFoundError:
+            pass    # output belum pernah dibuat: tidak ada yang perlu dibuang
+        except OSError as e:
+            result.errors.append((output_folder, e))
+
+    return result
@@ -8,10 +8,15 @@ manasik.py (fixed clean)
 
 import os
 import re
-import shutil
 import sys
 import json
 
+from _code_extract import EXTRACTOR
+from _output_dirs import OutputDirs
+from _pipeline import CopyJob, CopyPipeline, folder_priority_key
+from _scan_index import ScanIndex
+from _txt_sync import sync_txt_files
+
 
 def get_project_root():
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -229,7 +234,7 @@ def _split_csv_numbers(group_text):
     return re.findall(r'\d{1,3}', group_text)
 
 
-def find_candidate_codes(folder_path, prefer_tag=None):
+def find_candidate_codes(folder_path, prefer_tag=None, scan=None):
     prefer_tag = (prefer_tag or "").upper()
     cand, seen = [], set()
 
@@ -242,38 +247,15 @@ def find_candidate_codes(folder_path, prefer_tag=None):
             cand.append(x)
 
     try:
-        for filename in os.listdir(folder_path):
+        names = scan.files(folder_path) if scan else os.listdir(folder_path)
+        for filename in names:
             if not filename.lower().endswith('.txt'):
                 continue
             file_path = os.path.join(folder_path, filename)
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-            except Exception:
-                continue
-
-            # Gabung nama file dan isi untuk pencarian
-            search_text = f"{filename}\n{content}"
-            
-            # Strategi: Ambil semua angka 1-3 digit
-            raw_nums = re.findall(r'(?<!\d)(\d{1,3})(?!\d)', search_text)
-            
-            # A. Explicit MSK pattern: MSK[- ]?(\d{1,3})
-            for m in re.finditer(r'MSK[\s-]*(\d{1,3})', search_text, re.IGNORECASE):
-                push(m.group(1))
-
-            # B. Explicit Type pattern: (10RP|8R)[\s-]*(\d{1,3})
-            for m in re.finditer(r'(?:10RP|8R)[\s-]*(\d{1,3})', search_text, re.IGNORECASE):
-                push(m.group(1))
-
-            # C. Fallback: Ambil semua angka, tapi validasi
-            for num_str in raw_nums:
-                # Cek apakah angka ini adalah '8' dan di teks aslinya diikuti 'R'
-                if num_str == '8' and '8R' in search_text.upper():
-                    continue 
-                if num_str == '10' and '10RP' in search_text.upper():
-                    continue 
-                push(num_str)
+            # Pola MSK / 10RP|8R / angka umum (nama file + isi), hasil di-cache per (path, size, mtime)
+            found = EXTRACTOR.extract('msk', file_path, scan.stat(folder_path, filename) if scan else None)
+            for x in found or []:
+                push(x)
 
     except Exception as e:
         print(f"[ERROR] Gagal scan .txt di {folder_path}: {e}", file=sys.stderr)
@@ -340,21 +322,17 @@ def discover_jpg_recursive(folder):
     return out
 
 
-def copy_txt_files_recursive(source_folder, output_folder):
-    """Salin semua file .txt dari subfolder ke output folder, mempertahankan struktur folder."""
-    for root, dirs, files in os.walk(source_folder):
-        for file in files:
-            if file.lower().endswith('.txt'):
-                src_path = os.path.join(root, file)
-                rel_path = os.path.relpath(root, source_folder)
-                dest_dir = os.path.join(output_folder, rel_path) if rel_path != '.' else output_folder
-                os.makedirs(dest_dir, exist_ok=True)
-                dest_path = os.path.join(dest_dir, file)
-                try:
-                    shutil.copy2(src_path, dest_path)
-                    print(f"    - Salin .txt: {os.path.relpath(dest_path, output_folder)}")
-                except Exception as e:
-                    print(f"    - [ERROR] Gagal salin .txt '{file}': {e}", file=sys.stderr)
+def copy_txt_files_recursive(source_folder, output_folder, out_dirs=None, scan=None):
+    """Sinkronkan file .txt dari subfolder ke output folder (hanya yang berubah), mempertahankan struktur folder."""
+    res = sync_txt_files(source_folder, output_folder, out_dirs, scan)
+    for rel in res.copied:
+        print(f"    - Salin .txt: {rel}")
+    for rel in res.removed:
+        print(f"    - Hapus .txt (sumber hilang): {rel}")
+    for file, e in res.errors:
+        print(f"    - [ERROR] Gagal salin .txt '{file}': {e}", file=sys.stderr)
+    if res.skipped:
+        print(f"    - .txt tidak berubah: {len(res.skipped)} file dilewati")
 
 
 def get_relative_path_from_month(pilihan_path):
@@ -378,24 +356,24 @@ def main(master_path_primary, pilihan_path, output_base_path, master_path_second
     _ = load_config()
     relative_path = get_relative_path_from_month(pilihan_path)
     final_output_folder = os.path.join(output_base_path, relative_path)
-    os.makedirs(final_output_folder, exist_ok=True)
+    out_dirs = OutputDirs(final_output_folder)
+    out_dirs.ensure(final_output_folder)
+    scan = ScanIndex()
 
     # Mirror level-1 folders dari pilihan_path ke output
     try:
-        for name in os.listdir(pilihan_path):
-            p = os.path.join(pilihan_path, name)
-            if os.path.isdir(p):
-                os.makedirs(os.path.join(final_output_folder, name), exist_ok=True)
+        for name in scan.subdirs(pilihan_path):
+            out_dirs.add(os.path.join(final_output_folder, name))
+        out_dirs.materialize()
     except Exception as e:
         print(f"[WARNING] Gagal mirror folder level-1: {e}", file=sys.stderr)
 
     # Salin .txt dari semua subfolder
     try:
-        for name in os.listdir(pilihan_path):
+        for name in scan.subdirs(pilihan_path):
             p = os.path.join(pilihan_path, name)
-            if os.path.isdir(p):
-                out_p = os.path.join(final_output_folder, name)
-                copy_txt_files_recursive(p, out_p)
+            out_p = os.path.join(final_output_folder, name)
+            copy_txt_files_recursive(p, out_p, out_dirs, scan)
     except Exception as e:
         print(f"[WARNING] Gagal salin .txt dari subfolder: {e}", file=sys.stderr)
 
@@ -416,10 +394,11 @@ def main(master_path_primary, pilihan_path, output_base_path, master_path_second
     if not md_8r_path or not os.path.exists(md_8r_path):
          print(f"[ERROR] Master Path 8R tidak valid: {md_8r_path}", file=sys.stderr)
 
-    for subfolder_name in os.listdir(pilihan_path):
+    # Urutan proses folder (BMACHINE_FOLDER_ORDER): natural / kelas dulu / listing
+    order_key = folder_priority_key()
+    tasks = []
+    for subfolder_name in scan.subdirs(pilihan_path, key=order_key):
         subfolder_path = os.path.join(pilihan_path, subfolder_name)
-        if not os.path.isdir(subfolder_path):
-            continue
         subfolder_lower = subfolder_name.lower()
         if 'manasik' not in subfolder_lower:
             continue
@@ -442,7 +421,7 @@ def main(master_path_primary, pilihan_path, output_base_path, master_path_second
 
         print(f"\n--- Memproses: {subfolder_name} ---")
 
-        candidates = find_candidate_codes(subfolder_path, prefer_tag=prefer_tag)
+        candidates = find_candidate_codes(subfolder_path, prefer_tag=prefer_tag, scan=scan)
         print(f"  - Kandidat kode dari .txt: {candidates if candidates else '∅'}")
         if not candidates:
             print(f"[SCRIPT_ERROR] [ERROR] Tidak ditemukan kandidat kode dari .txt di '{subfolder_name}'.", file=sys.stderr)
@@ -464,66 +443,72 @@ def main(master_path_primary, pilihan_path, output_base_path, master_path_second
         print(f"  - Kode terpilih: {chosen_code}")
         print(f"  - Master ditemukan: {os.path.basename(master_file_path)}")
 
-        # --- REFACTOR START: Deep Walk to Preserve Structure ---
-        # Walk through subfolder_path recursively
-        for root, dirs, files in os.walk(subfolder_path):
-            jpg_files = [f for f in files if f.lower().endswith(('.jpg', '.jpeg'))]
-            if not jpg_files:
-                continue
-
-            # Calculate relative path from the event root (subfolder_path)
-            # e.g. root = ".../1. FOTO.../KELAS A", rel = "KELAS A"
-            rel_dir = os.path.relpath(root, subfolder_path)
-            
-            # Destination directory: Final Output / Event Name / Relative Subfolder
-            # e.g. ".../OUTPUT/1. FOTO.../KELAS A"
-            if rel_dir == ".":
-                current_output_dir = os.path.join(final_output_folder, subfolder_name)
+        tasks.append((subfolder_name, subfolder_path, master_file_path))
+
+    # --- Deep walk (struktur dipertahankan) sebagai pipeline: scan -> resolve -> copy ---
+    # Copy sudah jalan selagi subfolder berikutnya masih di-list.
+    def walk_items():
+        for subfolder_name, subfolder_path, master_file_path in tasks:
+            for root, dirs, files in scan.walk(subfolder_path, key=order_key):
+                yield subfolder_name, subfolder_path, master_file_path, root, files
+
+    def resolve(item, log):
+        subfolder_name, subfolder_path, master_file_path, root, files = item
+        jpg_files = [f for f in files if f.lower().endswith(('.jpg', '.jpeg'))]
+        if not jpg_files:
+            return []
+
+        # Calculate relative path from the event root (subfolder_path)
+        # e.g. root = ".../1. FOTO.../KELAS A", rel = "KELAS A"
+        rel_dir = os.path.relpath(root, subfolder_path)
+
+        # Destination directory: Final Output / Event Name / Relative Subfolder
+        # e.g. ".../OUTPUT/1. FOTO.../KELAS A"
+        if rel_dir == ".":
+            current_output_dir = os.path.join(final_output_folder, subfolder_name)
+        else:
+            current_output_dir = os.path.join(final_output_folder, subfolder_name, rel_dir)
+        out_dirs.ensure(current_output_dir)
+        # Folder baru dibuat run ini pasti kosong: tidak perlu cek file tujuan satu per satu
+        check_exists = not out_dirs.is_fresh(current_output_dir)
+
+        # Process files in this directory
+        group_ids, seen = [], set()
+        for fn in jpg_files:
+            base = fn
+            name_no_ext = os.path.splitext(base)[0]
+            num = get_leading_number(name_no_ext)
+            if num is not None:
+                gid = num
             else:
-                current_output_dir = os.path.join(final_output_folder, subfolder_name, rel_dir)
-            
-            os.makedirs(current_output_dir, exist_ok=True)
-
-            # Process files in this directory
-            group_ids, seen = [], set()
-            for fn in jpg_files:
-                base = fn
-                name_no_ext = os.path.splitext(base)[0]
-                num = get_leading_number(name_no_ext)
-                if num is not None:
-                    gid = num
+                m = ONLY_PAREN.match(name_no_ext)
+                if m:
+                    gid = m.group(1)
                 else:
-                    m = ONLY_PAREN.match(name_no_ext)
-                    if m:
-                        gid = m.group(1)
-                    else:
-                        gid = normalize_non_numeric(name_no_ext)
-                
-                if gid and gid not in seen:
-                    seen.add(gid)
-                    group_ids.append(gid)
-
-            print(f"    - Folder '{rel_dir if rel_dir != '.' else '[Root]'}': {len(group_ids)} grup.")
-
-            copied = 0
-            skipped = 0
-            for gid in group_ids:
-                out_name = f"{gid}.psd"
-                destination_path = os.path.join(current_output_dir, out_name)
-                
-                if os.path.exists(destination_path):
-                    skipped += 1
-                    continue
-                
-                try:
-                    shutil.copy2(master_file_path, destination_path)
-                    copied += 1
-                except Exception as e:
-                    print(f"      [ERROR] Gagal salin '{out_name}': {e}", file=sys.stderr)
-            
-            if copied > 0:
-                print(f"      -> {copied} file disalin.")
-
+                    gid = normalize_non_numeric(name_no_ext)
+
+            if gid and gid not in seen:
+                seen.add(gid)
+                group_ids.append(gid)
+
+        log(f"    - Folder '{os.path.join(subfolder_name, rel_dir) if rel_dir != '.' else subfolder_name}': {len(group_ids)} grup.")
+        return [
+            CopyJob(master_file_path, os.path.join(current_output_dir, f"{gid}.psd"), check_exists)
+            for gid in group_ids
+        ]
+
+    pipe = CopyPipeline(resolve)
+    for event in pipe.run(walk_items()):
+        if event[0] == "written":
+            _, job, result = event
+            if isinstance(result, Exception):
+                print(f"      [ERROR] Gagal salin '{os.path.basename(job.dst)}': {result}", file=sys.stderr)
+        elif event[0] == "done":
+            _, item, stats = event
+            if stats.copied > 0:
+                print(f"      -> {stats.copied} file disalin ({os.path.basename(item[3])}).")
+
+    pipe.print_benchmark()
     print("\n--- Proses Selesai ---")
 
 
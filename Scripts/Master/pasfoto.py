@@ -2,9 +2,13 @@ import os
 import re
 import sys
 import json
-import shutil
-from pathlib import Path
-from typing import Optional, Tuple, Any, Dict, List
+from typing import Optional, Tuple, Dict, List
+
+from _code_extract import EXTRACTOR, extract_pf
+from _output_dirs import OutputDirs
+from _pipeline import SKIPPED, CopyJob, CopyPipeline, folder_priority_key
+from _scan_index import ScanIndex
+from _txt_sync import sync_txt_files
 
 # ============================================
 # Konfigurasi & Util
@@ -189,31 +193,18 @@ def find_psd_for_code(master_pasfoto_path: str, layer_code: str):
 # TXT Parser
 # ============================================
 
-def read_txt_get_code_and_flag(txt_path: str):
+def read_txt_get_code_and_flag(txt_path: str, stat: Optional[tuple] = None):
     """
-    Baca file .txt (utf-8 fallback utf-16) → ambil:
+    Baca file .txt → ambil:
       - layer_code (regex PFM-\\d+)
       - flag 'pakai nama sekolah' (boolean)
+    Hasil di-cache per (path, size, mtime); `stat` dari ScanIndex jika ada.
     """
-    content = ""
-    try:
-        with open(txt_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-    except UnicodeDecodeError:
-        with open(txt_path, "r", encoding="utf-16", errors="ignore") as f:
-            content = f.read()
-    except Exception:
-        content = ""
-
-    match = re.search(r"PF[MB][\s-]*\d+", content, re.IGNORECASE) or re.search(
-        r"PF[MB][\s-]*\d+", os.path.basename(txt_path), re.IGNORECASE
-    )
-    # Normalisasi: "PFM 06" / "PFM-06" → "PFM06"
-    layer_code = re.sub(r'[\s\-]+', '', match.group(0)).upper() if match else None
-
-    combined_text_source = (content + " " + os.path.basename(txt_path)).lower()
-    show_ribbon = "pakai nama sekolah" in combined_text_source
-
+    result = EXTRACTOR.extract('pf', txt_path, stat)
+    if result is None:
+        # File tidak terbaca: tetap coba dari nama file
+        result = extract_pf("", os.path.basename(txt_path))
+    layer_code, show_ribbon = result
     return layer_code, show_ribbon
 
 # ============================================
@@ -253,21 +244,17 @@ def get_relative_path_from_month(pilihan_path):
 
 
 
-def copy_txt_files_recursive(source_folder, output_folder):
-    """Salin semua file .txt dari subfolder ke output folder, mempertahankan struktur folder."""
-    for root, dirs, files in os.walk(source_folder):
-        for file in files:
-            if file.lower().endswith('.txt'):
-                src_path = os.path.join(root, file)
-                rel_path = os.path.relpath(root, source_folder)
-                dest_dir = os.path.join(output_folder, rel_path) if rel_path != '.' else output_folder
-                os.makedirs(dest_dir, exist_ok=True)
-                dest_path = os.path.join(dest_dir, file)
-                try:
-                    shutil.copy2(src_path, dest_path)
-                    print(f"    - Salin .txt: {os.path.relpath(dest_path, output_folder)}")
-                except Exception as e:
-                    print(f"    - [ERROR] Gagal salin .txt '{file}': {e}", file=sys.stderr)
+def copy_txt_files_recursive(source_folder, output_folder, out_dirs: Optional[OutputDirs] = None, scan: Optional[ScanIndex] = None):
+    """Sinkronkan file .txt dari subfolder ke output folder (hanya yang berubah), mempertahankan struktur folder."""
+    res = sync_txt_files(source_folder, output_folder, out_dirs, scan)
+    for rel in res.copied:
+        print(f"    - Salin .txt: {rel}")
+    for rel in res.removed:
+        print(f"    - Hapus .txt (sumber hilang): {rel}")
+    for file, e in res.errors:
+        print(f"    - [ERROR] Gagal salin .txt '{file}': {e}", file=sys.stderr)
+    if res.skipped:
+        print(f"    - .txt tidak berubah: {len(res.skipped)} file dilewati")
 
 # ============================================
 # LOGIKA UTAMA
@@ -296,24 +283,24 @@ def main(master_pasfoto_path: str, pilihan_path: str, output_base_path: str):
     try:
         relative_structure = get_relative_path_from_month(pilihan_path)
         output_folder = os.path.join(output_base_path, relative_structure)
-        os.makedirs(output_folder, exist_ok=True)
+        out_dirs = OutputDirs(output_folder)
+        out_dirs.ensure(output_folder)
+        scan = ScanIndex()
 
         # Mirror level-1 folders dari pilihan_path ke output_folder
         try:
-            for name in os.listdir(pilihan_path):
-                p = os.path.join(pilihan_path, name)
-                if os.path.isdir(p):
-                    os.makedirs(os.path.join(output_folder, name), exist_ok=True)
+            for name in scan.subdirs(pilihan_path):
+                out_dirs.add(os.path.join(output_folder, name))
+            out_dirs.materialize()
         except Exception as e:
             print(f"[WARNING] Gagal mirror folder level-1: {e}", file=sys.stderr)
 
         # Salin .txt dari semua subfolder
         try:
-            for name in os.listdir(pilihan_path):
+            for name in scan.subdirs(pilihan_path):
                 p = os.path.join(pilihan_path, name)
-                if os.path.isdir(p):
-                    out_p = os.path.join(output_folder, name)
-                    copy_txt_files_recursive(p, out_p)
+                out_p = os.path.join(output_folder, name)
+                copy_txt_files_recursive(p, out_p, out_dirs, scan)
         except Exception as e:
             print(f"[WARNING] Gagal salin .txt dari subfolder: {e}", file=sys.stderr)
 
@@ -324,7 +311,7 @@ def main(master_pasfoto_path: str, pilihan_path: str, output_base_path: str):
 
     # --- LOGIKA BARU: Proses semua subfolder jika tidak ada yang spesifik ---
     try:
-        all_subfolders = [d for d in os.listdir(pilihan_path) if os.path.isdir(os.path.join(pilihan_path, d))]
+        all_subfolders = scan.subdirs(pilihan_path)
     except Exception as e:
         print(f"[ERROR] Terjadi kesalahan saat membaca folder pilihan '{pilihan_path}': {e}", file=sys.stderr)
         return
@@ -343,47 +330,57 @@ def main(master_pasfoto_path: str, pilihan_path: str, output_base_path: str):
         print("\n--- Proses Selesai ---")
         return
 
+    # Pipeline: scan folder -> resolve kode/template -> copy (copy jalan selagi folder berikutnya di-list)
+    def scan_items():
+        # Urutan proses folder (BMACHINE_FOLDER_ORDER): natural / kelas dulu / listing
+        order_key = folder_priority_key()
+        for item in (sorted(folders_to_process, key=order_key) if order_key else folders_to_process):
+            item_path = os.path.join(pilihan_path, item)
+            yield item, item_path, scan.files(item_path)
+
     processed_count = 0
-    for item in sorted(folders_to_process, key=natural_sort_key):
-        item_path = os.path.join(pilihan_path, item)
 
-        print(f"\n--- Memproses: {item} ---")
+    def resolve(scanned, log):
+        nonlocal processed_count
+        item, item_path, item_files = scanned
+
+        log(f"\n--- Memproses: {item} ---")
         processed_count += 1
 
         # Folder output untuk item ini
-        item_output_folder = os.path.join(output_folder, item)
-        os.makedirs(item_output_folder, exist_ok=True)
+        item_output_folder = out_dirs.ensure(os.path.join(output_folder, item))
+        check_exists = not out_dirs.is_fresh(item_output_folder)
 
-        txt_files = [f for f in os.listdir(item_path) if f.lower().endswith(".txt")]
+        txt_files = [f for f in item_files if f.lower().endswith(".txt")]
         if not txt_files:
-            print(f"[WARNING] Tidak ada file .txt ditemukan di dalam '{item}'. Dilewati.")
-            continue
+            log(f"[WARNING] Tidak ada file .txt ditemukan di dalam '{item}'. Dilewati.")
+            return []
 
         layer_code = None
         show_ribbon = False
         for txt_file in sorted(txt_files, key=natural_sort_key):
-            code, ribbon = read_txt_get_code_and_flag(os.path.join(item_path, txt_file))
+            code, ribbon = read_txt_get_code_and_flag(os.path.join(item_path, txt_file), scan.stat(item_path, txt_file))
             if code:
                 layer_code = code
                 show_ribbon = ribbon
-                print(f"  - Kode ditemukan: {layer_code} (dari file '{txt_file}')")
+                log(f"  - Kode ditemukan: {layer_code} (dari file '{txt_file}')")
                 break
 
         if not layer_code:
-            print(f"[WARNING] Tidak ada kode format 'PFM-XXX' ditemukan pada .txt di '{item}'. Dilewati.")
-            continue
+            log(f"[WARNING] Tidak ada kode format 'PFM-XXX' ditemukan pada .txt di '{item}'. Dilewati.")
+            return []
 
         # Temukan PSD template
         psd_template_path = find_psd_for_code(master_pasfoto_path, layer_code)
         if not psd_template_path:
-            print(f"[ERROR] PSD untuk kode '{layer_code}' tidak ditemukan di '{master_pasfoto_path}'. Dilewati.", file=sys.stderr)
-            continue
+            log(f"[ERROR] PSD untuk kode '{layer_code}' tidak ditemukan di '{master_pasfoto_path}'. Dilewati.", err=True)
+            return []
 
-        print(f"  - Template PSD: {os.path.basename(psd_template_path)}")
+        log(f"  - Template PSD: {os.path.basename(psd_template_path)}")
 
         # Kumpulkan JPG/JPEG sumber (urutan natural)
         source_images = [
-            f for f in os.listdir(item_path)
+            f for f in item_files
             if f.lower().endswith(ALLOWED_EXTS)
             and not f.startswith(".")
             and not f.startswith("._")
@@ -391,35 +388,44 @@ def main(master_pasfoto_path: str, pilihan_path: str, output_base_path: str):
         source_images.sort(key=natural_sort_key)
 
         if not source_images:
-            print("  - [INFO] Tidak ada file JPG/JPEG sumber. Akan tetap menyalin satu PSD sebagai '1.psd'.")
-            dest_path = os.path.join(item_output_folder, "1.psd")
-            try:
-                shutil.copy2(psd_template_path, dest_path)
-                print("    - [SUCCESS] Membuat 1.psd")
-            except Exception as e:
-                print(f"    - [ERROR] Gagal menyalin PSD: {e}", file=sys.stderr)
-            continue
+            log("  - [INFO] Tidak ada file JPG/JPEG sumber. Akan tetap menyalin satu PSD sebagai '1.psd'.")
+            # Selalu timpa (perilaku lama), jadi tanpa cek file tujuan
+            return [CopyJob(psd_template_path, os.path.join(item_output_folder, "1.psd"), False, tag=None)]
 
         # Duplikasi PSD → penamaan cerdas
-        print(f"  - Ditemukan {len(source_images)} file gambar. Memulai duplikasi & rename.")
+        log(f"  - Ditemukan {len(source_images)} file gambar. Memulai duplikasi & rename.")
+        total = len(source_images)
+        jobs = []
         for idx, img_file in enumerate(source_images, start=1):
             base_name, _ = os.path.splitext(img_file)
             dest_filename = compute_dest_filename(base_name, idx)
             dest_path = os.path.join(item_output_folder, dest_filename)
-            if os.path.exists(dest_path):
-                print(f"    - SKIP_EXISTING: '{dest_filename}' sudah ada.")
-                continue
+            jobs.append(CopyJob(psd_template_path, dest_path, check_exists, tag=(idx, total)))
+        return jobs
 
-            try:
-                shutil.copy2(psd_template_path, dest_path)
-                total = len(source_images)
-                print(f"    - [OK] {idx}/{total} {os.path.basename(dest_path)}")
-            except Exception as e:
-                print(f"    - [ERROR] Gagal menyalin ke '{os.path.basename(dest_path)}': {e}", file=sys.stderr)
+    pipe = CopyPipeline(resolve)
+    for event in pipe.run(scan_items()):
+        if event[0] != "written":
+            continue
+        _, job, result = event
+        dest_filename = os.path.basename(job.dst)
+        if job.tag is None:
+            if isinstance(result, Exception):
+                print(f"    - [ERROR] Gagal menyalin PSD: {result}", file=sys.stderr)
+            else:
+                print("    - [SUCCESS] Membuat 1.psd")
+        elif isinstance(result, Exception):
+            print(f"    - [ERROR] Gagal menyalin ke '{dest_filename}': {result}", file=sys.stderr)
+        elif result == SKIPPED:
+            print(f"    - SKIP_EXISTING: '{dest_filename}' sudah ada.")
+        else:
+            idx, total = job.tag
+            print(f"    - [OK] {idx}/{total} {dest_filename}")
 
     if processed_count == 0:
         print("[INFO] Tidak ada folder yang cocok dengan kriteria yang ditemukan untuk diproses.")
 
+    pipe.print_benchmark()
     print("\n--- Proses Selesai ---")
     return output_folder
 
@@ -2,12 +2,16 @@
 import os
 import sys
 import json
-import shutil
 import traceback
 from collections import defaultdict
 import re
 import base64
 
+from _output_dirs import OutputDirs
+from _pipeline import COPIED, CopyJob, CopyPipeline, folder_priority_key
+from _scan_index import ScanIndex
+from _txt_sync import sync_txt_files
+
 # FORCE UNBUFFERED OUTPUT
 sys.stdout.reconfigure(encoding='utf-8', line_buffering=True)
 print("PYTHON_SCRIPT_STARTED: profesi_flat.py", flush=True)
@@ -148,11 +152,12 @@ def get_profession_from_filename(filename):
     return (None, None)
 
 # ---------- Collect sources ----------
-def get_files_to_process(pilihan_path, files_to_reprocess=None):
+def get_files_to_process(pilihan_path, files_to_reprocess=None, scan=None):
     if files_to_reprocess:
         return [f for f in files_to_reprocess if os.path.exists(f)]
     all_files = []
-    for root, _, filenames in os.walk(pilihan_path):
+    walker = scan.walk(pilihan_path) if scan else os.walk(pilihan_path)
+    for root, _, filenames in walker:
         for filename in filenames:
             if filename.lower().endswith(ALLOWED_EXTS):
                 all_files.append(os.path.join(root, filename))
@@ -301,21 +306,17 @@ def create_oke_base_links(pilihan_path, oke_base_path, user_name):
         print(f"[ERROR] OKE BASE: {e}", file=sys.stderr)
 
 
-def copy_txt_files_recursive(source_folder, output_folder):
-    """Salin semua file .txt dari subfolder ke output folder, mempertahankan struktur folder."""
-    for root, dirs, files in os.walk(source_folder):
-        for file in files:
-            if file.lower().endswith('.txt'):
-                src_path = os.path.join(root, file)
-                rel_path = os.path.relpath(root, source_folder)
-                dest_dir = os.path.join(output_folder, rel_path) if rel_path != '.' else output_folder
-                os.makedirs(dest_dir, exist_ok=True)
-                dest_path = os.path.join(dest_dir, file)
-                try:
-                    shutil.copy2(src_path, dest_path)
-                    print(f"    [COPY-TXT] {os.path.relpath(dest_path, output_folder)}")
-                except Exception as e:
-                    print(f"    [ERROR-TXT] Gagal salin '{file}': {e}", file=sys.stderr)
+def copy_txt_files_recursive(source_folder, output_folder, out_dirs=None, scan=None):
+    """Sinkronkan file .txt dari subfolder ke output folder (hanya yang berubah), mempertahankan struktur folder."""
+    res = sync_txt_files(source_folder, output_folder, out_dirs, scan)
+    for rel in res.copied:
+        print(f"    [COPY-TXT] {rel}")
+    for rel in res.removed:
+        print(f"    [PRUNE-TXT] {rel}")
+    for file, e in res.errors:
+        print(f"    [ERROR-TXT] Gagal salin '{file}': {e}", file=sys.stderr)
+    if res.skipped:
+        print(f"    [SKIP-TXT] {len(res.skipped)} file .txt tidak berubah")
 
 
 
@@ -358,16 +359,17 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
     # Event folder
     relative_structure = get_relative_path_from_month(pilihan_path)
     final_event_folder = os.path.join(output_path, relative_structure)
-    os.makedirs(final_event_folder, exist_ok=True)
+    out_dirs = OutputDirs(final_event_folder)
+    out_dirs.ensure(final_event_folder)
+    scan = ScanIndex()
 
     # Trigger Copy TXT (Mirip Manasik)
     print("\n[INFO] Menyalin file .txt dari subfolder...")
     try:
-        for name in os.listdir(pilihan_path):
+        for name in scan.subdirs(pilihan_path):
             p = os.path.join(pilihan_path, name)
-            if os.path.isdir(p):
-                out_p = os.path.join(final_event_folder, name)
-                copy_txt_files_recursive(p, out_p)
+            out_p = os.path.join(final_event_folder, name)
+            copy_txt_files_recursive(p, out_p, out_dirs, scan)
     except Exception as e:
         print(f"[WARNING] Gagal salin .txt loop utama: {e}", file=sys.stderr)
 
@@ -378,19 +380,20 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
     # Pre-create kelas/grup/kelompok di dalam folder yang mengandung 'profesi' atau 'sporty'
     def precreate_tag(tag: str):
         try:
-            for name in os.listdir(pilihan_path):
-                src_lvl1 = os.path.join(pilihan_path, name)
-                if not (os.path.isdir(src_lvl1) and contains_kw(name, tag)):
+            for name in scan.subdirs(pilihan_path):
+                if not contains_kw(name, tag):
                     continue
+                src_lvl1 = os.path.join(pilihan_path, name)
                 out_lvl1 = os.path.join(final_event_folder, name)
-                os.makedirs(out_lvl1, exist_ok=True)
-                for child in os.scandir(src_lvl1):
-                    if child.is_dir() and is_class_or_group(child.name):
-                        os.makedirs(os.path.join(out_lvl1, child.name), exist_ok=True)
+                out_dirs.add(out_lvl1)
+                for child in scan.subdirs(src_lvl1):
+                    if is_class_or_group(child):
+                        out_dirs.add(os.path.join(out_lvl1, child))
         except Exception as e:
             print(f"[WARNING] Precreate {tag} gagal: {e}", file=sys.stderr)
     precreate_tag('profesi')
     precreate_tag('sporty')
+    out_dirs.materialize()
 
     # Index master
     master_files_profesi = {}
@@ -406,14 +409,18 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
             if ext:
                 master_files_sporty[stem.lower()] = f
 
-    files = get_files_to_process(pilihan_path, files_to_reprocess)
-    if not files:
+    def report_no_files():
         print("[INFO] Tidak ada file JPG/JPEG ditemukan.")
         print(f"SUMMARY_JSON:{json.dumps({})}")
         # Tetap jalankan OKE BASE jika diminta
         if oke_base_path:
             user_name = os.environ.get('BMACHINE_USER_NAME', config_data.get('UserName', 'USER'))
             create_oke_base_links(pilihan_path, oke_base_path, user_name)
+
+    # Daftar reprocess eksplisit dicek dulu; scan penuh tidak lagi dilakukan dua kali
+    # (kosong/tidaknya tree diketahui dari pipeline di bawah).
+    if files_to_reprocess and not get_files_to_process(pilihan_path, files_to_reprocess, scan):
+        report_no_files()
         return
 
     processed_bases = set()
@@ -421,48 +428,31 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
     unmatched, errors = [], []
 
     # --- NEW LOGIC: Deep Walk with Smart Folder Detection ---
+    # Dijalankan sebagai pipeline: scan -> resolve (master + folder output) -> copy paralel
     total_folders_scanned = 0
     total_files_scanned = 0
     print("[DEBUG] Memulai scan folder...")
-    for root, dirs, files in os.walk(pilihan_path):
-        total_folders_scanned += 1
-        print(f"\r[SCAN] Folder ke-{total_folders_scanned}: {os.path.basename(root)[:40]}...", end='', flush=True)
-        jpg_files = [f for f in files if f.lower().endswith(ALLOWED_EXTS)]
-        if not jpg_files:
-            continue
-        total_files_scanned += len(jpg_files)
-
-        # 1. Tentukan konteks folder
-        rel_dir = os.path.relpath(root, pilihan_path)
-        parts_dir = [] if rel_dir in (".", "") else rel_dir.split(os.sep)
-        
-        current_folder_name = os.path.basename(root)
 
-        # 2. Tentukan Struktur Output (SMART FLATTEN)
-        #    Strategi Baru:
-        #    Iterasi setiap bagian path. Jika bagian tersebut cocok dengan MASTER KEY (Profesi/Sporty),
-        #    maka anggap itu adalah folder kategori.
-        #    - Path SEBELUM folder kategori => Dipertahankan (misal "KELAS B2")
-        #    - Folder kategori itu sendiri => Di-flatten (kontennya naik ke parent 'KELAS B2')
-        
+    def split_at_master_folder(parts_dir):
+        """Pisah path relatif jadi (bagian struktur sebelum folder master, (key, kategori) atau None)."""
         target_parts = []
         folder_master_key = None # (key, category)
 
         for part in parts_dir:
             # Cek apakah part ini adalah Master Key?
             found_key = None
-            
+        
             # Cek Profesi
             k_prof = try_find_master_key(part, master_files_profesi)
             if k_prof:
                 found_key = (k_prof, 'profesi')
-            
+        
             # Cek Sporty (jika belum ketemu di Profesi)
             if not found_key and master_sporty_exists:
                 k_sport = try_find_master_key(part, master_files_sporty)
                 if k_sport:
                     found_key = (k_sport, 'sporty')
-            
+        
             if found_key:
                 # KETEMU! Ini adalah folder profesi (misal "ASTRONOT").
                 # Kita stop penambahan path target di sini.
@@ -472,7 +462,33 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
             else:
                 # Bukan folder master, anggap ini bagian struktur (misal "KELAS B2")
                 target_parts.append(part)
+        return target_parts, folder_master_key
+
+    def resolve(walked, log):
+        nonlocal total_folders_scanned, total_files_scanned
+        root, dirs, files = walked
+        total_folders_scanned += 1
+        log(f"\r[SCAN] Folder ke-{total_folders_scanned}: {os.path.basename(root)[:40]}...", end='')
+        jpg_files = [f for f in files if f.lower().endswith(ALLOWED_EXTS)]
+        if not jpg_files:
+            return []
+        total_files_scanned += len(jpg_files)
+
+        # 1. Tentukan konteks folder
+        rel_dir = os.path.relpath(root, pilihan_path)
+        parts_dir = [] if rel_dir in (".", "") else rel_dir.split(os.sep)
         
+        current_folder_name = os.path.basename(root)
+
+        # 2. Tentukan Struktur Output (SMART FLATTEN)
+        #    Strategi Baru:
+        #    Iterasi setiap bagian path. Jika bagian tersebut cocok dengan MASTER KEY (Profesi/Sporty),
+        #    maka anggap itu adalah folder kategori.
+        #    - Path SEBELUM folder kategori => Dipertahankan (misal "KELAS B2")
+        #    - Folder kategori itu sendiri => Di-flatten (kontennya naik ke parent 'KELAS B2')
+        
+        target_parts, folder_master_key = split_at_master_folder(parts_dir)
+
         # Susun Output Directory
         if target_parts:
             target_rel_dir = os.path.join(*target_parts)
@@ -482,10 +498,12 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
             target_rel_dir = "."
             current_output_dir = final_event_folder
             
-        os.makedirs(current_output_dir, exist_ok=True)
-        print(f"\n[FOLDER] {rel_dir} -> [OUTPUT] {target_rel_dir if target_rel_dir != '.' else '[ROOT]'} (MasterFolder: {folder_master_key[0] if folder_master_key else 'None'})")
+        out_dirs.ensure(current_output_dir)
+        check_exists = not out_dirs.is_fresh(current_output_dir)
+        log(f"\n[FOLDER] {rel_dir} -> [OUTPUT] {target_rel_dir if target_rel_dir != '.' else '[ROOT]'} (MasterFolder: {folder_master_key[0] if folder_master_key else 'None'})")
 
         # 4. Proses File
+        jobs = []
         for filename in jpg_files:
             full_path = os.path.join(root, filename)
             try:
@@ -531,7 +549,7 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
 
                 if not final_master_key:
                      vars_hint = ", ".join(generate_pf_variants(label_from_name or current_folder_name))
-                     print(f"  [SKIP] '{filename}' -> Master tidak ditemukan (Folder: '{current_folder_name}', File: '{label_from_name}')", file=sys.stderr)
+                     log(f"  [SKIP] '{filename}' -> Master tidak ditemukan (Folder: '{current_folder_name}', File: '{label_from_name}')", err=True)
                      unmatched.append(f"'{filename}' di '{rel_dir}'")
                      continue
 
@@ -549,18 +567,45 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
                 tgt_name = base_name if base_name else os.path.splitext(filename)[0]
                 
                 tujuan_path = os.path.join(current_output_dir, f"{tgt_name}{master_ext}")
-                
-                if os.path.exists(tujuan_path):
-                     print(f"  [SKIP] '{tgt_name}' sudah ada.")
-                     continue
-                
-                shutil.copy2(file_master_path, tujuan_path)
-                summary_counts[os.path.splitext(file_master_name)[0]] += 1
-                print(f"  [OK] '{filename}' -> '{tgt_name}{master_ext}' ({category_mode.upper()}: {file_master_name})")
+                jobs.append(CopyJob(file_master_path, tujuan_path, check_exists,
+                                    tag=(full_path, filename, tgt_name, category_mode, file_master_name)))
 
             except Exception as e:
                 errors.append(f"{full_path}: {e}")
-                print(f"  [ERROR] {filename}: {e}", file=sys.stderr)
+                log(f"  [ERROR] {filename}: {e}", err=True)
+
+        return jobs
+
+    def scope(walked):
+        # Folder output = prefix path sumber sebelum folder master (flatten), jadi folder output
+        # lengkap begitu walk keluar dari subtree prefix tersebut.
+        root = walked[0]
+        rel_dir = os.path.relpath(root, pilihan_path)
+        target_parts, _ = split_at_master_folder([] if rel_dir in (".", "") else rel_dir.split(os.sep))
+        return root, os.path.join(pilihan_path, *target_parts)
+
+    # Urutan proses folder (BMACHINE_FOLDER_ORDER): natural / kelas dulu / listing
+    pipe = CopyPipeline(resolve, scope=scope)
+    for event in pipe.run(scan.walk(pilihan_path, key=folder_priority_key())):
+        if event[0] != "written":
+            continue
+        _, job, result = event
+        full_path, filename, tgt_name, category_mode, file_master_name = job.tag
+        master_ext = os.path.splitext(file_master_name)[1]
+        if isinstance(result, Exception):
+            errors.append(f"{full_path}: {result}")
+            print(f"  [ERROR] {filename}: {result}", file=sys.stderr)
+        elif result == COPIED:
+            summary_counts[os.path.splitext(file_master_name)[0]] += 1
+            print(f"  [OK] '{filename}' -> '{tgt_name}{master_ext}' ({category_mode.upper()}: {file_master_name})")
+        else:
+            print(f"  [SKIP] '{tgt_name}' sudah ada.")
+
+    if not total_files_scanned and not files_to_reprocess:
+        print()
+        report_no_files()
+        return
+
 
     print("\n--- RINGKASAN ---")
     if not summary_counts:
@@ -576,6 +621,7 @@ def process_images(master_path_profesi, master_path_sporty, pilihan_path, output
         for err in errors:
             print(err)
     print(f"SUMMARY_JSON:{json.dumps(summary_counts)}")
+    pipe.print_benchmark()
 
     # OKE BASE (opsional)
     if oke_base_path:
@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+_bucin_auto.py
+- Logika mode otomatis psdbucin tanpa GUI: scan folder, pencocokan folder foto -> template
+  (trie folder, leluhur terdekat yang punya template), nama target (compute_target_name), dan
+  salin paralel (worker pool). Hasil pencocokan per folder bisa diekspor sebagai laporan resolusi.
+- Progress disimpan di counter bersama (done/total/last); UI membacanya dengan tick tetap
+  (mis. 10 Hz) alih-alih satu root.after per file.
+- Pembatalan dicek sebelum setiap file, jadi tombol BATAL langsung berhenti mengambil job baru.
+- Mode headless (dipanggil dari psdbucin_v3 --headless / batch_wrapper.py): progress ditulis
+  sebagai NDJSON ke stdout, satu objek JSON per baris.
+
+Env:
+  BMACHINE_COPY_WORKERS=N  -> jumlah thread salin (default 4)
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+DEFAULT_WORKERS = 4
+
+# Nama foto -> nama target: "(12)" / "3 (12)" / "3(12)" -> "12"
+ONLY_PAREN = re.compile(r'^\(\s*(\d+)\s*\)$')
+SPACE_FORM = re.compile(r'^(\d+)\s*\(\s*\d+\s*\)(?:\b.*)?$')
+TIGHT_FORM = re.compile(r'^\d+\(\s*(\d+)\s*\)$')
+
+
+def collect_psd_masters(master_dir, cancelled=None):
+    masters = []
+    try:
+        for root, _, files in os.walk(master_dir):
+            if cancelled and cancelled(): return None
+            for f in files:
+                if f.lower().endswith(('.psd', '.psb')):
+                    full_path = os.path.join(root, f)
+                    rel_path = os.path.relpath(full_path, master_dir)
+                    masters.append((rel_path, full_path))
+    except Exception:
+        return []
+        
+    masters.sort(key=lambda x: x[0].lower())
+    return masters
+
+def collect_jpgs_with_relpath(pilihan_dir, cancelled=None):
+    jpgs = []
+    try:
+        for root, _, files in os.walk(pilihan_dir):
+            if cancelled and cancelled(): return None
+            for fn in files:
+                if fn.lower().endswith(('.jpg', '.jpeg')):
+                    full = os.path.join(root, fn)
+                    rel = os.path.relpath(full, pilihan_dir)
+                    jpgs.append((full, rel))
+    except Exception:
+        return []
+    jpgs.sort(key=lambda x: x[1].lower())
+    return jpgs
+
+def compute_target_name(jpg_name):
+    n = os.path.splitext(jpg_name)[0].strip()
+    m = ONLY_PAREN.match(n)
+    if m: return m.group(1)
+    m = SPACE_FORM.match(n)
+    if m: return m.group(1)
+    m = TIGHT_FORM.match(n)
+    if m: return m.group(1)
+    return n
+
+
+# Aturan pencocokan template (untuk laporan resolusi)
+RULE_EXACT = "exact"        # template ada di folder yang sama persis
+RULE_ANCESTOR = "ancestor"  # template di folder induk terdekat (termasuk root Master)
+RULE_FALLBACK = "fallback"  # tidak ada di jalur folder: template pertama secara umum
+
+RESOLUTION_REPORT_FILE = os.path.join(tempfile.gettempdir(), 'bmachine_bucin_resolution.json')
+
+
+def _dir_parts(rel_dir):
+    # "KELAS A/Sub " -> ["kelas a", "sub"]
+    return [p.strip().lower() for p in rel_dir.replace("\\", "/").split("/") if p.strip()]
+
+
+class TemplateTrie:
+    """
+    Trie folder template: tiap node = satu segmen path (dinormalisasi), menyimpan template
+    pertama di folder itu. resolve() mencari leluhur terdalam yang punya template, O(kedalaman).
+    """
+
+    def __init__(self, psd_masters):
+        self.root = {"children": {}, "template": None}
+        self.fallback = psd_masters[0][1] if psd_masters else None
+        for rel_name, full_path in psd_masters:
+            node = self.root
+            for part in _dir_parts(os.path.dirname(rel_name)):
+                node = node["children"].setdefault(part, {"children": {}, "template": None})
+            if node["template"] is None:
+                node["template"] = full_path
+
+    def resolve(self, rel_dir):
+        """Return (template, rule, folder template yang cocok relatif ke Master)."""
+        parts = _dir_parts(rel_dir)
+        node = self.root
+        best, depth = node["template"], 0
+        for i, part in enumerate(parts, 1):
+            node = node["children"].get(part)
+            if node is None:
+                break
+            if node["template"] is not None:
+                best, depth = node["template"], i
+        if best is None:
+            return self.fallback, RULE_FALLBACK, None
+        rule = RULE_EXACT if depth == len(parts) else RULE_ANCESTOR
+        return best, rule, "/".join(parts[:depth])
+
+
+def plan_auto_jobs(psd_masters, jpgs, master_dir, report=None):
+    """
+    Strategi mode otomatis (Smart Matching, per folder kelas): foto di folder X memakai template
+    di folder X yang sama di Master, atau di folder induk terdekat yang punya template,
+    selain itu template pertama secara umum.
+    Return list (rel_jpg, master_path, dst) untuk AutoCopyPool.run. Jika `report` berupa list,
+    diisi satu dict per folder foto: folder, template, rule, matched, photos.
+    """
+    trie = TemplateTrie(psd_masters)
+    resolved = {}  # folder foto -> entry laporan (satu resolve per folder, bukan per foto)
+    jobs = []
+    for _, rel_jpg in jpgs:
+        # rel_jpg example: "KELAS A/Anak1.jpg" -> "KELAS A"
+        jpg_dir = os.path.dirname(rel_jpg)
+        entry = resolved.get(jpg_dir)
+        if entry is None:
+            template, rule, matched = trie.resolve(jpg_dir)
+            entry = resolved[jpg_dir] = {"folder": jpg_dir.replace("\\", "/"), "template": template,
+                                         "rule": rule, "matched": matched, "photos": 0}
+            if report is not None:
+                report.append(entry)
+        entry["photos"] += 1
+
+        selected_master = entry["template"]
+        dst = None
+        if selected_master:
+            master_ext = os.path.splitext(selected_master)[1].lower()
+            tname = compute_target_name(os.path.basename(rel_jpg))
+            dst = os.path.join(master_dir, jpg_dir, f"{tname}{master_ext}")
+        jobs.append((rel_jpg, selected_master, dst))
+    return jobs
+
+
+def write_resolution_report(report, path=RESOLUTION_REPORT_FILE):
+    """Simpan laporan resolusi template (JSON) untuk dicek operator; gagal tulis tidak fatal."""
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"type": "bucin_resolution", "folders": report}, f, ensure_ascii=False, indent=1)
+        return path
+    except Exception:
+        return None
+
+
+def _env_workers():
+    try:
+        return max(1, int(os.environ.get("BMACHINE_COPY_WORKERS", "")))
+    except ValueError:
+        return DEFAULT_WORKERS
+
+
+class AutoCopyPool:
+    """
+    Pemakaian:
+        pool = AutoCopyPool()
+        logs = pool.run(jobs, is_cancelled)   # blocking; jalankan di thread non-UI
+        # thread UI: pool.done, pool.total, pool.last dibaca berkala
+
+    `jobs` berisi (rel_jpg, master_path, dst) berurutan; master_path None = tidak ada master.
+    Hasil berupa list log (status, rel_jpg, detail) sesuai urutan jobs; file yang belum
+    diproses karena dibatalkan tidak ikut. `on_result(log)` (opsional) dipanggil per file
+    begitu selesai, dari thread worker.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = max(1, int(workers or _env_workers()))
+        self.total = 0
+        self.done = 0
+        self.last = ""
+        self._lock = threading.Lock()
+        self._made_dirs = set()
+
+    def run(self, jobs, is_cancelled=lambda: False, on_result=None):
+        jobs = list(jobs)
+        self.total = len(jobs)
+        self.done = 0
+        logs = [None] * len(jobs)
+        todo = []
+        claimed = set()
+        for i, (rel_jpg, master, dst) in enumerate(jobs):
+            if not master:
+                logs[i] = ("FAIL", rel_jpg, "No Master PSD found")
+            elif os.path.normcase(dst) in claimed:
+                # Nama target sama di folder yang sama: yang pertama menang, sama seperti urutan lama
+                logs[i] = ("EXIST", rel_jpg, "Sudah ada")
+            else:
+                claimed.add(os.path.normcase(dst))
+                todo.append(i)
+                continue
+            self.done += 1
+            if on_result:
+                on_result(logs[i])
+
+        it = iter(todo)
+
+        def worker():
+            while not is_cancelled():
+                with self._lock:
+                    i = next(it, None)
+                if i is None:
+                    return
+                rel_jpg = jobs[i][0]
+                logs[i] = self._copy(*jobs[i])
+                with self._lock:
+                    self.done += 1
+                    self.last = rel_jpg
+                    if on_result:
+                        on_result(logs[i])
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.workers, len(todo)))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return [log for log in logs if log is not None]
+
+    def _copy(self, rel_jpg, master, dst):
+        try:
+            tdir = os.path.dirname(dst)
+            if tdir not in self._made_dirs:
+                os.makedirs(tdir, exist_ok=True)
+                self._made_dirs.add(tdir)
+            if os.path.exists(dst):
+                return ("EXIST", rel_jpg, "Sudah ada")
+            shutil.copy2(master, dst)
+            return ("OK", rel_jpg, f"Sukses -> {os.path.basename(master)}")
+        except Exception as e:
+            return ("FAIL", rel_jpg, str(e))
+
+
+# ---------- Headless (tanpa GUI) ----------
+def _emit(event, **data):
+    print(json.dumps(dict(event=event, **data)), flush=True)
+
+
+def headless_main(argv=None):
+    """
+    psdbucin_v3.py --headless --master <folder master> --pilihan <folder foto> [--workers N]
+    Menjalankan mode otomatis dan menulis NDJSON: start, resolve (per folder foto), file (per foto),
+    summary / error.
+    Exit code 0 jika tidak ada yang gagal.
+    """
+    parser = argparse.ArgumentParser(description="PSD Bucin mode otomatis tanpa GUI")
+    parser.add_argument('--headless', action='store_true')
+    parser.add_argument('--master', required=True, help='Folder Master (PSD)')
+    parser.add_argument('--pilihan', required=True, help='Folder Foto (JPG)')
+    parser.add_argument('--workers', type=int, default=None, help='Jumlah thread salin')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    for label, path in (("Master", args.master), ("Foto", args.pilihan)):
+        if not os.path.isdir(path):
+            _emit("error", message=f"Folder {label} tidak valid: {path}")
+            return 2
+    psd_masters = collect_psd_masters(args.master)
+    if not psd_masters:
+        _emit("error", message="Tidak ditemukan file PSD di folder Master.")
+        return 2
+    jpgs = collect_jpgs_with_relpath(args.pilihan)
+    if not jpgs:
+        _emit("error", message="Tidak ditemukan file JPG di folder Foto.")
+        return 2
+
+    pool = AutoCopyPool(args.workers)
+    _emit("start", total=len(jpgs), masters=len(psd_masters), workers=pool.workers)
+    report = []
+    jobs = plan_auto_jobs(psd_masters, jpgs, args.master, report)
+    for entry in report:
+        _emit("resolve", **entry)
+    report_file = write_resolution_report(report)
+
+    def on_result(log):
+        # Dipanggil di bawah lock pool: baris NDJSON tidak pernah tercampur
+        _emit("file", status=log[0], file=log[1], detail=log[2], done=pool.done, total=pool.total)
+
+    logs = pool.run(jobs, on_result=on_result)
+    counts = {status: sum(1 for log in logs if log[0] == status) for status in ("OK", "EXIST", "FAIL")}
+    _emit("summary", total=len(logs), ok=counts["OK"], exist=counts["EXIST"], fail=counts["FAIL"],
+          elapsed_s=round(time.perf_counter() - started, 3), report=report_file)
+    return 1 if counts["FAIL"] else 0
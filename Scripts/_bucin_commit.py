@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+_bucin_commit.py
+- Antrean salin (commit) untuk mode manual psdbucin: pilihan master langsung masuk antrean dan
+  UI lanjut ke foto berikutnya, penyalinan ke NAS berjalan di thread terpisah.
+- Satu writer, urutan job = urutan pilihan user, jadi dua foto dengan nama target sama tetap
+  "yang pertama menang" (yang kedua tercatat EXIST) seperti sebelumnya.
+- Kedalaman dibatasi (max_pending): jika NAS tertinggal terlalu jauh, UI menahan input sampai
+  ada slot kosong. Hasil diambil dari thread UI lewat poll().
+"""
+
+import queue
+import threading
+
+DEFAULT_MAX_PENDING = 8
+
+_STOP = object()
+
+
+class CommitQueue:
+    def __init__(self, write, max_pending=DEFAULT_MAX_PENDING):
+        self.write = write              # fn(job) -> (status, file, detail)
+        self.max_pending = max(1, int(max_pending))
+        self.pending = 0                # hanya diubah dari thread UI (submit/poll)
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, job):
+        self.pending += 1
+        self._jobs.put(job)
+
+    def full(self):
+        return self.pending >= self.max_pending
+
+    def poll(self):
+        """List (job, log) yang sudah selesai sejak poll terakhir."""
+        done = []
+        while True:
+            try:
+                done.append(self._results.get_nowait())
+            except queue.Empty:
+                break
+        self.pending -= len(done)
+        return done
+
+    def close(self, timeout=None):
+        """Tunggu job yang masih antre selesai (maks `timeout` detik), lalu hentikan writer."""
+        self._jobs.put(_STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is _STOP:
+                return
+            try:
+                log = self.write(job)
+            except Exception as e:
+                log = ("FAIL", str(job), str(e))
+            self._results.put((job, log))
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+_bucin_preview.py
+- Decode foto untuk preview psdbucin (mode manual) tanpa decode resolusi penuh.
+- JPEG memakai draft mode PIL (scaling 1/2, 1/4, 1/8 langsung di domain DCT), jadi foto
+  24 MP cukup di-decode sebesar canvas (~900px), bukan 6000px lalu di-resize.
+- Thumbnail EXIF (biasanya 160px, sudah ada di header file) dipakai untuk first paint instan.
+- Hasil decode disimpan per tier ukuran di cache disk (_thumb_cache), jadi membuka folder yang
+  sama lagi tidak perlu decode foto asli dari share.
+"""
+
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import ExifTags, Image
+
+from _thumb_cache import GRID_TIER, pick_tier, shared_cache
+
+# Foto landscape dengan rasio di bawah ini dianggap potret yang tersimpan miring -> diputar 90°
+PORTRAIT_FIX_RATIO = 1.35
+
+_ORIENTATION_TAG = 0x0112
+_THUMB_OFFSET_TAG = 0x0201
+_THUMB_LENGTH_TAG = 0x0202
+
+# Kualitas JPEG untuk preview yang disimpan di cache
+CACHE_QUALITY = 85
+
+# Orientation EXIF -> transpose (sama dengan ImageOps.exif_transpose)
+_ORIENTATION_METHOD = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def _needs_portrait_fix(width, height):
+    return width > height and (width / float(height)) < PORTRAIT_FIX_RATIO
+
+
+def _oriented_size(size, orientation, smart_rotate):
+    w, h = size
+    if orientation in (5, 6, 7, 8):
+        w, h = h, w
+    if smart_rotate and _needs_portrait_fix(w, h):
+        w, h = h, w
+    return w, h
+
+
+def fit_size(image_size, box_size):
+    """Ukuran (w, h) agar image_size muat di box_size dengan rasio tetap (tidak diperbesar dari 0)."""
+    iw, ih = image_size
+    bw, bh = box_size
+    ratio = min(bw / float(iw), bh / float(ih))
+    return max(1, int(iw * ratio)), max(1, int(ih * ratio))
+
+
+def _apply_orientation(img, orientation, smart_rotate):
+    method = _ORIENTATION_METHOD.get(orientation)
+    if method is not None:
+        img = img.transpose(method)
+    if smart_rotate and _needs_portrait_fix(img.width, img.height):
+        img = img.transpose(Image.Transpose.ROTATE_90)
+    return img
+
+
+def exif_thumbnail(path, smart_rotate=False):
+    """
+    Thumbnail JPEG yang tertanam di EXIF (IFD1), sudah diputar sesuai orientasi foto.
+    Return None jika tidak ada / tidak bisa dibaca. Tidak men-decode foto utama.
+    """
+    try:
+        with Image.open(path) as im:
+            raw = im.info.get("exif")
+            if not raw:
+                return None
+            exif = im.getexif()
+            orientation = exif.get(_ORIENTATION_TAG, 1)
+            data = None
+            # Offset IFD1 relatif terhadap header TIFF (setelah "Exif\0\0")
+            tiff = raw[6:] if raw.startswith(b"Exif\x00\x00") else raw
+            try:
+                ifd1 = exif.get_ifd(ExifTags.IFD.IFD1)
+                offset, length = ifd1.get(_THUMB_OFFSET_TAG), ifd1.get(_THUMB_LENGTH_TAG)
+                if offset and length:
+                    data = tiff[offset:offset + length]
+            except (AttributeError, KeyError):
+                pass
+            if not data:
+                # Pillow lama: cari SOI JPEG kedua di dalam blok EXIF
+                start = tiff.find(b"\xff\xd8\xff", 8)
+                end = tiff.rfind(b"\xff\xd9")
+                if start < 0 or end <= start:
+                    return None
+                data = tiff[start:end + 2]
+        thumb = Image.open(io.BytesIO(data))
+        thumb.load()
+        return _apply_orientation(thumb.convert("RGB"), orientation, smart_rotate)
+    except Exception:
+        return None
+
+
+def _decode(path, box_size, smart_rotate):
+    im = Image.open(path)
+    full_size = im.size
+    orientation = im.getexif().get(_ORIENTATION_TAG, 1)
+    if im.format == "JPEG":
+        ow, oh = _oriented_size(full_size, orientation, smart_rotate)
+        scale = min(1.0, box_size[0] / float(ow), box_size[1] / float(oh))
+        if scale < 1.0:
+            # Draft memilih skala DCT terkecil yang hasilnya masih >= ukuran yang diminta
+            im.draft("RGB", (math.ceil(full_size[0] * scale), math.ceil(full_size[1] * scale)))
+    im.load()
+    reduced = im.size != full_size
+    return _apply_orientation(im, orientation, smart_rotate), reduced
+
+
+def open_preview(path, box_size, smart_rotate=False, cache=None):
+    """
+    Buka foto untuk ditampilkan di box_size (w, h) canvas.
+    Return (image, reduced): image sudah diputar (EXIF + smart rotate opsional);
+    reduced=True jika di-decode lebih kecil dari resolusi asli (perlu decode ulang kalau canvas membesar).
+    Dengan `cache` (ThumbCache), hasil dibaca/disimpan seukuran tier terkecil yang menutupi box.
+    """
+    tier = pick_tier(box_size) if cache is not None else None
+    if tier is None:
+        return _decode(path, box_size, smart_rotate)
+    st = os.stat(path)
+    variant = "smart" if smart_rotate else ""
+    data = cache.get(path, st, tier, variant)
+    if data is not None:
+        try:
+            img = Image.open(io.BytesIO(data))
+            img.load()
+            return img, True
+        except Exception:
+            pass  # Entry rusak: decode ulang dan timpa
+    img, reduced = _decode(path, (tier, tier), smart_rotate)
+    if max(img.size) > tier:
+        img = img.resize(fit_size(img.size, (tier, tier)), Image.Resampling.LANCZOS)
+        reduced = True
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=CACHE_QUALITY)
+    cache.put(path, st, tier, buf.getvalue(), variant)
+    return img, reduced
+
+
+def grid_thumbnail(path, smart_rotate=False):
+    """Thumbnail kecil untuk grid view (cache yang sama dengan preview canvas)."""
+    img, _ = open_preview(path, (GRID_TIER, GRID_TIER), smart_rotate=smart_rotate, cache=shared_cache())
+    return img
+
+
+class PreviewPrefetcher:
+    """
+    Decode-ahead untuk mode manual: worker thread menyiapkan K foto berikutnya (draft decode +
+    fit ke canvas) di LRU terbatas, jadi pindah foto cukup membuat PhotoImage dari hasil jadi.
+    Foto sebelumnya tetap disimpan untuk navigasi balik. Ukuran canvas berubah -> hasil lama
+    dibuang dan decode yang sedang jalan diabaikan.
+    """
+
+    def __init__(self, paths, ahead=3, capacity=6, smart_rotate=False, cache=None):
+        self.paths = list(paths)
+        self.ahead = max(1, int(ahead))
+        self.capacity = max(self.ahead + 2, int(capacity))
+        self.smart_rotate = smart_rotate
+        self.disk_cache = cache
+        self._cache = OrderedDict()   # idx -> (image, reduced)
+        self._cond = threading.Condition()
+        self._box = None
+        self._generation = 0
+        self._current = -1
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def set_box(self, box):
+        """Ukuran canvas (w, h) target. Berubah -> cache dikosongkan & antrean dimulai ulang."""
+        box = (int(box[0]), int(box[1]))
+        with self._cond:
+            if box == self._box:
+                return
+            self._box = box
+            self._generation += 1
+            self._cache.clear()
+            self._cond.notify()
+
+    def request(self, idx):
+        """Foto aktif sekarang idx: siapkan idx+1..idx+K, simpan idx-1, buang sisanya."""
+        with self._cond:
+            self._current = idx
+            keep = self._wanted(idx) | {idx, idx - 1}
+            for key in [k for k in self._cache if k not in keep]:
+                del self._cache[key]
+            self._cond.notify()
+
+    def get(self, idx, box):
+        """(image, reduced) siap pakai untuk foto idx di canvas box, atau None jika belum ada."""
+        with self._cond:
+            if (int(box[0]), int(box[1])) != self._box:
+                return None
+            hit = self._cache.get(idx)
+            if hit is not None:
+                self._cache.move_to_end(idx)
+            return hit
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cache.clear()
+            self._cond.notify()
+
+    def _wanted(self, idx):
+        return {i for i in range(idx + 1, idx + 1 + self.ahead) if 0 <= i < len(self.paths)}
+
+    def _next_job(self):
+        # Dipanggil dengan lock: foto terdekat yang belum siap lebih dulu
+        if self._box is None:
+            return None
+        for i in sorted(self._wanted(self._current)):
+            if i not in self._cache:
+                return i
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and self._next_job() is None:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                idx = self._next_job()
+                box, generation = self._box, self._generation
+            try:
+                img, reduced = open_preview(self.paths[idx], box, smart_rotate=self.smart_rotate,
+                                           cache=self.disk_cache)
+                img = img.resize(fit_size(img.size, box), Image.Resampling.LANCZOS)
+                img.load()
+                entry = (img, reduced)
+            except Exception:
+                entry = None
+            with self._cond:
+                if generation != self._generation or self._closed:
+                    continue  # Canvas berubah saat decode: hasil dibuang
+                if entry is None or idx not in self._wanted(self._current) | {self._current}:
+                    # Gagal decode / sudah lewat: tandai supaya tidak diulang terus
+                    if entry is None:
+                        self._cache[idx] = None
+                    continue
+                self._cache[idx] = entry
+                while len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
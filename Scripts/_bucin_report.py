@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+_bucin_report.py
+- Indeks laporan psdbucin (self.logs: list (status, file, detail)) untuk layar laporan.
+- Dibangun sekali dalam satu pass: jumlah per status, daftar index per status, dan teks
+  pencarian (lowercase). Filter/cari hanya menghasilkan list index, baris tidak disalin.
+- Layar laporan menampilkan satu halaman (page) saja, jadi 10k+ baris tidak dimasukkan ke
+  Treeview sekaligus.
+- Ekspor CSV/JSON langsung dari logs di memori (sesuai filter yang aktif).
+"""
+
+import csv
+import json
+
+STATUSES = ("OK", "SKIP", "FAIL", "EXIST")
+PAGE_SIZE = 200
+
+
+class ReportIndex:
+    def __init__(self, logs):
+        self.logs = logs
+        self.counts = dict.fromkeys(STATUSES, 0)
+        self.by_status = {s: [] for s in STATUSES}
+        self._search = []
+        for i, (status, f, det) in enumerate(logs):
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.by_status.setdefault(status, []).append(i)
+            self._search.append(f"{f}\n{det}".lower())
+
+    def query(self, status=None, text=""):
+        """List index logs yang cocok dengan status (None = semua) dan teks (file/detail)."""
+        rows = self.by_status.get(status, []) if status else range(len(self.logs))
+        text = text.strip().lower()
+        if not text:
+            return list(rows)
+        return [i for i in rows if text in self._search[i]]
+
+    def page(self, rows, page_no, size=PAGE_SIZE):
+        """Baris logs untuk halaman page_no (mulai 0) dari hasil query."""
+        return [self.logs[i] for i in rows[page_no * size:(page_no + 1) * size]]
+
+    def export_csv(self, path, rows=None):
+        rows = range(len(self.logs)) if rows is None else rows
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(["status", "file", "detail"])
+            for i in rows:
+                w.writerow(self.logs[i])
+
+    def export_json(self, path, rows=None):
+        rows = range(len(self.logs)) if rows is None else rows
+        data = [{"status": s, "file": f, "detail": d} for s, f, d in (self.logs[i] for i in rows)]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"counts": self.counts, "entries": data}, f, ensure_ascii=False, indent=1)
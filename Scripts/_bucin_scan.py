@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+_bucin_scan.py
+- Scan folder Master/Foto psdbucin di background untuk layar setup.
+- Input di-debounce (ketik path / drop berturut-turut hanya memicu satu scan), scan lama yang
+  sudah tidak relevan dibatalkan, dan hasil per folder di-cache supaya prepare_data tidak
+  me-walk tree yang sama lagi.
+- Thread scan tidak menyentuh Tk: hasil dikirim lewat antrean dan diambil dengan widget.after().
+"""
+
+import os
+import queue
+import threading
+
+DEBOUNCE_MS = 300
+POLL_MS = 50
+
+
+class FolderScanService:
+    """
+    Pemakaian:
+        scan = FolderScanService(root, {"master": collect_psd_masters, "pilihan": collect_jpgs}, on_done)
+        scan.request({"master": m, "pilihan": p})   # debounce, lalu scan yang belum ada di cache
+        on_done(results)                            # dict kind -> list | Exception (di thread Tk)
+        scan.result("master", m)                    # hasil cache, atau None
+
+    Fungsi scan dipanggil `fn(path, cancelled)` dan boleh return None jika `cancelled()` True.
+    """
+
+    def __init__(self, widget, scanners, on_done, delay_ms=DEBOUNCE_MS):
+        self.widget = widget
+        self.scanners = scanners
+        self.on_done = on_done
+        self.delay_ms = delay_ms
+        self._cache = {}          # (kind, normcase path) -> list
+        self._results = queue.Queue()
+        self._errors = {}
+        self._generation = 0
+        self._cancel = None       # Event untuk scan yang sedang jalan
+        self._pending = None      # id after() debounce
+        self._polling = None
+        self._closed = False
+
+    @staticmethod
+    def _key(kind, path):
+        return kind, os.path.normcase(os.path.abspath(path))
+
+    def result(self, kind, path):
+        return self._cache.get(self._key(kind, path))
+
+    def request(self, paths):
+        """Jadwalkan scan untuk dict kind -> path; permintaan sebelumnya yang belum jalan dibatalkan."""
+        if self._closed:
+            return
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+        self._pending = self.widget.after(self.delay_ms, lambda: self._start(dict(paths)))
+
+    def cancel(self):
+        """Batalkan permintaan yang belum jalan dan scan yang sedang jalan (cache tetap)."""
+        self._generation += 1
+        if self._cancel is not None:
+            self._cancel.set()
+        for job in (self._pending, self._polling):
+            if job is not None:
+                try:
+                    self.widget.after_cancel(job)
+                except Exception:
+                    pass
+        self._pending = self._polling = None
+
+    def close(self):
+        self._closed = True
+        self.cancel()
+
+    def _start(self, paths):
+        self._pending = None
+        self._generation += 1
+        self._errors = {}
+        if self._cancel is not None:
+            self._cancel.set()
+        if self._polling is not None:
+            self.widget.after_cancel(self._polling)
+            self._polling = None
+        missing = {kind: path for kind, path in paths.items() if self._key(kind, path) not in self._cache}
+        if not missing:
+            self._finish(paths)
+            return
+        cancel = self._cancel = threading.Event()
+        generation = self._generation
+        threading.Thread(target=self._run, args=(generation, cancel, missing), daemon=True).start()
+        self._polling = self.widget.after(POLL_MS, lambda: self._poll(paths, generation))
+
+    def _run(self, generation, cancel, missing):
+        for kind, path in missing.items():
+            if cancel.is_set():
+                return
+            try:
+                if not os.path.isdir(path):
+                    raise NotADirectoryError(path)
+                found = self.scanners[kind](path, cancel.is_set)
+            except Exception as e:
+                found = e
+            if found is None or cancel.is_set():
+                return
+            self._results.put((generation, kind, path, found))
+        self._results.put((generation, None, None, None))
+
+    def _poll(self, paths, generation):
+        self._polling = None
+        if self._closed:
+            return
+        complete = False
+        while True:
+            try:
+                gen, kind, path, found = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if kind is None:
+                complete = complete or gen == generation
+            elif isinstance(found, Exception):
+                if gen == generation:
+                    self._errors[kind] = found
+            else:
+                # Hasil scan generasi lama yang sempat selesai tetap valid untuk path-nya
+                self._cache[self._key(kind, path)] = found
+        if complete:
+            self._finish(paths)
+        else:
+            self._polling = self.widget.after(POLL_MS, lambda: self._poll(paths, generation))
+
+    def _finish(self, paths):
+        results = {}
+        for kind, path in paths.items():
+            error = self._errors.get(kind)
+            results[kind] = error if error is not None else self.result(kind, path)
+        self.on_done(results)
@@ -0,0 +1,586 @@
+# -*- coding: utf-8 -*-
+"""
+_dma_crypto.py
+- Format enkripsi file .dma untuk folder_locker_v2.py dan folder_locker_py_side_6.py.
+- DMA3: container streaming berisi chunk AES-256-GCM yang masing-masing diautentikasi,
+  jadi lock/unlock berjalan dengan memori konstan (satu chunk), termasuk file PSB multi-GB.
+- Nonce per chunk = prefix acak (7 byte) + index chunk (4 byte) + flag chunk terakhir (1 byte)
+  dan header ikut sebagai AAD: chunk yang ditukar urutannya, dihapus, atau file yang dipotong
+  gagal diautentikasi.
+- Kunci: PBKDF2 (200k iterasi) hanya sekali per sesi lock/unlock (SessionKeys, satu salt sesi),
+  kunci tiap file = HKDF(master, file_id acak di header). Folder berisi ribuan JPG kecil tidak lagi
+  menghabiskan waktu di KDF, kekuatan terhadap tebakan password tetap sama (PBKDF2 per salt).
+- Kompresi adaptif: beberapa sampel dari chunk pertama dicoba dikompres (zlib level 1); file
+  yang tidak mengecil (JPEG, PSD terkompresi, video) disimpan raw, jadi lock folder foto hampir
+  secepat AES saja. Codec dicatat di header (raw / zlib / zstd jika paket zstandard terpasang).
+- Preview opsional (JPEG kecil, lihat _dma_preview) disimpan terenkripsi tepat setelah header,
+  jadi isi folder terkunci bisa dilihat dengan membaca beberapa KB per file (read_preview)
+  tanpa mendekripsi payload.
+- Random access tanpa unlock: open_dma() / DmaReader memberi file-like read-only yang bisa di-seek
+  (PIL, _psd_catalog, hash_stream); hanya chunk yang disentuh yang didekripsi, beberapa chunk
+  terakhir di-cache di memori. Tidak ada plaintext yang ditulis ke disk.
+- DMA1/DMA2 (satu pesan AES-GCM untuk seluruh file) tetap bisa dibuka.
+
+Layout DMA3:
+    header : "DMA3" | version u8 | flags u8 | kdf u8 | features u8 | chunk_size u32 | salt 16 | nonce_prefix 7
+             [| file_id 16   jika kdf = KDF_SESSION]
+    preview: ct_len u32 | ciphertext+tag                   jika features & FEATURE_PREVIEW
+    chunk  : ct_len u32 | ciphertext+tag (ct_len byte)    ... diulang sampai chunk final
+"""
+
+import hashlib
+import io
+import os
+import secrets
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+LEGACY_MAGICS = (b"DMA1", b"DMA2")
+MAGIC = b"DMA3"
+VERSION = 1
+
+SALT_SIZE = 16
+NONCE_SIZE = 12
+NONCE_PREFIX_SIZE = 7
+FILE_ID_SIZE = 16
+
+# File sementara: selalu ditulis ke <tujuan>.dmapart lalu di-rename. Sisa .dmapart berarti proses
+# terhenti di tengah file dan aman dihapus saat mulai (file tujuan belum pernah ada/utuh).
+PART_SUFFIX = ".dmapart"
+TAG_SIZE = 16
+ITERATIONS = 200_000
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# chunk_size dibaca dari header sebelum diautentikasi: di luar 1..MAX_CHUNK_SIZE -> file ditolak
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# flags & CODEC_MASK = codec payload chunk
+CODEC_MASK = 0x03
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {CODEC_RAW: "raw", CODEC_ZLIB: "zlib", CODEC_ZSTD: "zstd"}
+
+# Kompresi adaptif: SAMPLE_COUNT potongan SAMPLE_SIZE dari chunk pertama; dikompres hanya jika
+# hasil trial <= COMPRESS_RATIO dari ukuran aslinya
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_COUNT = 3
+COMPRESS_RATIO = 0.9
+KDF_PBKDF2 = 0              # kunci file = PBKDF2(password, salt)
+KDF_SESSION = 1             # kunci file = HKDF(PBKDF2(password, salt sesi), file_id)
+
+# DmaReader: jumlah chunk plaintext yang disimpan di memori (LRU)
+DEFAULT_CACHE_CHUNKS = 4
+
+# features: blok tambahan setelah header (bit yang tidak dikenal -> file ditolak)
+FEATURE_PREVIEW = 0x01
+MAX_PREVIEW_SIZE = 1024 * 1024
+
+_HEADER = struct.Struct(">4sBBBBI")
+_CT_LEN = struct.Struct(">I")
+_NONCE_TAIL = struct.Struct(">IB")
+# Nonce preview: index di luar jangkauan chunk biasa dan flag 2 (chunk hanya memakai 0/1)
+_PREVIEW_NONCE_TAIL = _NONCE_TAIL.pack(0xFFFFFFFF, 2)
+HEADER_SIZE = _HEADER.size + SALT_SIZE + NONCE_PREFIX_SIZE
+
+PathLike = Union[str, Path]
+
+
+def derive_key(password: str, salt: bytes) -> bytes:
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=ITERATIONS)
+    return kdf.derive(password.encode("utf-8"))
+
+
+class SessionKeys:
+    """
+    Kunci untuk satu sesi lock/unlock (satu password).
+    - File baru memakai salt sesi yang sama; master key (PBKDF2) diturunkan sekali.
+    - Saat unlock, master key di-cache per salt, jadi file dari sesi lock yang sama hanya
+      memicu satu PBKDF2. Aman dipakai dari banyak thread.
+    """
+
+    def __init__(self, password: str):
+        self._password = password
+        self.salt = secrets.token_bytes(SALT_SIZE)
+        self._masters = {}
+        self._lock = threading.Lock()
+
+    def master(self, salt: bytes) -> bytes:
+        with self._lock:
+            key = self._masters.get(salt)
+            if key is None:
+                key = self._masters[salt] = derive_key(self._password, salt)
+            return key
+
+    def subkey(self, salt: bytes, info: bytes) -> bytes:
+        hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info)
+        return hkdf.derive(self.master(salt))
+
+    def file_key(self, salt: bytes, file_id: bytes) -> bytes:
+        return self.subkey(salt, b"DMA3 file key" + file_id)
+
+
+def _session(keys: Union[str, SessionKeys]) -> SessionKeys:
+    return keys if isinstance(keys, SessionKeys) else SessionKeys(keys)
+
+
+def _chunk_nonce(prefix: bytes, index: int, final: bool) -> bytes:
+    if index > 0xFFFFFFFF:
+        raise ValueError("File terlalu besar untuk ukuran chunk ini")
+    return prefix + _NONCE_TAIL.pack(index, 1 if final else 0)
+
+
+def preferred_codec() -> int:
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def pick_codec(first_chunk: bytes) -> int:
+    """Codec untuk satu file dari chunk pertamanya: CODEC_RAW jika data tidak bisa dikompres."""
+    n = len(first_chunk)
+    if n < 512:
+        return CODEC_RAW
+    if n <= SAMPLE_SIZE * SAMPLE_COUNT:
+        sample = first_chunk
+    else:
+        # Awal, tengah, akhir: header file (EXIF, resource PSD) sering kompresibel walau isinya tidak
+        step = (n - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+        sample = b"".join(first_chunk[i * step:i * step + SAMPLE_SIZE] for i in range(SAMPLE_COUNT))
+    if len(zlib.compress(sample, 1)) <= len(sample) * COMPRESS_RATIO:
+        return preferred_codec()
+    return CODEC_RAW
+
+
+def _compressor(codec: int):
+    if codec == CODEC_ZLIB:
+        return lambda data: zlib.compress(data, 6)
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress
+    return lambda data: data
+
+
+def _decompressor(codec: int, chunk_size: int):
+    if codec == CODEC_ZLIB:
+        return zlib.decompress
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("File .dma dikompres zstd: pip install zstandard")
+        dctx = zstandard.ZstdDecompressor()
+        return lambda data: dctx.decompress(data, max_output_size=chunk_size)
+    if codec == CODEC_RAW:
+        return lambda data: data
+    raise ValueError("Codec .dma tidak didukung")
+
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("File .dma terpotong")
+    return data
+
+
+# ---------------- DMA3 (streaming) ----------------
+
+def encrypt_stream(fin: BinaryIO, fout: BinaryIO, keys: Union[str, SessionKeys],
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, compress: Optional[bool] = None,
+                   salt: Optional[bytes] = None, file_id: Optional[bytes] = None,
+                   preview: Optional[bytes] = None) -> int:
+    """
+    `keys`: SessionKeys (dipakai ulang antar file) atau password (sesi sekali pakai).
+    `compress`: None = adaptif (pick_codec), True = selalu kompres, False = selalu raw.
+    `salt`/`file_id`: default salt sesi dan file_id acak (vault memakai salt miliknya sendiri).
+    `preview`: bytes JPEG kecil yang ikut disimpan (terenkripsi) setelah header.
+    Return codec yang dipakai.
+    """
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError("Ukuran chunk .dma tidak valid")
+    if preview is not None and len(preview) > MAX_PREVIEW_SIZE:
+        preview = None
+    keys = _session(keys)
+    salt = salt or keys.salt
+    file_id = file_id or secrets.token_bytes(FILE_ID_SIZE)
+    chunk = fin.read(chunk_size)
+    if compress is None:
+        codec = pick_codec(chunk)
+    else:
+        codec = preferred_codec() if compress else CODEC_RAW
+    pack = _compressor(codec)
+    prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    features = FEATURE_PREVIEW if preview else 0
+    header = _HEADER.pack(MAGIC, VERSION, codec, KDF_SESSION, features, chunk_size) + salt + prefix + file_id
+    aes = AESGCM(keys.file_key(salt, file_id))
+    fout.write(header)
+    if preview:
+        ct = aes.encrypt(prefix + _PREVIEW_NONCE_TAIL, preview, header)
+        fout.write(_CT_LEN.pack(len(ct)))
+        fout.write(ct)
+
+    # Baca satu chunk ke depan supaya chunk terakhir bisa ditandai final
+    index = 0
+    while True:
+        nxt = fin.read(chunk_size) if len(chunk) == chunk_size else b""
+        final = not nxt
+        payload = pack(chunk)
+        ct = aes.encrypt(_chunk_nonce(prefix, index, final), payload, header)
+        fout.write(_CT_LEN.pack(len(ct)))
+        fout.write(ct)
+        if final:
+            return codec
+        chunk = nxt
+        index += 1
+
+
+def _read_header(fin: BinaryIO, keys: SessionKeys, head: bytes):
+    """
+    Header DMA3 (4 byte magic sudah dibaca ke `head`). Posisi fin berakhir di awal chunk
+    pertama (blok preview dilewati). Return (header, flags, chunk_size, prefix, aes, preview_ct).
+    """
+    header = head + _read_exact(fin, HEADER_SIZE - 4)
+    _, version, flags, kdf, features, chunk_size = _HEADER.unpack(header[:_HEADER.size])
+    if version != VERSION or kdf not in (KDF_PBKDF2, KDF_SESSION) or features & ~FEATURE_PREVIEW:
+        raise ValueError("Versi .dma tidak didukung")
+    if not 0 < chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError("Header .dma rusak (ukuran chunk tidak valid)")
+    salt = header[_HEADER.size:_HEADER.size + SALT_SIZE]
+    prefix = header[_HEADER.size + SALT_SIZE:HEADER_SIZE]
+    if kdf == KDF_SESSION:
+        file_id = _read_exact(fin, FILE_ID_SIZE)
+        header += file_id
+        aes = AESGCM(keys.file_key(salt, file_id))
+    else:
+        aes = AESGCM(keys.master(salt))
+    preview_ct = None
+    if features & FEATURE_PREVIEW:
+        (ct_len,) = _CT_LEN.unpack(_read_exact(fin, _CT_LEN.size))
+        if ct_len < TAG_SIZE or ct_len > MAX_PREVIEW_SIZE + TAG_SIZE:
+            raise ValueError("Preview .dma rusak")
+        preview_ct = _read_exact(fin, ct_len)
+    return header, flags, chunk_size, prefix, aes, preview_ct
+
+
+def decrypt_stream(fin: BinaryIO, fout: BinaryIO, keys: Union[str, SessionKeys]) -> None:
+    keys = _session(keys)
+    head = _read_exact(fin, 4)
+    if head in LEGACY_MAGICS:
+        # DMA1/DMA2: satu pesan utuh, memori ~ ukuran file (format lama)
+        fout.write(_decrypt_legacy(head + fin.read(), keys))
+        return
+    if head != MAGIC:
+        raise ValueError("File bukan format .dma yang valid")
+    header, flags, chunk_size, prefix, aes, _ = _read_header(fin, keys, head)
+    unpack = _decompressor(flags & CODEC_MASK, chunk_size)
+    max_ct = chunk_size + (chunk_size >> 8) + 1024 + TAG_SIZE  # batas aman zlib worst case
+
+    index = 0
+    while True:
+        raw_len = fin.read(_CT_LEN.size)
+        if not raw_len:
+            raise ValueError("File .dma terpotong (chunk terakhir hilang)")
+        if len(raw_len) != _CT_LEN.size:
+            raise ValueError("File .dma terpotong")
+        (ct_len,) = _CT_LEN.unpack(raw_len)
+        if ct_len < TAG_SIZE or ct_len > max_ct:
+            raise ValueError("Chunk .dma rusak")
+        ct = _read_exact(fin, ct_len)
+        # Chunk yang diakhiri EOF harus chunk final (nonce final): file yang dipotong setelah
+        # chunk biasa, atau ada data tambahan setelah chunk final, gagal diautentikasi
+        final = _at_eof(fin)
+        try:
+            payload = aes.decrypt(_chunk_nonce(prefix, index, final), ct, header)
+        except Exception:
+            raise ValueError("Password salah atau file .dma rusak/dimodifikasi")
+        fout.write(unpack(payload))
+        if final:
+            return
+        index += 1
+
+
+def read_preview(fin: BinaryIO, keys: Union[str, SessionKeys]) -> Optional[bytes]:
+    """
+    Preview JPEG yang tersimpan di file .dma (None jika tidak ada / format lama). Hanya header +
+    blok preview yang dibaca dan didekripsi, payload tidak disentuh.
+    """
+    head = _read_exact(fin, 4)
+    if head != MAGIC:
+        if head in LEGACY_MAGICS:
+            return None
+        raise ValueError("File bukan format .dma yang valid")
+    header, _, _, prefix, aes, preview_ct = _read_header(fin, _session(keys), head)
+    if preview_ct is None:
+        return None
+    try:
+        return aes.decrypt(prefix + _PREVIEW_NONCE_TAIL, preview_ct, header)
+    except Exception:
+        raise ValueError("Password salah atau file .dma rusak/dimodifikasi")
+
+
+class DmaReader(io.RawIOBase):
+    """
+    File-like read-only + seekable atas satu stream DMA3 (file .dma atau entry vault).
+    - Posisi plaintext p ada di chunk p // chunk_size, jadi seek cukup mencari offset chunk:
+      codec raw (foto/PSD, mayoritas file) dihitung langsung karena semua chunk sama panjang;
+      chunk terkompresi dicari dengan melompati header ct_len (4 byte per chunk, tanpa dekripsi).
+    - Chunk diautentikasi sama seperti decrypt_stream: chunk yang berakhir di ujung stream harus
+      chunk final, jadi file terpotong/ditambah tetap ketahuan.
+    - `fin` harus seekable; ditutup ikut close() jika closefd=True. Tidak thread-safe.
+    """
+
+    def __init__(self, fin: BinaryIO, keys: Union[str, SessionKeys],
+                 cache_chunks: int = DEFAULT_CACHE_CHUNKS, closefd: bool = False):
+        super().__init__()
+        self._f = fin
+        self._closefd = closefd
+        head = _read_exact(fin, 4)
+        if head != MAGIC:
+            raise ValueError("Random access hanya untuk format DMA3" if head in LEGACY_MAGICS
+                             else "File bukan format .dma yang valid")
+        self._header, flags, self._chunk_size, self._prefix, self._aes, _ = _read_header(fin, _session(keys), head)
+        codec = flags & CODEC_MASK
+        self._unpack = _decompressor(codec, self._chunk_size)
+        self._max_ct = self._chunk_size + (self._chunk_size >> 8) + 1024 + TAG_SIZE
+        self._start = fin.tell()
+        self._end = fin.seek(0, os.SEEK_END)
+        # Raw: jarak antar chunk tetap; selain itu offset yang sudah diketahui (diisi saat scan)
+        self._stride = _CT_LEN.size + self._chunk_size + TAG_SIZE if codec == CODEC_RAW else None
+        self._offsets = [self._start]
+        self._size = None
+        self._cache = OrderedDict()     # index chunk -> plaintext
+        self._cache_chunks = max(1, cache_chunks)
+        self._pos = 0
+
+    def _chunk_offset(self, index):
+        """Offset header chunk `index` di stream, None jika melewati chunk final."""
+        if self._stride is not None:
+            off = self._start + index * self._stride
+            return off if off < self._end else None
+        while len(self._offsets) <= index and self._offsets[-1] < self._end:
+            off = self._offsets[-1]
+            self._f.seek(off)
+            (ct_len,) = _CT_LEN.unpack(_read_exact(self._f, _CT_LEN.size))
+            if ct_len < TAG_SIZE or ct_len > self._max_ct:
+                raise ValueError("Chunk .dma rusak")
+            self._offsets.append(off + _CT_LEN.size + ct_len)
+        off = self._offsets[index] if index < len(self._offsets) else self._end
+        return off if off < self._end else None
+
+    def _chunk(self, index):
+        data = self._cache.get(index)
+        if data is not None:
+            self._cache.move_to_end(index)
+            return data
+        off = self._chunk_offset(index)
+        if off is None:
+            return b""
+        self._f.seek(off)
+        (ct_len,) = _CT_LEN.unpack(_read_exact(self._f, _CT_LEN.size))
+        if ct_len < TAG_SIZE or ct_len > self._max_ct:
+            raise ValueError("Chunk .dma rusak")
+        ct = _read_exact(self._f, ct_len)
+        final = off + _CT_LEN.size + ct_len == self._end
+        try:
+            data = self._unpack(self._aes.decrypt(_chunk_nonce(self._prefix, index, final), ct, self._header))
+        except Exception:
+            raise ValueError("Password salah atau file .dma rusak/dimodifikasi")
+        if final:
+            self._size = index * self._chunk_size + len(data)
+        elif len(data) != self._chunk_size:
+            raise ValueError("Chunk .dma rusak")
+        self._cache[index] = data
+        if len(self._cache) > self._cache_chunks:
+            self._cache.popitem(last=False)
+        return data
+
+    @property
+    def size(self) -> int:
+        """Ukuran plaintext (mendekripsi chunk final jika belum pernah dibaca)."""
+        if self._size is None:
+            if self._stride is not None:
+                last = max(0, (self._end - self._start - 1) // self._stride)
+            else:
+                self._chunk_offset(0xFFFFFFFF)
+                last = max(0, len(self._offsets) - 2)
+            self._chunk(last)
+            if self._size is None:
+                raise ValueError("File .dma terpotong (chunk terakhir hilang)")
+        return self._size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            pos += self._pos
+        elif whence == os.SEEK_END:
+            pos += self.size
+        elif whence != os.SEEK_SET:
+            raise ValueError("whence tidak valid")
+        if pos < 0:
+            raise ValueError("Posisi seek negatif")
+        self._pos = pos
+        return pos
+
+    def readinto(self, b) -> int:
+        out = memoryview(b).cast("B")
+        done = 0
+        while done < len(out):
+            index, skip = divmod(self._pos, self._chunk_size)
+            piece = self._chunk(index)[skip:skip + len(out) - done]
+            if not piece:
+                break
+            out[done:done + len(piece)] = piece
+            done += len(piece)
+            self._pos += len(piece)
+        return done
+
+    def close(self) -> None:
+        if not self.closed:
+            self._cache.clear()
+            if self._closefd:
+                self._f.close()
+        super().close()
+
+
+def open_dma(src: PathLike, keys: Union[str, SessionKeys],
+             cache_chunks: int = DEFAULT_CACHE_CHUNKS) -> BinaryIO:
+    """
+    Buka file .dma untuk dibaca langsung (tanpa unlock ke disk), mis. Image.open(open_dma(p, keys)).
+    DMA3 -> DmaReader (random access per chunk); DMA1/DMA2 lama didekripsi utuh ke memori.
+    """
+    fin = open(src, "rb")
+    try:
+        if fin.read(4) in LEGACY_MAGICS:
+            fin.seek(0)
+            with fin:
+                return io.BytesIO(_decrypt_legacy(fin.read(), _session(keys)))
+        fin.seek(0)
+        return DmaReader(fin, keys, cache_chunks, closefd=True)
+    except BaseException:
+        fin.close()
+        raise
+
+
+def _at_eof(f: BinaryIO) -> bool:
+    pos = f.tell()
+    if f.read(1):
+        f.seek(pos)
+        return False
+    return True
+
+
+# ---------------- DMA1 / DMA2 (lama) ----------------
+
+def _decrypt_legacy(blob: bytes, keys: SessionKeys) -> bytes:
+    if blob[:4] not in LEGACY_MAGICS or len(blob) < 4 + SALT_SIZE + NONCE_SIZE + TAG_SIZE:
+        raise ValueError("File bukan format .dma yang valid")
+    salt = blob[4:4 + SALT_SIZE]
+    nonce = blob[4 + SALT_SIZE:4 + SALT_SIZE + NONCE_SIZE]
+    ct = blob[4 + SALT_SIZE + NONCE_SIZE:]
+    aes = AESGCM(keys.master(salt))
+    return zlib.decompress(aes.decrypt(nonce, ct, None))
+
+
+# ---------------- API bytes (kompatibel dengan fungsi lama) ----------------
+
+def encrypt_bytes(data: bytes, keys: Union[str, SessionKeys]) -> bytes:
+    out = io.BytesIO()
+    encrypt_stream(io.BytesIO(data), out, keys)
+    return out.getvalue()
+
+
+def decrypt_bytes(blob: bytes, keys: Union[str, SessionKeys]) -> bytes:
+    out = io.BytesIO()
+    decrypt_stream(io.BytesIO(blob), out, keys)
+    return out.getvalue()
+
+
+# ---------------- hash konten (dedup vault, manifest lock) ----------------
+
+def content_hash():
+    return hashlib.blake2b(digest_size=32)
+
+
+def hash_stream(f: BinaryIO, block: int = DEFAULT_CHUNK_SIZE) -> str:
+    """Hash isi file-like dari posisi sekarang sampai habis (file biasa atau open_dma)."""
+    h = content_hash()
+    for data in iter(lambda: f.read(block), b""):
+        h.update(data)
+    return h.hexdigest()
+
+
+def hash_file(path: PathLike, block: int = DEFAULT_CHUNK_SIZE) -> str:
+    with open(path, "rb") as f:
+        return hash_stream(f, block)
+
+
+class HashingReader:
+    """Bungkus file input encrypt_stream: hash isi file dihitung sambil dibaca."""
+
+    def __init__(self, f: BinaryIO):
+        self._f = f
+        self.hash = content_hash()
+
+    def read(self, n: int = -1) -> bytes:
+        data = self._f.read(n)
+        self.hash.update(data)
+        return data
+
+
+# ---------------- API file ----------------
+
+def encrypt_file(src: PathLike, dst: PathLike, keys: Union[str, SessionKeys], **kwargs) -> None:
+    """Enkripsi src ke dst (DMA3). Ditulis ke dst.dmapart dulu, jadi dst tidak pernah setengah jadi."""
+    with open(src, "rb") as fin, atomic_output(dst) as fout:
+        encrypt_stream(fin, fout, keys, **kwargs)
+
+
+def read_preview_file(src: PathLike, keys: Union[str, SessionKeys]) -> Optional[bytes]:
+    with open(src, "rb") as fin:
+        return read_preview(fin, keys)
+
+
+def decrypt_file(src: PathLike, dst: PathLike, keys: Union[str, SessionKeys]) -> None:
+    """Dekripsi src (.dma DMA1/2/3) ke dst; gagal autentikasi -> dst tidak dibuat."""
+    with open(src, "rb") as fin, atomic_output(dst) as fout:
+        decrypt_stream(fin, fout, keys)
+
+
+@contextmanager
+def atomic_output(dst: PathLike, durable: bool = True):
+    """
+    File tujuan ditulis ke dst.dmapart lalu di-rename; jika gagal file sementara dihapus.
+    durable: fsync sebelum rename, supaya file asli baru dibuang setelah hasilnya benar-benar
+    tersimpan di disk (mati listrik tidak meninggalkan .dma kosong + file asli di Recycle Bin).
+    """
+    tmp = Path(f"{dst}{PART_SUFFIX}")
+    try:
+        with open(tmp, "wb") as fout:
+            yield fout
+            if durable:
+                fout.flush()
+                os.fsync(fout.fileno())
+        os.replace(tmp, dst)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+_dma_manifest.py
+- Manifest lock per folder (<folder>/.dmalock), dienkripsi dengan kunci sesi (SessionKeys):
+  path, size, mtime, dan hash BLAKE2b isi setiap file yang dikunci, plus size/mtime file .dma-nya.
+- Dipakai untuk lock/unlock ulang yang hanya menyentuh yang berubah:
+    LOCK   : file baru/berubah dienkripsi; file asli yang "kembali" (a.jpg di samping a.jpg.dma)
+             dan isinya sama dengan yang sudah terkunci cukup dibuang, tidak dienkripsi ulang.
+    UNLOCK : .dma yang file aslinya sudah ada dan sama cukup dihapus, tidak didekripsi ulang.
+- build_plan() hanya membaca stat hasil scandir (hash dihitung hanya jika size sama tapi mtime
+  beda), jadi ringkasan delta bisa ditampilkan sebelum proses dimulai.
+- lock_file menyimpan preview kecil (foto/PSD, _dma_preview) di header .dma untuk browse tanpa unlock.
+- Saat unlock, mtime file asli dikembalikan sesuai manifest supaya perbandingan berikutnya
+  cukup lewat stat.
+- Selama proses, setiap file yang selesai dikunci langsung dicatat ke journal
+  (<folder>/.dmalock.journal, satu baris terenkripsi per file, append-only). Jika aplikasi
+  ditutup/crash di tengah, LockManifest berikutnya memutar ulang journal ke manifest, jadi
+  lock ulang melanjutkan dari file terakhir yang selesai; sisa file sementara (*.dmapart)
+  masuk plan.partial dan dihapus sebelum mulai.
+
+Layout .dmalock:
+    "DMAM" | version u8 | reserved 3 | salt 16 | manifest_id 16 | nonce 12 | AES-GCM(zlib(JSON))
+Layout .dmalock.journal (teks, per baris):
+    {"salt": hex, "id": hex, "check": b64}      -> baris pertama (check = AES-GCM data kosong,
+                                                   untuk cek password sebelum replay)
+    b64(nonce 12 | AES-GCM(JSON {"rel", "e"}))  -> satu record; baris terpotong di akhir diabaikan
+"""
+
+import base64
+import json
+import os
+import secrets
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from _dma_crypto import (
+    FILE_ID_SIZE, NONCE_SIZE, PART_SUFFIX, SALT_SIZE,
+    HashingReader, SessionKeys, atomic_output, decrypt_file, encrypt_stream, hash_file, hash_stream, open_dma,
+)
+from _dma_preview import make_preview
+
+MANIFEST_NAME = ".dmalock"
+JOURNAL_NAME = MANIFEST_NAME + ".journal"
+MANIFEST_MAGIC = b"DMAM"
+MANIFEST_VERSION = 1
+
+_MHEADER = struct.Struct(">4sB3x")
+_MHEADER_SIZE = _MHEADER.size + SALT_SIZE + FILE_ID_SIZE
+
+# Journal di-fsync paling sering sekali per interval ini (flush tetap per record)
+JOURNAL_SYNC_INTERVAL = 1.0
+
+# File milik locker sendiri, tidak pernah dikunci
+INTERNAL_SUFFIXES = (PART_SUFFIX, ".dmav", ".dmav.journal")
+
+
+def is_internal(name):
+    return name in (MANIFEST_NAME, JOURNAL_NAME) or name.endswith(INTERNAL_SUFFIXES)
+
+
+class LockManifest:
+    def __init__(self, folder, keys):
+        self.folder = Path(folder)
+        self.path = self.folder / MANIFEST_NAME
+        self.journal_path = self.folder / JOURNAL_NAME
+        self.keys = keys if isinstance(keys, SessionKeys) else SessionKeys(keys)
+        self.entries = {}       # rel file asli (posix) -> dict
+        self._dirty = False
+        self._journal = None    # (file, AESGCM) journal yang sedang ditulis
+        self._synced = 0.0
+        self.recovered = 0      # record yang dipulihkan dari journal proses sebelumnya
+        if self.path.exists():
+            self._load()
+        if self.journal_path.exists():
+            self._replay()
+
+    def _aes(self, salt, manifest_id):
+        return AESGCM(self.keys.subkey(salt, b"DMAM manifest" + manifest_id))
+
+    # ---------- journal ----------
+
+    def _journal_aes(self, salt, journal_id):
+        return AESGCM(self.keys.subkey(salt, b"DMAM journal" + journal_id))
+
+    def _replay(self):
+        """Putar ulang journal proses yang terhenti ke entries, lalu simpan jadi manifest."""
+        with open(self.journal_path, "rb") as f:
+            lines = f.read().splitlines()
+        try:
+            head = json.loads(lines[0])
+            salt, journal_id = bytes.fromhex(head["salt"]), bytes.fromhex(head["id"])
+            check = base64.b64decode(head["check"])
+        except Exception:
+            lines = []      # header belum selesai ditulis: belum ada record
+        if lines:
+            aes = self._journal_aes(salt, journal_id)
+            try:
+                aes.decrypt(check[:NONCE_SIZE], check[NONCE_SIZE:], journal_id)
+            except Exception:
+                raise ValueError("Password salah (tidak cocok dengan journal folder ini)")
+            for line in lines[1:]:
+                try:
+                    raw = base64.b64decode(line, validate=True)
+                    rec = json.loads(aes.decrypt(raw[:NONCE_SIZE], raw[NONCE_SIZE:], journal_id))
+                except Exception:
+                    break   # baris terakhir terpotong saat crash
+                self.entries[rec["rel"]] = rec["e"]
+                self.recovered += 1
+        self._dirty = self._dirty or bool(self.recovered)
+        self.save()
+        self.journal_path.unlink(missing_ok=True)
+
+    def _log(self, rel, entry):
+        if self._journal is None:
+            salt, journal_id = self.keys.salt, secrets.token_bytes(FILE_ID_SIZE)
+            aes = self._journal_aes(salt, journal_id)
+            nonce = secrets.token_bytes(NONCE_SIZE)
+            head = {"salt": salt.hex(), "id": journal_id.hex(),
+                    "check": base64.b64encode(nonce + aes.encrypt(nonce, b"", journal_id)).decode("ascii")}
+            f = open(self.journal_path, "wb")
+            f.write(json.dumps(head).encode("ascii") + b"\n")
+            self._journal = (f, aes, journal_id)
+        f, aes, journal_id = self._journal
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        data = json.dumps({"rel": rel, "e": entry}, ensure_ascii=False).encode("utf-8")
+        f.write(base64.b64encode(nonce + aes.encrypt(nonce, data, journal_id)) + b"\n")
+        f.flush()
+        now = time.monotonic()
+        if now - self._synced >= JOURNAL_SYNC_INTERVAL:
+            os.fsync(f.fileno())
+            self._synced = now
+
+    def _close_journal(self):
+        if self._journal is not None:
+            self._journal[0].close()
+            self._journal = None
+
+    def _load(self):
+        blob = self.path.read_bytes()
+        if len(blob) < _MHEADER_SIZE + NONCE_SIZE:
+            raise ValueError("Manifest .dmalock rusak")
+        magic, version = _MHEADER.unpack(blob[:_MHEADER.size])
+        if magic != MANIFEST_MAGIC or version != MANIFEST_VERSION:
+            raise ValueError("Manifest .dmalock tidak didukung")
+        header = blob[:_MHEADER_SIZE]
+        salt = header[_MHEADER.size:_MHEADER.size + SALT_SIZE]
+        nonce = blob[_MHEADER_SIZE:_MHEADER_SIZE + NONCE_SIZE]
+        try:
+            data = self._aes(salt, header[-FILE_ID_SIZE:]).decrypt(nonce, blob[_MHEADER_SIZE + NONCE_SIZE:], header)
+        except Exception:
+            raise ValueError("Password salah (tidak cocok dengan manifest folder ini)")
+        self.entries = json.loads(zlib.decompress(data).decode("utf-8"))["entries"]
+
+    def save(self):
+        """Tulis manifest (atomic) lalu buang journal; aman dipanggil berulang."""
+        self._close_journal()
+        if not self._dirty:
+            self.journal_path.unlink(missing_ok=True)
+            return
+        if not self.entries:
+            self.path.unlink(missing_ok=True)
+        else:
+            header = _MHEADER.pack(MANIFEST_MAGIC, MANIFEST_VERSION) + self.keys.salt + secrets.token_bytes(FILE_ID_SIZE)
+            nonce = secrets.token_bytes(NONCE_SIZE)
+            payload = zlib.compress(json.dumps({"entries": self.entries}, ensure_ascii=False).encode("utf-8"), 6)
+            ct = self._aes(self.keys.salt, header[-FILE_ID_SIZE:]).encrypt(nonce, payload, header)
+            with atomic_output(self.path) as f:
+                f.write(header + nonce + ct)
+        self._dirty = False
+        self.journal_path.unlink(missing_ok=True)
+
+    def record(self, rel, st, digest, dma_st):
+        entry = {"size": st.st_size, "mtime": st.st_mtime, "hash": digest,
+                 "dma_size": dma_st.st_size, "dma_mtime": dma_st.st_mtime}
+        self.entries[rel] = entry
+        self._dirty = True
+        self._log(rel, entry)
+
+    def forget(self, rel):
+        if self.entries.pop(rel, None) is not None:
+            self._dirty = True
+
+    def current(self, rel, dma_st):
+        """Entry manifest untuk rel jika file .dma-nya masih yang ditulis locker (size/mtime sama)."""
+        e = self.entries.get(rel)
+        if e and dma_st is not None and e["dma_size"] == dma_st.st_size and e["dma_mtime"] == dma_st.st_mtime:
+            return e
+        return None
+
+    def same_content(self, entry, path, st):
+        """File asli di `path` sama dengan isi yang terkunci: size sama, lalu mtime atau hash."""
+        if entry["size"] != st.st_size:
+            return False
+        return entry["mtime"] == st.st_mtime or hash_file(path) == entry["hash"]
+
+    # ---------- operasi per file (aman dipanggil dari thread FilePool) ----------
+
+    def lock_file(self, path):
+        """Enkripsi path -> path.dma sambil menghitung hash. Return argumen untuk record()."""
+        path = Path(path)
+        st = path.stat()
+        dma = path.with_suffix(path.suffix + ".dma")
+        preview = make_preview(path)
+        with open(path, "rb") as fin, atomic_output(dma) as fout:
+            reader = HashingReader(fin)
+            encrypt_stream(reader, fout, self.keys, preview=preview)
+        return self.rel(path), st, reader.hash.hexdigest(), dma.stat()
+
+    def unlock_file(self, dma):
+        """Dekripsi dma -> file asli; mtime asli dikembalikan jika .dma tercatat di manifest."""
+        dma = Path(dma)
+        orig = Path(str(dma)[:-4])
+        entry = self.current(self.rel(orig), dma.stat())
+        orig.parent.mkdir(parents=True, exist_ok=True)
+        decrypt_file(dma, orig, self.keys)
+        if entry:
+            os.utime(orig, (entry["mtime"], entry["mtime"]))
+        dma.unlink(missing_ok=True)
+        return orig
+
+    def verify(self, dma):
+        """
+        Cek isi .dma terhadap hash di manifest tanpa unlock (didekripsi per chunk di memori).
+        Return True/False, atau None jika file tidak tercatat di manifest; .dma yang rusak/dimodifikasi
+        -> ValueError dari dekripsi.
+        """
+        dma = Path(dma)
+        entry = self.entries.get(self.rel(Path(str(dma)[:-4])))
+        if entry is None:
+            return None
+        with open_dma(dma, self.keys) as f:
+            return hash_stream(f) == entry["hash"]
+
+    def rel(self, path):
+        return Path(path).relative_to(self.folder).as_posix()
+
+
+@dataclass
+class LockPlan:
+    mode: str                                       # 'lock' | 'unlock'
+    todo: List[Path] = field(default_factory=list)  # dienkripsi (lock) / didekripsi (unlock)
+    drop: List[Path] = field(default_factory=list)  # pasangan sudah identik: cukup dibuang
+    unchanged: int = 0                              # sudah dalam kondisi tujuan, tidak disentuh
+    partial: List[Path] = field(default_factory=list)   # sisa *.dmapart proses yang terhenti
+    recovered: int = 0                              # file selesai yang dipulihkan dari journal
+
+    @property
+    def total(self):
+        return len(self.todo) + len(self.drop)
+
+    def summary(self):
+        if self.mode == 'lock':
+            text = (f"{len(self.todo)} file baru/berubah akan dikunci, "
+                    f"{len(self.drop)} file asli kembali tanpa perubahan (hanya dibuang), "
+                    f"{self.unchanged} sudah terkunci (dilewati)")
+        else:
+            text = (f"{len(self.todo)} file .dma akan dibuka, "
+                    f"{len(self.drop)} sudah ada versi aslinya (hanya .dma dihapus), "
+                    f"{self.unchanged} file biasa tidak disentuh")
+        if self.recovered or self.partial:
+            text += (f"; melanjutkan proses sebelumnya ({self.recovered} file selesai dipulihkan, "
+                     f"{len(self.partial)} file sementara dibersihkan)")
+        return text
+
+
+def _scan(folder):
+    """rel (posix) -> (Path, stat) untuk semua file di folder (stat dari scandir)."""
+    found = {}
+    stack = [(Path(folder), "")]
+    while stack:
+        d, prefix = stack.pop()
+        with os.scandir(d) as it:
+            for e in it:
+                rel = prefix + e.name
+                if e.is_dir(follow_symlinks=False):
+                    stack.append((Path(e.path), rel + "/"))
+                elif e.is_file():
+                    found[rel] = (Path(e.path), e.stat())
+    return found
+
+
+def build_plan(manifest, mode):
+    """Bandingkan isi folder dengan manifest. Entry manifest yang file-nya sudah hilang dibuang."""
+    files = _scan(manifest.folder)
+    plan = LockPlan(mode, recovered=manifest.recovered)
+    for rel, (path, st) in sorted(files.items()):
+        if rel.endswith(PART_SUFFIX):
+            plan.partial.append(path)
+            continue
+        if is_internal(rel.rsplit("/", 1)[-1]):
+            continue
+        is_dma = rel.endswith(".dma")
+        if mode == 'lock':
+            if is_dma:
+                if rel[:-4] not in files:
+                    plan.unchanged += 1
+                continue
+            dma = files.get(rel + ".dma")
+            entry = manifest.current(rel, dma[1] if dma else None)
+            if entry and manifest.same_content(entry, path, st):
+                plan.drop.append(path)
+            else:
+                plan.todo.append(path)
+        else:
+            if not is_dma:
+                if rel + ".dma" not in files:
+                    plan.unchanged += 1
+                continue
+            orig = files.get(rel[:-4])
+            entry = manifest.current(rel[:-4], st)
+            if orig and entry and manifest.same_content(entry, *orig):
+                plan.drop.append(path)
+            else:
+                plan.todo.append(path)
+    for rel in list(manifest.entries):
+        if rel not in files and rel + ".dma" not in files:
+            manifest.forget(rel)
+    return plan
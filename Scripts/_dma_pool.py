@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+_dma_pool.py
+- Pool thread untuk lock/unlock banyak file sekaligus di folder locker. AES-GCM (cryptography)
+  dan zlib melepas GIL, jadi beberapa file bisa dienkripsi paralel di semua core.
+- Jendela byte yang sedang diproses dibatasi (max_pending_bytes): file baru baru diambil jika
+  total ukuran file yang sedang dikerjakan masih di bawah batas (minimal satu file tetap jalan,
+  jadi file yang lebih besar dari batas tetap diproses sendirian).
+- Hasil dikembalikan ke thread pemanggil (QThread Worker) lewat generator, jadi signal
+  progress/status dan aksi seperti send2trash tetap dijalankan dari satu thread.
+
+Env:
+  BMACHINE_LOCK_WORKERS=N      -> jumlah thread (default jumlah core, maks 8)
+  BMACHINE_LOCK_PENDING_MB=N   -> batas byte yang sedang diproses (default 256 MB)
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_PENDING_MB = 256
+MAX_DEFAULT_WORKERS = 8
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.environ.get(name, "")))
+    except ValueError:
+        return default
+
+
+def default_workers():
+    return _env_int("BMACHINE_LOCK_WORKERS", min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1))
+
+
+class FilePool:
+    """
+    Pemakaian (di thread non-UI):
+        pool = FilePool()
+        for path, result, error in pool.run(files, fn, is_cancelled):
+            ...   # error None = sukses, selain itu exception dari fn(path)
+
+    Urutan hasil = urutan selesai, bukan urutan `files`. File yang belum diambil saat
+    dibatalkan tidak ikut.
+    """
+
+    def __init__(self, workers=None, max_pending_bytes=None):
+        self.workers = max(1, int(workers or default_workers()))
+        if max_pending_bytes is None:
+            max_pending_bytes = _env_int("BMACHINE_LOCK_PENDING_MB", DEFAULT_PENDING_MB) * 1024 * 1024
+        self.max_pending_bytes = max_pending_bytes
+
+    def run(self, files, fn, is_cancelled=lambda: False):
+        it = iter(files)
+        nxt = next(it, None)
+        pending = {}        # future -> (path, size)
+        in_flight = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            while nxt is not None or pending:
+                if is_cancelled():
+                    nxt = None
+                while nxt is not None and len(pending) < self.workers * 2:
+                    size = _size(nxt)
+                    if pending and in_flight + size > self.max_pending_bytes:
+                        break
+                    pending[ex.submit(fn, nxt)] = (nxt, size)
+                    in_flight += size
+                    nxt = next(it, None)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    path, size = pending.pop(fut)
+                    in_flight -= size
+                    err = fut.exception()
+                    yield path, (None if err else fut.result()), err
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+_dma_preview.py
+- Preview kecil (JPEG, sisi terpanjang PREVIEW_SIZE px) yang ikut disimpan terenkripsi di header
+  DMA3 saat lock (_dma_crypto FEATURE_PREVIEW), baik untuk .dma per file maupun blob di vault.
+  Isi folder foto yang terkunci bisa dilihat tanpa unlock: cukup beberapa KB per file yang
+  didekripsi ke memori, payload tidak disentuh dan tidak ada yang ditulis ke disk.
+- Foto di-decode lewat _bucin_preview (JPEG draft mode + orientasi EXIF) tanpa cache disk
+  (cache thumbnail psdbucin berisi plaintext); PSD/PSB memakai thumbnail tertanam (_psd_catalog).
+- Pillow opsional: tanpa Pillow file tetap dikunci, hanya tanpa preview.
+- LockedPreviews: daftar file terkunci di satu folder (.dma + isi vault); preview didekripsi per
+  item saat diminta, jadi grid browse hanya membaca item yang sedang terlihat.
+
+Env:
+  BMACHINE_LOCK_PREVIEW=0  -> lock tanpa membuat preview
+"""
+
+import io
+import os
+from pathlib import Path
+
+from _dma_crypto import SessionKeys, read_preview, read_preview_file
+
+PREVIEW_SIZE = 256
+PREVIEW_QUALITY = 75
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff')
+PSD_EXTS = ('.psd', '.psb')
+PREVIEW_EXTS = IMAGE_EXTS + PSD_EXTS
+
+
+def preview_enabled():
+    return os.environ.get("BMACHINE_LOCK_PREVIEW", "1") != "0"
+
+
+def make_preview(path):
+    """Bytes JPEG preview untuk file `path`, atau None (bukan gambar, Pillow tidak ada, gagal decode)."""
+    name = str(path).lower()
+    if not name.endswith(PREVIEW_EXTS) or not preview_enabled():
+        return None
+    try:
+        from PIL import Image
+        if name.endswith(PSD_EXTS):
+            from _psd_catalog import read_psd_info, thumbnail_image
+            img = thumbnail_image(read_psd_info(path))
+            if img is None:
+                return None
+        else:
+            from _bucin_preview import open_preview
+            img, _ = open_preview(path, (PREVIEW_SIZE, PREVIEW_SIZE))
+        img.thumbnail((PREVIEW_SIZE, PREVIEW_SIZE), Image.Resampling.LANCZOS)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=PREVIEW_QUALITY)
+        return buf.getvalue()
+    except Exception:
+        return None
+
+
+class LockedPreviews:
+    """
+    Pemakaian (aman dari banyak thread):
+        lp = LockedPreviews(folder, keys)
+        lp.name(i)        # path relatif file asli
+        lp.preview(i)     # bytes JPEG atau None
+    """
+
+    def __init__(self, folder, keys):
+        # Import di sini: _dma_vault meng-import make_preview dari modul ini
+        from _dma_manifest import is_internal
+        from _dma_vault import Vault, vault_path
+
+        self.folder = Path(folder)
+        self.keys = keys if isinstance(keys, SessionKeys) else SessionKeys(keys)
+        items = []      # (rel file asli, Path .dma atau entry vault)
+        for root, _, files in os.walk(self.folder):
+            for fn in files:
+                if fn.endswith(".dma") and not is_internal(fn):
+                    p = Path(root, fn)
+                    items.append((p.relative_to(self.folder).as_posix()[:-4], p))
+        self.vault = None
+        vpath = vault_path(self.folder)
+        if vpath.exists():
+            # Read-only: browse tidak boleh memulihkan/memotong vault yang sedang ditulis proses lain
+            self.vault = Vault(vpath, self.keys, recover=False)
+            items.extend((e["path"], e) for e in self.vault.list())
+        items.sort(key=lambda it: it[0].lower())
+        self.items = items
+
+    def __len__(self):
+        return len(self.items)
+
+    def name(self, i):
+        return self.items[i][0]
+
+    def preview(self, i):
+        rel, src = self.items[i]
+        if isinstance(src, Path):
+            if not rel.lower().endswith(PREVIEW_EXTS):
+                return None
+            return read_preview_file(src, self.keys)
+        if not src.get("preview"):
+            return None
+        with open(self.vault.path, "rb") as f:
+            return read_preview(self.vault.open_entry(f, src), self.keys)
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+"""
+_dma_vault.py
+- Mode vault folder locker: seluruh isi folder dikemas ke satu arsip terenkripsi
+  (<folder>/<nama folder>.dmav), bukan satu .dma per file. Lock/unlock folder besar jadi I/O
+  berurutan ke satu file, dan file asli dibuang per item teratas (bukan 20k panggilan send2trash):
+  subfolder yang seluruh isinya masuk vault dibuang utuh, selebihnya per file.
+- Isi tiap file disimpan sebagai stream DMA3 (_dma_crypto: chunk terautentikasi, codec adaptif)
+  dengan salt vault dan file_id sendiri.
+- Index (path, size, mtime, offset, length, file_id, codec, preview) ada di footer, dienkripsi
+  terpisah: daftar isi bisa dibaca tanpa mendekripsi data, satu file bisa diekstrak dengan seek
+  langsung. Blob foto membawa preview kecil di header DMA3-nya (_dma_preview), "preview" di
+  index menandai blob yang punya preview supaya browse tidak perlu membuka blob lain.
+- Dedup konten: hash BLAKE2b dihitung sambil enkripsi (tanpa baca ulang); file yang ukurannya
+  sama dengan file yang sudah ada di-hash dulu, dan jika isinya identik (mis. ratusan salinan
+  template PSD hasil skrip Master) hanya dicatat sebagai referensi ke blob yang sama. Ukuran
+  vault dan waktu lock mengikuti konten unik. Saat ekstrak, salinan dibuat dari file pertama
+  yang sudah didekripsi (reflink copy-on-write jika filesystem mendukung, selain itu salin
+  biasa; hardlink opsional).
+- Tambah file = tulis data baru + index baru setelah footer lama; footer lama tidak ditimpa,
+  jadi jika proses gagal di tengah, arsip dipotong kembali ke ukuran semula dan tetap valid.
+  Ukuran semula dicatat dulu di <vault>.journal: jika aplikasi ditutup/crash saat append,
+  Vault() berikutnya memotong sisa append yang belum selesai sebelum membaca index.
+
+Layout:
+    header  : "DMAV" | version u8 | kdf u8 | reserved u16 | salt 16 | vault_id 16
+    data    : stream DMA3 per file ...
+    index   : AES-GCM(zlib(JSON)), AAD = header + offset index
+    trailer : index_nonce 12 | index_offset u64 | index_len u64 | "DMAV"
+"""
+
+import json
+import os
+import secrets
+import shutil
+import struct
+import sys
+import zlib
+from pathlib import Path
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from _dma_crypto import (
+    DEFAULT_CACHE_CHUNKS, FILE_ID_SIZE, HEADER_SIZE, KDF_SESSION, NONCE_SIZE, PART_SUFFIX, SALT_SIZE,
+    DmaReader, HashingReader, SessionKeys, atomic_output, decrypt_stream, encrypt_stream, hash_file,
+)
+from _dma_manifest import is_internal
+from _dma_preview import make_preview
+
+VAULT_MAGIC = b"DMAV"
+VAULT_VERSION = 1
+VAULT_EXT = ".dmav"
+
+_VHEADER = struct.Struct(">4sBBH")
+_TRAILER = struct.Struct(">12sQQ4s")
+VAULT_HEADER_SIZE = _VHEADER.size + SALT_SIZE + FILE_ID_SIZE
+
+
+def _read_exact(f, n):
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("Vault terpotong")
+    return data
+
+
+_FICLONE = 0x40049409   # ioctl reflink Linux (btrfs, xfs)
+
+
+def clone_file(src, dst, hardlink=False):
+    """
+    Salinan src -> dst untuk file duplikat saat ekstrak. Urutan: hardlink (jika diminta),
+    reflink copy-on-write (Linux), lalu salin biasa. Hardlink tidak dipakai default karena
+    semua salinan jadi satu file: edit satu PSD ikut mengubah yang lain.
+    """
+    if hardlink:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    if sys.platform.startswith("linux"):
+        try:
+            import fcntl
+            with open(src, "rb") as fs, open(dst, "wb") as fd:
+                fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+
+
+def vault_path(folder):
+    folder = Path(folder)
+    return folder / f"{folder.name}{VAULT_EXT}"
+
+
+class _Slice:
+    """File-like read-only untuk rentang [offset, offset + length) di file vault."""
+
+    def __init__(self, f, offset, length):
+        self._f, self._start, self._len, self._pos = f, offset, length, 0
+
+    def read(self, n=-1):
+        left = self._len - self._pos
+        n = left if n is None or n < 0 else min(n, left)
+        self._f.seek(self._start + self._pos)
+        data = self._f.read(n)
+        self._pos += len(data)
+        return data
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, pos, whence=0):
+        base = {0: 0, 1: self._pos, 2: self._len}[whence]
+        self._pos = max(0, min(self._len, base + pos))
+        return self._pos
+
+    def close(self):
+        self._f.close()
+
+
+class Vault:
+    """
+    Pemakaian:
+        v = Vault(path, keys)                 # baca index jika arsip sudah ada
+        v.add_files([(rel, src), ...])        # buat / tambah
+        v.list()                              # entry index, tanpa dekripsi data
+        v.extract("KELAS A/01.jpg", dst)      # satu file, seek langsung
+        v.open_stream("KELAS A/01.jpg")       # file-like (random access) tanpa ekstrak ke disk
+        v.extract_all(folder)
+
+    recover=False (browse/preview): arsip tidak pernah diubah. Journal append yang masih ada
+    (proses lain sedang menambah file, atau crash) tidak dipulihkan; index dibaca dari footer
+    terakhir yang sudah commit, dan add_files ditolak.
+    """
+
+    def __init__(self, path, keys, recover=True):
+        self.path = Path(path)
+        self.keys = keys if isinstance(keys, SessionKeys) else SessionKeys(keys)
+        self.entries = {}       # rel (posix) -> entry dict
+        self._header = None
+        self._end = 0           # ukuran arsip valid terakhir (sampai trailer)
+        self.journal_path = Path(f"{self.path}.journal")
+        self.readonly = not recover
+        if recover:
+            self._recover()
+            end = None
+        else:
+            end = self._journal_end()
+        if self.path.exists() and end != 0:
+            self._load(end)
+
+    # ---------- journal append ----------
+
+    def _journal_end(self):
+        """Ukuran arsip yang sudah commit menurut journal append (None = tidak ada journal)."""
+        try:
+            return json.loads(self.journal_path.read_text(encoding="utf-8"))["end"]
+        except Exception:
+            return None     # tidak ada / belum selesai ditulis: vault belum disentuh
+
+    # ---------- journal append ----------
+
+    def _recover(self):
+        """Append yang terhenti: kembalikan arsip ke ukuran sebelum append (0 = vault baru, hapus)."""
+        if not self.journal_path.exists():
+            return
+        end = self._journal_end()
+        if end == 0:
+            self.path.unlink(missing_ok=True)
+        elif end is not None and self.path.exists() and self.path.stat().st_size > end:
+            os.truncate(self.path, end)
+        self.journal_path.unlink(missing_ok=True)
+
+    def _begin_append(self, end):
+        with atomic_output(self.journal_path) as j:
+            j.write(json.dumps({"end": end}).encode("utf-8"))
+
+    # ---------- index ----------
+
+    def _index_key(self):
+        salt, vault_id = self._header[_VHEADER.size:_VHEADER.size + SALT_SIZE], self._header[-FILE_ID_SIZE:]
+        return AESGCM(self.keys.subkey(salt, b"DMAV index" + vault_id))
+
+    def _load(self, end=None):
+        """Baca index dari trailer yang berakhir di `end` (default: akhir file)."""
+        with open(self.path, "rb") as f:
+            header = _read_exact(f, VAULT_HEADER_SIZE)
+            magic, version, kdf, _ = _VHEADER.unpack(header[:_VHEADER.size])
+            if magic != VAULT_MAGIC:
+                raise ValueError("File bukan vault .dmav yang valid")
+            if version != VAULT_VERSION or kdf != KDF_SESSION:
+                raise ValueError("Versi vault tidak didukung")
+            self._header = header
+            size = f.seek(0, os.SEEK_END)
+            end = size if end is None else min(end, size)
+            if end < VAULT_HEADER_SIZE + _TRAILER.size:
+                raise ValueError("Vault terpotong (index tidak ada)")
+            f.seek(end - _TRAILER.size)
+            nonce, off, length, magic = _TRAILER.unpack(f.read(_TRAILER.size))
+            if magic != VAULT_MAGIC or off + length + _TRAILER.size != end:
+                raise ValueError("Vault terpotong atau rusak (trailer tidak valid)")
+            f.seek(off)
+            ct = _read_exact(f, length)
+        try:
+            data = self._index_key().decrypt(nonce, ct, header + struct.pack(">Q", off))
+        except Exception:
+            raise ValueError("Password salah atau index vault rusak")
+        index = json.loads(zlib.decompress(data).decode("utf-8"))
+        self.entries = {e["path"]: e for e in index["entries"]}
+        self._end = end
+
+    def _write_index(self, f):
+        off = f.tell()
+        payload = zlib.compress(json.dumps({"entries": list(self.entries.values())},
+                                           ensure_ascii=False).encode("utf-8"), 6)
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        ct = self._index_key().encrypt(nonce, payload, self._header + struct.pack(">Q", off))
+        f.write(ct)
+        f.write(_TRAILER.pack(nonce, off, len(ct), VAULT_MAGIC))
+        f.flush()
+        os.fsync(f.fileno())
+        self._end = f.tell()
+
+    # ---------- tulis ----------
+
+    def add_files(self, items, on_result=None, is_cancelled=lambda: False):
+        """
+        Tambahkan file ke vault (dibuat jika belum ada). `items`: iterable (rel, src_path).
+        Path yang sudah ada di index diganti entry baru (data lama jadi ruang mati).
+        File yang isinya sama dengan blob yang sudah ada di vault dicatat sebagai referensi
+        (entry berbagi offset/length/file_id, field "ref" = path pemilik blob).
+        `on_result(rel, error)` dipanggil per file; error None = sukses.
+        Return list rel yang berhasil masuk (index sudah tersimpan).
+        """
+        if self.readonly:
+            raise ValueError("Vault dibuka read-only")
+        created = self._header is None
+        if created:
+            self._header = (_VHEADER.pack(VAULT_MAGIC, VAULT_VERSION, KDF_SESSION, 0)
+                            + self.keys.salt + secrets.token_bytes(FILE_ID_SIZE))
+        salt = self._header[_VHEADER.size:_VHEADER.size + SALT_SIZE]
+        old_entries = dict(self.entries)
+        added = []
+        # hash -> entry pemilik blob; ukuran yang sudah punya blob ber-hash (kandidat duplikat)
+        blobs = {e["hash"]: e for e in self.entries.values() if e.get("hash") and not e.get("ref")}
+        blob_sizes = {e["size"] for e in blobs.values()}
+        self._begin_append(0 if created else self._end)
+        f = open(self.path, "w+b" if created else "r+b")
+        try:
+            if created:
+                f.write(self._header)
+            else:
+                f.seek(self._end)   # data + index lama tetap utuh
+            for rel, src in items:
+                if is_cancelled():
+                    break
+                off = f.tell()
+                file_id = secrets.token_bytes(FILE_ID_SIZE)
+                try:
+                    st = os.stat(src)
+                    # Hanya file yang ukurannya sudah ada di vault perlu di-hash sebelum enkripsi
+                    digest = hash_file(src) if st.st_size in blob_sizes else None
+                    owner = blobs.get(digest)
+                    if owner is None:
+                        preview = make_preview(src)
+                        with open(src, "rb") as fin:
+                            reader = HashingReader(fin)
+                            codec = encrypt_stream(reader, f, self.keys, salt=salt, file_id=file_id,
+                                                   preview=preview)
+                        digest = reader.hash.hexdigest()
+                except Exception as e:
+                    f.seek(off)
+                    f.truncate()
+                    if on_result:
+                        on_result(rel, e)
+                    continue
+                if owner is not None:
+                    entry = dict(owner, path=rel, mtime=st.st_mtime)
+                    if owner["path"] != rel:
+                        entry["ref"] = owner["path"]
+                else:
+                    entry = {
+                        "path": rel, "size": st.st_size, "mtime": st.st_mtime, "hash": digest,
+                        "offset": off, "length": f.tell() - off, "file_id": file_id.hex(), "codec": codec,
+                        "preview": preview is not None,
+                    }
+                    blobs[digest] = entry
+                    blob_sizes.add(st.st_size)
+                self.entries[rel] = entry
+                added.append(rel)
+                if on_result:
+                    on_result(rel, None)
+            if added or created:
+                self._write_index(f)
+            else:
+                f.truncate(self._end)
+        except BaseException:
+            # Kembalikan arsip ke kondisi sebelum dipanggil
+            self.entries = old_entries
+            f.close()
+            if created:
+                self.path.unlink(missing_ok=True)
+                self._header = None
+            else:
+                os.truncate(self.path, self._end)
+            self.journal_path.unlink(missing_ok=True)
+            raise
+        f.close()
+        self.journal_path.unlink(missing_ok=True)
+        return added
+
+    # ---------- baca ----------
+
+    def list(self):
+        """Entry index urut path (tanpa mendekripsi data)."""
+        return [self.entries[k] for k in sorted(self.entries, key=str.lower)]
+
+    def open_entry(self, f, entry):
+        """_Slice stream DMA3 satu entry; file_id di header entry harus sama dengan index."""
+        part = _Slice(f, entry["offset"], entry["length"])
+        part.seek(HEADER_SIZE)
+        if part.read(FILE_ID_SIZE).hex() != entry["file_id"]:
+            raise ValueError(f"Data vault tidak cocok dengan index: {entry['path']}")
+        part.seek(0)
+        return part
+
+    def extract(self, rel, dst):
+        entry = self.entries.get(rel)
+        if entry is None:
+            raise KeyError(rel)
+        with open(self.path, "rb") as f, atomic_output(dst) as fout:
+            decrypt_stream(self.open_entry(f, entry), fout, self.keys)
+
+    def open_stream(self, rel, cache_chunks=DEFAULT_CACHE_CHUNKS):
+        """DmaReader untuk satu entry (handle vault sendiri, ditutup bersama reader)."""
+        entry = self.entries.get(rel)
+        if entry is None:
+            raise KeyError(rel)
+        f = open(self.path, "rb")
+        try:
+            return DmaReader(self.open_entry(f, entry), self.keys, cache_chunks, closefd=True)
+        except BaseException:
+            f.close()
+            raise
+
+    def stats(self):
+        """(jumlah file, jumlah blob unik, total byte asli, total byte blob unik)."""
+        unique = {e["offset"]: e["size"] for e in self.entries.values()}
+        return (len(self.entries), len(unique),
+                sum(e["size"] for e in self.entries.values()), sum(unique.values()))
+
+    def extract_all(self, dest, on_result=None, is_cancelled=lambda: False, hardlink=False):
+        """
+        Ekstrak semua entry ke folder `dest`, urut offset (baca berurutan). Blob yang dipakai
+        beberapa path hanya didekripsi sekali; path lainnya dibuat dengan clone_file.
+        Return jumlah gagal.
+        """
+        dest = Path(dest).resolve()
+        failed = 0
+        restored = {}   # offset blob -> path hasil dekripsi pertama
+        with open(self.path, "rb") as f:
+            for entry in sorted(self.entries.values(), key=lambda e: (e["offset"], "ref" in e)):
+                if is_cancelled():
+                    break
+                rel = entry["path"]
+                try:
+                    dst = (dest / rel).resolve()
+                    if dest not in dst.parents:
+                        raise ValueError(f"Path di luar folder tujuan: {rel}")
+                    dst.parent.mkdir(parents=True, exist_ok=True)
+                    first = restored.get(entry["offset"])
+                    if first is not None and first.exists():
+                        tmp = Path(f"{dst}{PART_SUFFIX}")
+                        tmp.unlink(missing_ok=True)
+                        clone_file(first, tmp, hardlink)
+                        os.replace(tmp, dst)
+                    else:
+                        with atomic_output(dst) as fout:
+                            decrypt_stream(self.open_entry(f, entry), fout, self.keys)
+                        restored[entry["offset"]] = dst
+                    os.utime(dst, (entry["mtime"], entry["mtime"]))
+                    err = None
+                except Exception as e:
+                    failed += 1
+                    err = e
+                if on_result:
+                    on_result(rel, err)
+        return failed
+
+
+# ---------- dipakai Worker folder locker ----------
+
+def lock_folder_to_vault(folder, keys, remove, on_result=None, is_cancelled=lambda: False):
+    """
+    Kemas semua file folder (kecuali .dma dan file milik locker) ke vault_path(folder), lalu
+    buang file asli lewat `remove(list path file/folder)` -> list path yang gagal dibuang.
+    Hanya file yang benar-benar masuk vault yang dibuang (file yang muncul setelah scan tidak
+    tersentuh): subfolder teratas yang isinya di disk persis sama dengan yang masuk vault dibuang
+    utuh (satu item recycle bin), subfolder lain per file lalu folder yang jadi kosong di-rmdir.
+    `on_result(rel, error, done, total)` dipanggil per file.
+    Return (jumlah berhasil, jumlah gagal, jumlah item asli yang gagal dibuang).
+    """
+    folder = Path(folder)
+    vpath = vault_path(folder)
+    items = []
+    for p in sorted(folder.rglob("*")):
+        if not p.is_file():
+            continue
+        rel = p.relative_to(folder).as_posix()
+        if p.suffix == ".dma" or is_internal(p.name):
+            continue
+        items.append((rel, p))
+
+    failed = []
+    done = [0]
+
+    def on_file(rel, err):
+        done[0] += 1
+        if err is not None:
+            failed.append(rel)
+        if on_result:
+            on_result(rel, err, done[0], len(items))
+
+    added = Vault(vpath, keys).add_files(items, on_file, is_cancelled)
+    paths = _removal_targets(folder, added)
+    not_removed = remove(paths) if paths else []
+    _prune_empty_dirs(folder, {p.parent for p in paths})
+    return len(added), len(failed), len(not_removed)
+
+
+def _removal_targets(folder, added):
+    """
+    Path yang dibuang setelah `added` (rel) masuk vault. Subfolder teratas dibuang utuh hanya jika
+    isinya di disk sekarang persis file yang masuk vault (tidak ada file baru, gagal, .dma, file
+    locker atau symlink); selain itu file-file yang masuk vault saja.
+    """
+    tops, paths = {}, []
+    for rel in added:
+        top, sep, _ = rel.partition("/")
+        if sep:
+            tops.setdefault(top, []).append(rel)
+        else:
+            paths.append(folder / rel)
+    for top, rels in sorted(tops.items()):
+        root = folder / top
+        try:
+            on_disk = {p.relative_to(folder).as_posix() for p in root.rglob("*")
+                       if p.is_symlink() or not p.is_dir()}
+            whole = not root.is_symlink() and on_disk == set(rels)
+        except OSError:
+            whole = False
+        paths.extend([root] if whole else (folder / rel for rel in rels))
+    return paths
+
+
+def _prune_empty_dirs(folder, dirs):
+    """rmdir subfolder (dari yang terdalam, `folder` sendiri tidak) yang kosong setelah file asli dibuang."""
+    todo = set()
+    for d in dirs:
+        while d != folder and folder in d.parents:
+            todo.add(d)
+            d = d.parent
+    for d in sorted(todo, key=lambda p: len(p.parts), reverse=True):
+        try:
+            d.rmdir()
+        except OSError:
+            pass    # masih ada isinya (file baru, gagal masuk vault, .dma): dibiarkan
+
+
+def unlock_vault(folder, keys, on_result=None, is_cancelled=lambda: False):
+    """
+    Ekstrak vault_path(folder) ke folder; vault dihapus jika semua file berhasil.
+    `on_result(rel, error, done, total)` dipanggil per file.
+    Return (jumlah berhasil, jumlah gagal), atau None jika folder tidak punya vault.
+    """
+    vpath = vault_path(folder)
+    if not vpath.exists():
+        return None
+    vault = Vault(vpath, keys)
+    total = len(vault.entries)
+    ok, done = [], [0]
+
+    def on_file(rel, err):
+        done[0] += 1
+        if err is None:
+            ok.append(rel)
+        if on_result:
+            on_result(rel, err, done[0], total)
+
+    failed = vault.extract_all(folder, on_file, is_cancelled)
+    if len(ok) == total:
+        vpath.unlink()
+    return len(ok), failed
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+_psd_catalog.py
+- Katalog file master PSD/PSB: ukuran, color mode, bit depth, dan thumbnail JPEG yang tertanam
+  (image resource 1036, atau 1033 untuk file Photoshop 4 lama).
+- Hanya membaca header + section image resources; data layer dan composite image tidak dibaca
+  sama sekali (cukup beberapa KB per file, bukan ratusan MB).
+- Hasil di-cache persisten (key: path + size + mtime), jadi folder master di share hanya dibaca
+  ulang kalau file berubah. Katalog JSON hanya berisi metadata kecil; bytes thumbnail disimpan
+  di cache thumbnail SQLite bersama (_thumb_cache.shared_cache, LRU dengan batas ukuran).
+- Dipakai tombol template psdbucin_v3; bisa juga dijalankan langsung untuk folder master skrip
+  Master (wisuda, manasik, pasfoto, profesi):
+
+    python _psd_catalog.py <folder master> [<folder master> ...] [--thumbs <folder output>]
+"""
+
+import atexit
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from contextlib import nullcontext
+
+from _thumb_cache import shared_cache
+
+# Naikkan jika format entry berubah supaya cache lama otomatis diabaikan
+CATALOG_VERSION = 2
+MAX_CACHE_ENTRIES = 5000
+
+CACHE_FILE = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"),
+    "BMachine", "cache", "psd_catalog.json",
+)
+
+PSD_EXTS = ('.psd', '.psb')
+
+COLOR_MODES = {
+    0: "Bitmap", 1: "Grayscale", 2: "Indexed", 3: "RGB", 4: "CMYK",
+    7: "Multichannel", 8: "Duotone", 9: "Lab",
+}
+
+_RES_THUMBNAIL = 1036       # JPEG RGB (Photoshop 5+)
+_RES_THUMBNAIL_OLD = 1033   # JPEG, kanal BGR (Photoshop 4)
+_THUMB_HEADER = 28          # format, width, height, widthbytes, total, compressed, bpp, planes
+_THUMB_FORMAT_JPEG = 1
+
+# Slot thumbnail tertanam di cache SQLite (tier 0 = ukuran asli dari file, bukan hasil resize)
+THUMB_TIER = 0
+THUMB_VARIANT = "psd"
+
+
+def _read_exact(f, n):
+    data = f.read(n)
+    if len(data) != n:
+        raise ValueError("File PSD terpotong")
+    return data
+
+
+def read_psd_info(path):
+    """
+    Baca header + image resources satu file PSD/PSB. `path` boleh file-like seekable yang sudah
+    terbuka (mis. _dma_crypto.open_dma untuk PSD terkunci); posisinya harus di awal file.
+    Return dict: width, height, channels, depth, mode, psb, thumb (bytes JPEG atau None),
+    thumb_bgr (True jika thumbnail format lama dengan kanal tertukar).
+    """
+    with (open(path, 'rb') if isinstance(path, (str, os.PathLike)) else nullcontext(path)) as f:
+        sig, version, _, channels, height, width, depth, mode = struct.unpack(">4sH6sHIIHH", _read_exact(f, 26))
+        if sig != b"8BPS" or version not in (1, 2):
+            raise ValueError("Bukan file PSD/PSB")
+        info = {
+            "width": width, "height": height, "channels": channels, "depth": depth,
+            "mode": COLOR_MODES.get(mode, str(mode)), "psb": version == 2,
+            "thumb": None, "thumb_bgr": False,
+        }
+
+        # Color mode data: lewati
+        (color_len,) = struct.unpack(">I", _read_exact(f, 4))
+        f.seek(color_len, os.SEEK_CUR)
+
+        # Image resources: blok 8BIM berurutan; data yang tidak perlu di-seek, bukan dibaca
+        (res_len,) = struct.unpack(">I", _read_exact(f, 4))
+        end = f.tell() + res_len
+        old_thumb = None
+        while f.tell() + 12 <= end:
+            sig, res_id, name_len = struct.unpack(">4sHB", _read_exact(f, 7))
+            if sig not in (b"8BIM", b"MeSa", b"AgHg", b"PHUT", b"DCSR"):
+                break
+            # Nama Pascal, total (1 + panjang) dibulatkan ke genap
+            f.seek(name_len + (0 if name_len % 2 else 1), os.SEEK_CUR)
+            (size,) = struct.unpack(">I", _read_exact(f, 4))
+            padded = size + (size % 2)
+            if res_id in (_RES_THUMBNAIL, _RES_THUMBNAIL_OLD) and size > _THUMB_HEADER:
+                data = _read_exact(f, size)
+                f.seek(padded - size, os.SEEK_CUR)
+                (fmt,) = struct.unpack(">I", data[:4])
+                if fmt == _THUMB_FORMAT_JPEG:
+                    if res_id == _RES_THUMBNAIL:
+                        info["thumb"] = data[_THUMB_HEADER:]
+                        break  # Layer & image data tidak pernah dibaca
+                    old_thumb = data[_THUMB_HEADER:]
+            else:
+                f.seek(padded, os.SEEK_CUR)
+        if info["thumb"] is None and old_thumb is not None:
+            info["thumb"], info["thumb_bgr"] = old_thumb, True
+    return info
+
+
+def thumbnail_image(entry):
+    """PIL Image dari thumbnail entry katalog (None jika tidak ada). PIL di-import saat dipakai."""
+    if not entry or not entry.get("thumb"):
+        return None
+    import io
+    from PIL import Image
+    img = Image.open(io.BytesIO(entry["thumb"]))
+    img.load()
+    img = img.convert("RGB")
+    if entry.get("thumb_bgr"):
+        r, g, b = img.split()
+        img = Image.merge("RGB", (b, g, r))
+    return img
+
+
+class PsdCatalog:
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self._entries = None
+        self._dirty = False
+        # CATALOG dipakai dari thread load thumbnail psdbucin dan atexit -> get/save dijaga lock
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION:
+                self._entries = data.get("entries") or {}
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARNING] Cache katalog PSD diabaikan: {e}", file=sys.stderr)
+
+    def get(self, path):
+        """
+        Entry katalog satu file: dict read_psd_info (thumb dalam bytes) + path, size, mtime.
+        Return None jika file tidak bisa dibaca.
+        """
+        with self._lock:
+            return self._get(path)
+
+    def _get(self, path):
+        self._load()
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = os.path.normcase(os.path.abspath(path))
+        thumbs = shared_cache()
+        cached = self._entries.get(key)
+        info = None
+        if cached and cached["size"] == st.st_size and cached["mtime"] == st.st_mtime:
+            info = dict(cached["info"])
+            thumb = None
+            if info.pop("has_thumb", False):
+                thumb = thumbs.get(path, st, THUMB_TIER, THUMB_VARIANT) if thumbs else None
+                if thumb is None:
+                    info = None  # Thumbnail sudah dibuang dari cache SQLite: baca ulang header file
+            if info is not None:
+                self.hits += 1
+                info["thumb"] = thumb
+                now = time.time()
+                if now - cached.get("used", 0) > 86400:
+                    cached["used"] = now
+                    self._dirty = True
+        if info is None:
+            try:
+                info = read_psd_info(path)
+            except Exception as e:
+                info = {"error": str(e), "thumb": None}
+            self.misses += 1
+            stored = {k: v for k, v in info.items() if k != "thumb"}
+            stored["has_thumb"] = bool(info.get("thumb"))
+            if stored["has_thumb"] and thumbs:
+                thumbs.put(path, st, THUMB_TIER, info["thumb"], THUMB_VARIANT)
+            self._entries[key] = {"size": st.st_size, "mtime": st.st_mtime, "used": time.time(), "info": stored}
+            self._dirty = True
+            info = dict(info)
+        info.update(path=path, size=st.st_size, mtime=st.st_mtime)
+        return info
+
+    def scan(self, folder):
+        """Entry katalog untuk semua PSD/PSB di bawah folder, urut path relatif."""
+        found = []
+        for root, _, files in os.walk(folder):
+            for fn in files:
+                if fn.lower().endswith(PSD_EXTS):
+                    found.append(os.path.join(root, fn))
+        found.sort(key=lambda p: os.path.relpath(p, folder).lower())
+        return [e for e in (self.get(p) for p in found) if e is not None]
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        if not self._dirty or self._entries is None:
+            return
+        entries = self._entries
+        if len(entries) > MAX_CACHE_ENTRIES:
+            keep = sorted(entries.items(), key=lambda kv: kv[1].get("used", 0), reverse=True)[:MAX_CACHE_ENTRIES]
+            entries = dict(keep)
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            tmp = f"{self.cache_file}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"version": CATALOG_VERSION, "entries": entries}, f)
+            os.replace(tmp, self.cache_file)
+            self._dirty = False
+        except Exception as e:
+            print(f"[WARNING] Gagal menyimpan cache katalog PSD: {e}", file=sys.stderr)
+
+
+# Satu instance per proses; disimpan otomatis saat proses selesai
+CATALOG = PsdCatalog()
+atexit.register(CATALOG.save)
+
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    thumbs_dir = None
+    if "--thumbs" in args:
+        i = args.index("--thumbs")
+        thumbs_dir = args[i + 1] if i + 1 < len(args) else None
+        del args[i:i + 2]
+    if not args:
+        print("Usage: python _psd_catalog.py <folder master> [...] [--thumbs <folder output>]", file=sys.stderr)
+        return 1
+    if thumbs_dir:
+        os.makedirs(thumbs_dir, exist_ok=True)
+
+    total = with_thumb = 0
+    for folder in args:
+        if not os.path.isdir(folder):
+            print(f"[ERROR] Folder tidak ditemukan: {folder}", file=sys.stderr)
+            continue
+        for entry in CATALOG.scan(folder):
+            total += 1
+            rel = os.path.relpath(entry["path"], folder)
+            if entry.get("error"):
+                print(f"[ERROR] {rel}: {entry['error']}")
+                continue
+            has_thumb = bool(entry.get("thumb"))
+            with_thumb += has_thumb
+            print(f"[OK] {rel}: {entry['width']}x{entry['height']} {entry['mode']} {entry['depth']}-bit"
+                  f"{' (thumbnail)' if has_thumb else ''}")
+            if thumbs_dir and has_thumb:
+                name = os.path.splitext(rel.replace(os.sep, "_"))[0] + ".jpg"
+                if entry.get("thumb_bgr"):
+                    thumbnail_image(entry).save(os.path.join(thumbs_dir, name), "JPEG")
+                else:
+                    with open(os.path.join(thumbs_dir, name), 'wb') as f:
+                        f.write(entry["thumb"])
+    print(f"SUMMARY_JSON:{json.dumps({'files': total, 'with_thumbnail': with_thumb, 'cache_hits': CATALOG.hits})}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
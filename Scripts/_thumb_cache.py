@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+_thumb_cache.py
+- Cache preview/thumbnail di disk (SQLite) untuk psdbucin: preview canvas dan grid view memakai
+  cache yang sama.
+- Key: path sumber + size + mtime + ukuran tier, jadi foto yang berubah otomatis di-decode ulang.
+- Isi: bytes JPEG seukuran tier (bukan foto asli). Total dibatasi, yang paling lama tidak dipakai
+  dibuang dulu (LRU).
+
+Env:
+  BMACHINE_THUMB_CACHE_MB=N  -> batas ukuran cache (default 512, 0 = nonaktif)
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CAPACITY_MB = 512
+
+# Ukuran sisi terpanjang yang disimpan; canvas memakai tier terkecil yang >= ukuran canvas
+TIERS = (256, 1024, 2048)
+GRID_TIER = TIERS[0]
+
+# "used" hanya di-update jika lebih lama dari ini, supaya hit beruntun tidak selalu menulis
+_TOUCH_INTERVAL = 60.0
+
+CACHE_FILE = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"),
+    "BMachine", "cache", "psdbucin_thumbs.sqlite",
+)
+
+
+def pick_tier(box_size):
+    """Tier terkecil yang menutupi box (w, h); None jika box lebih besar dari tier terbesar."""
+    edge = max(box_size)
+    for tier in TIERS:
+        if tier >= edge:
+            return tier
+    return None
+
+
+class ThumbCache:
+    def __init__(self, path=CACHE_FILE, capacity_mb=DEFAULT_CAPACITY_MB):
+        self.capacity = int(capacity_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Dipakai dari thread Tk dan thread prefetch -> satu koneksi dijaga lock
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS thumbs ("
+            " key TEXT PRIMARY KEY, size INTEGER, mtime INTEGER,"
+            " data BLOB, bytes INTEGER, used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS thumbs_used ON thumbs(used)")
+        self._total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbs").fetchone()[0]
+
+    @staticmethod
+    def _key(path, tier, variant):
+        return f"{os.path.normcase(os.path.abspath(path))}|{tier}|{variant}"
+
+    def get(self, path, stat, tier, variant=""):
+        """Bytes JPEG untuk (path, tier) jika size & mtime sumber masih sama, selain itu None."""
+        key = self._key(path, tier, variant)
+        with self._lock:
+            row = self._db.execute("SELECT size, mtime, data, used FROM thumbs WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            if (row[0], row[1]) != (stat.st_size, stat.st_mtime_ns):
+                self._db.execute("DELETE FROM thumbs WHERE key=?", (key,))
+                self._total -= len(row[2])
+                return None
+            now = time.time()
+            if now - row[3] > _TOUCH_INTERVAL:
+                self._db.execute("UPDATE thumbs SET used=? WHERE key=?", (now, key))
+            return row[2]
+
+    def put(self, path, stat, tier, data, variant=""):
+        key = self._key(path, tier, variant)
+        with self._lock:
+            old = self._db.execute("SELECT bytes FROM thumbs WHERE key=?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO thumbs (key, size, mtime, data, bytes, used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, stat.st_size, stat.st_mtime_ns, sqlite3.Binary(data), len(data), time.time()),
+            )
+            self._total += len(data) - (old[0] if old else 0)
+            if self._total > self.capacity:
+                self._evict()
+
+    def _evict(self):
+        # Buang yang paling lama tidak dipakai sampai tersisa ~90% kapasitas
+        target = int(self.capacity * 0.9)
+        rows = self._db.execute("SELECT key, bytes FROM thumbs ORDER BY used").fetchall()
+        drop = []
+        for key, size in rows:
+            if self._total <= target:
+                break
+            drop.append((key,))
+            self._total -= size
+        self._db.executemany("DELETE FROM thumbs WHERE key=?", drop)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache():
+    """Instance cache bersama (preview + grid); None jika nonaktif atau gagal dibuka."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            try:
+                capacity_mb = float(os.environ.get("BMACHINE_THUMB_CACHE_MB", DEFAULT_CAPACITY_MB))
+            except ValueError:
+                capacity_mb = DEFAULT_CAPACITY_MB
+            if capacity_mb <= 0:
+                _shared = False
+            else:
+                try:
+                    _shared = ThumbCache(capacity_mb=capacity_mb)
+                except Exception:
+                    _shared = False
+        return _shared or None
@@ -73,6 +73,7 @@ def main():
     
     target_path = ""
     for p in possible_paths:
+        if os.path.exists(p):
             target_path = p
             print(f"[DEBUG_WRAPPER] FOUND TARGET: {target_path}", file=sys.stderr)
             break
@@ -133,6 +134,9 @@ def main():
             oke_base = args.output
         
         cmd = [sys.executable, target_path, master_profesi, master_sporty, args.pilihan, args.output, oke_base]
+    elif args.target in ('psdbucin_v3.py', 'psdbucin_v3.pyw'):
+        # psdbucin_v3.py --headless --master <master> --pilihan <pilihan>  (mode otomatis, NDJSON)
+        cmd = [sys.executable, target_path, '--headless', '--master', args.master, '--pilihan', args.pilihan]
     else:
         print(f"ERROR: Unknown target script: {args.target}", file=sys.stderr)
         return 4
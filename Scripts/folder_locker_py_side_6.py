@@ -9,19 +9,21 @@
 #
 # ⚠️ WARNING
 # 1) Encrypted files are useless without the password. JANGAN LUPA PASSWORD.
-# 2) Uji dulu pada folder kecil. Jangan matikan aplikasi saat proses berjalan.
-# 3) File besar dibaca ke memori (praktis). Jika Anda menangani file > 200 MB,
-#    pertimbangkan memori yang cukup. (Bisa diubah ke streaming di versi lanjut.)
+# 2) Uji dulu pada folder kecil. Jika aplikasi tertutup saat proses berjalan, jalankan
+#    LOCK lagi: file yang sudah selesai (tercatat di journal .dmalock) tidak diulang.
+# 3) File diproses per chunk (streaming, format DMA3), jadi file besar tidak dibaca
+#    ke memori sekaligus. File hasil setengah jadi (*.dmapart) dihapus jika gagal.
 #
 # Dependencies:
 #   pip install PySide6 cryptography send2trash
+#   opsional: pip install zstandard (kompresi lebih cepat untuk file yang bisa dikompres)
 # send2trash optional; jika tidak ada, program akan fallback ke os.remove
 # ---------------------------------------------------------------------
 
-import os, sys, zlib, traceback, threading, stat, platform, ctypes
+import os, sys, shutil, traceback, threading, stat, platform, ctypes
 from pathlib import Path
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Optional
 
 try:
     from send2trash import send2trash
@@ -34,49 +36,14 @@ from PySide6.QtWidgets import (
     QLabel, QPushButton, QLineEdit, QProgressBar, QCheckBox, QMessageBox
 )
 
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-import secrets
-
-HEADER_MAGIC = b"DMA1"  # 4 bytes header magic
-SALT_SIZE = 16
-NONCE_SIZE = 12
-ITERATIONS = 200_000  # PBKDF2 iterations
-
-
 # ---------------- crypto helpers ----------------
 
-def derive_key(password: str, salt: bytes) -> bytes:
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,
-        salt=salt,
-        iterations=ITERATIONS,
-    )
-    return kdf.derive(password.encode("utf-8"))
-
-
-def encrypt_bytes(data: bytes, password: str) -> bytes:
-    salt = secrets.token_bytes(SALT_SIZE)
-    key = derive_key(password, salt)
-    aes = AESGCM(key)
-    nonce = secrets.token_bytes(NONCE_SIZE)
-    comp = zlib.compress(data, level=6)
-    ct = aes.encrypt(nonce, comp, None)
-    return HEADER_MAGIC + salt + nonce + ct
-
-
-def decrypt_bytes(blob: bytes, password: str) -> bytes:
-    if not blob.startswith(HEADER_MAGIC) or len(blob) < 4 + SALT_SIZE + NONCE_SIZE + 16:
-        raise ValueError("File bukan format .dma yang valid")
-    salt = blob[4:4 + SALT_SIZE]
-    nonce = blob[4 + SALT_SIZE:4 + SALT_SIZE + NONCE_SIZE]
-    ct = blob[4 + SALT_SIZE + NONCE_SIZE:]
-    key = derive_key(password, salt)
-    aes = AESGCM(key)
-    comp = aes.decrypt(nonce, ct, None)
-    return zlib.decompress(comp)
+# Format .dma ada di _dma_crypto.py (dipakai bersama folder_locker_v2.py):
+# file baru ditulis sebagai DMA3 (chunk streaming), file DMA1/DMA2 lama tetap bisa dibuka.
+from _dma_crypto import SessionKeys
+from _dma_manifest import LockManifest, LockPlan, build_plan
+from _dma_pool import FilePool
+from _dma_vault import lock_folder_to_vault, unlock_vault, vault_path
 
 
 # ---------------- worker ----------------
@@ -87,6 +54,9 @@ class TaskConfig:
     password: str
     keep_to_trash: bool
     mode: str  # 'lock' | 'unlock'
+    vault: bool = False  # lock ke satu arsip .dmav (unlock otomatis jika vault ada)
+    manifest: Optional[LockManifest] = None  # diisi PlanWorker bersama plan (delta sudah dikonfirmasi)
+    plan: Optional[LockPlan] = None
 
 
 class Worker(QThread):
@@ -101,73 +71,155 @@ class Worker(QThread):
     def run(self):
         try:
             if self.cfg.mode == 'lock':
-                self._lock_folder()
+                if self.cfg.vault:
+                    self._lock_vault()
+                else:
+                    self._lock_folder()
             else:
                 self._unlock_folder()
             self.finished.emit(True, "Selesai")
         except Exception as e:
             self.finished.emit(False, f"Gagal: {e}")
 
-    def _iter_files(self, exts: Optional[List[str]] = None):
-        root = self.cfg.folder
-        all_files = []
-        for p in root.rglob("*"):
-            if p.is_file():
-                if exts is None or p.suffix.lower() in exts:
-                    all_files.append(p)
-        return all_files
+    def _plan(self, mode: str):
+        # biasanya plan sudah dibuat UI (ringkasan delta ditampilkan sebelum mulai)
+        if self.cfg.plan is not None:
+            manifest, plan = self.cfg.manifest, self.cfg.plan
+        else:
+            manifest = LockManifest(self.cfg.folder, SessionKeys(self.cfg.password))
+            plan = build_plan(manifest, mode)
+        # sisa file sementara dari proses yang terhenti (crash/ditutup paksa)
+        for p in plan.partial:
+            p.unlink(missing_ok=True)
+        return manifest, plan
 
     def _lock_folder(self):
-        files = self._iter_files(exts=None)  # semua file
-        if not files:
-            self.status.emit("Tidak ada file.")
+        manifest, plan = self._plan('lock')
+        if not plan.total:
+            self.status.emit("Tidak ada perubahan." if plan.unchanged else "Tidak ada file.")
+            manifest.save()
             return
-        total = len(files)
+        self.status.emit(plan.summary())
+        total = plan.total
         done = 0
-        for f in files:
-            # skip jika sudah terenkripsi
-            if f.suffix == ".dma":
+        if plan.drop:
+            # file asli kembali tanpa perubahan: .dma-nya masih berlaku, cukup dibuang
+            for p in self._remove_originals(plan.drop):
+                self.status.emit(f"GAGAL: {p.name} -> tidak bisa dibuang")
+            done = len(plan.drop)
+            self.progress.emit(int(done * 100 / total))
+
+        # enkripsi paralel (FilePool); manifest dan trash/hapus file asli tetap di thread ini
+        try:
+            for f, rec, err in FilePool().run(plan.todo, manifest.lock_file):
+                try:
+                    if err:
+                        raise err
+                    manifest.record(*rec)
+                    # move original to trash atau hapus
+                    if self.cfg.keep_to_trash and send2trash is not None:
+                        send2trash(str(f))
+                    else:
+                        f.unlink(missing_ok=True)
+                    self.status.emit(f"LOCK: {f.relative_to(self.cfg.folder)}")
+                except Exception as e:
+                    self.status.emit(f"GAGAL: {f.name} -> {e}")
                 done += 1
                 self.progress.emit(int(done * 100 / total))
-                continue
+        finally:
+            manifest.save()
+
+    def _remove_originals(self, paths):
+        # file/folder asli yang sudah terkunci (folder dibuang utuh); return path yang gagal dibuang
+        trash = self.cfg.keep_to_trash and send2trash is not None
+        if trash:
+            # send2trash menerima list: satu panggilan untuk semua item
+            try:
+                send2trash([str(p) for p in paths])
+                return []
+            except Exception:
+                pass  # ulangi per file yang masih ada supaya yang gagal diketahui
+        failed = []
+        for p in paths:
             try:
-                data = f.read_bytes()
-                blob = encrypt_bytes(data, self.cfg.password)
-                out = f.with_suffix(f.suffix + ".dma")
-                out.write_bytes(blob)
-                # move original to trash atau hapus
-                if self.cfg.keep_to_trash and send2trash is not None:
-                    send2trash(str(f))
+                if trash and p.exists():
+                    send2trash(str(p))
+                elif p.is_dir() and not p.is_symlink():
+                    shutil.rmtree(p)
                 else:
-                    f.unlink(missing_ok=True)
-                self.status.emit(f"LOCK: {f.relative_to(self.cfg.folder)}")
-            except Exception as e:
-                self.status.emit(f"GAGAL: {f.name} -> {e}")
-            done += 1
+                    p.unlink(missing_ok=True)
+            except Exception:
+                failed.append(p)
+        return failed
+
+    def _vault_progress(self, action):
+        def on_result(rel, err, done, total):
+            self.status.emit(f"{action}: {rel}" if err is None else f"GAGAL: {rel} -> {err}")
             self.progress.emit(int(done * 100 / total))
+        return on_result
+
+    def _lock_vault(self):
+        keys = SessionKeys(self.cfg.password)
+        ok, failed, not_removed = lock_folder_to_vault(self.cfg.folder, keys, self._remove_originals,
+                                                       self._vault_progress("LOCK"))
+        if not ok and not failed:
+            self.status.emit("Tidak ada file.")
+        elif failed:
+            raise RuntimeError(f"{failed} file gagal masuk vault (file asli tetap ada)")
+        if not_removed:
+            raise RuntimeError(f"{not_removed} item asli gagal dibuang (isinya sudah aman di vault)")
 
     def _unlock_folder(self):
-        files = self._iter_files(exts=['.dma'])
-        if not files:
-            self.status.emit("Tidak ada file .dma.")
+        manifest, plan = self._plan('unlock')
+        vault_result = unlock_vault(self.cfg.folder, manifest.keys, self._vault_progress("UNLOCK"))
+        if vault_result and vault_result[1]:
+            raise RuntimeError(f"{vault_result[1]} file gagal diekstrak dari vault")
+        if not plan.total:
+            if vault_result is None:
+                self.status.emit("Tidak ada file .dma.")
+            manifest.save()
             return
-        total = len(files)
+        total = plan.total
         done = 0
-        for f in files:
-            try:
-                blob = f.read_bytes()
-                data = decrypt_bytes(blob, self.cfg.password)
-                # pulihkan nama: hapus '.dma' saja
-                orig = Path(str(f)[:-4])
-                orig.parent.mkdir(parents=True, exist_ok=True)
-                orig.write_bytes(data)
-                f.unlink(missing_ok=True)
-                self.status.emit(f"UNLOCK: {orig.relative_to(self.cfg.folder)}")
-            except Exception as e:
-                self.status.emit(f"GAGAL: {f.name} -> {e}")
+        # .dma yang file aslinya sudah ada dan sama: cukup dihapus
+        for f in plan.drop:
+            f.unlink(missing_ok=True)
             done += 1
+        if done:
             self.progress.emit(int(done * 100 / total))
 
+        # pulihkan nama: hapus '.dma' saja (LockManifest.unlock_file)
+        try:
+            for f, orig, err in FilePool().run(plan.todo, manifest.unlock_file):
+                if err is None:
+                    self.status.emit(f"UNLOCK: {orig.relative_to(self.cfg.folder)}")
+                else:
+                    self.status.emit(f"GAGAL: {f.name} -> {err}")
+                done += 1
+                self.progress.emit(int(done * 100 / total))
+        finally:
+            manifest.save()
+
+
+class PlanWorker(QThread):
+    # bandingkan folder dengan manifest di luar thread UI (PBKDF2, replay journal, scandir,
+    # hash file yang mtime-nya berubah); cfg.manifest & cfg.plan dikirim balik untuk konfirmasi
+    planned = Signal(object)        # TaskConfig
+    failed = Signal(str)
+
+    def __init__(self, cfg: TaskConfig):
+        super().__init__()
+        self.cfg = cfg
+
+    def run(self):
+        try:
+            self.cfg.manifest = LockManifest(self.cfg.folder, SessionKeys(self.cfg.password))
+            self.cfg.plan = build_plan(self.cfg.manifest, self.cfg.mode)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.planned.emit(self.cfg)
+
 
 # ---------------- UI ----------------
 
@@ -200,8 +252,10 @@ class Main(QMainWindow):
         r3 = QHBoxLayout()
         self.chk_trash = QCheckBox("Kirim file asli ke Recycle Bin (lebih aman)")
         self.chk_hide = QCheckBox("Quick Hide (Windows): set atribut +H +S pada folder")
+        self.chk_vault = QCheckBox("Mode vault (satu arsip .dmav)")
         r3.addWidget(self.chk_trash)
         r3.addWidget(self.chk_hide)
+        r3.addWidget(self.chk_vault)
 
         # Buttons
         r4 = QHBoxLayout()
@@ -227,6 +281,7 @@ class Main(QMainWindow):
         self.btn_unlock.clicked.connect(lambda: self.run(mode='unlock'))
 
         self.worker: Optional[Worker] = None
+        self.planner: Optional[PlanWorker] = None
 
     def pick_folder(self):
         d = QFileDialog.getExistingDirectory(self, "Pilih Folder")
@@ -246,11 +301,43 @@ class Main(QMainWindow):
             if pwd != self.ed_pass2.text():
                 QMessageBox.warning(self, "Peringatan", "Konfirmasi password tidak sama.")
                 return
+        cfg = TaskConfig(folder=folder, password=pwd, keep_to_trash=self.chk_trash.isChecked(), mode=mode,
+                         vault=self.chk_vault.isChecked())
+        if mode == 'lock' and cfg.vault:
+            self.start_worker(cfg)
+            return
+
+        # mode per file: delta terhadap manifest dihitung di thread lain, konfirmasi di on_planned
+        self.lb_status.setText("Membandingkan dengan manifest…")
+        self.setEnabled(False)
+        self.planner = PlanWorker(cfg)
+        self.planner.planned.connect(self.on_planned)
+        self.planner.failed.connect(self.on_plan_failed)
+        self.planner.start()
+
+    def on_plan_failed(self, msg: str):
+        self.setEnabled(True)
+        self.lb_status.setText(msg)
+        QMessageBox.warning(self, "Peringatan", msg)
+
+    def on_planned(self, cfg: TaskConfig):
+        self.setEnabled(True)
+        plan = cfg.plan
+        has_vault = cfg.mode == 'unlock' and vault_path(cfg.folder).exists()
+        self.lb_status.setText(plan.summary())
+        if not plan.total and not has_vault:
+            QMessageBox.information(self, "Tidak ada perubahan", plan.summary())
+            return
+        if plan.total and QMessageBox.question(
+                self, "Konfirmasi", f"{plan.summary()}\n\nLanjutkan?") != QMessageBox.Yes:
+            return
+        self.start_worker(cfg)
+
+    def start_worker(self, cfg: TaskConfig):
         self.pb.setValue(0)
         self.lb_status.setText("Memulai…")
         self.setEnabled(False)
 
-        cfg = TaskConfig(folder=folder, password=pwd, keep_to_trash=self.chk_trash.isChecked(), mode=mode)
         self.worker = Worker(cfg)
         self.worker.progress.connect(self.pb.setValue)
         self.worker.status.connect(self.lb_status.setText)
@@ -259,8 +346,9 @@ class Main(QMainWindow):
 
         # Quick Hide/Unhide (Windows only)
         if self.chk_hide.isChecked() and platform.system() == 'Windows':
+            folder = cfg.folder
             try:
-                if mode == 'lock':
+                if cfg.mode == 'lock':
                     # +H +S
                     ctypes.windll.kernel32.SetFileAttributesW(str(folder), 0x02 | 0x04)
                 else:
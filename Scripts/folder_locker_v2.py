@@ -4,16 +4,20 @@
 # - Password disimpan terenkripsi di config file (hanya atasan yang tahu)
 # - User biasa hanya perlu DROP folder dan klik LOCK/UNLOCK
 # - Setup mode: python folder_locker_v2.py --setup
+# - PREVIEW: lihat thumbnail foto di folder terkunci tanpa unlock (preview terenkripsi di .dma/vault)
 #
 # Dependencies: pip install PySide6 cryptography send2trash
+#               opsional: zstandard (kompresi lebih cepat untuk file yang bisa dikompres)
 # ---------------------------------------------------------------------
 
 import os
 import sys
 import json
-import zlib
 import secrets
+import shutil
 import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Optional, List
@@ -23,12 +27,12 @@ try:
 except ImportError:
     send2trash = None
 
-from PySide6.QtCore import Qt, QThread, Signal, QMimeData
+from PySide6.QtCore import Qt, QThread, Signal, QMimeData, QAbstractListModel, QModelIndex, QSize
 from PySide6.QtGui import QDragEnterEvent, QDropEvent, QImage, QPixmap
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QProgressBar, QMessageBox, QInputDialog, QLineEdit,
-    QListWidget, QListWidgetItem, QFrame
+    QListWidget, QListWidgetItem, QFrame, QCheckBox, QDialog, QListView
 )
 
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -40,6 +44,12 @@ import qrcode
 from io import BytesIO
 from PIL import Image, ImageQt
 
+from _dma_crypto import SessionKeys
+from _dma_manifest import MANIFEST_NAME, LockManifest, LockPlan, build_plan
+from _dma_pool import FilePool
+from _dma_preview import PREVIEW_SIZE, LockedPreviews
+from _dma_vault import VAULT_EXT, lock_folder_to_vault, unlock_vault, vault_path
+
 # --- Constants ---
 HEADER_MAGIC = b"DMA2"
 SALT_SIZE = 16
@@ -116,6 +126,15 @@ QListWidget {
 QListWidget:focus {
     border-color: #3b82f6;
 }
+QDialog {
+    background-color: #1a1a1a;
+}
+QListView#previews {
+    background-color: #252525;
+    border: none;
+    color: #aaa;
+    font-size: 11px;
+}
 """
 
 # --- Crypto Helpers ---
@@ -124,25 +143,8 @@ def derive_key(password: str, salt: bytes) -> bytes:
     kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=ITERATIONS)
     return kdf.derive(password.encode("utf-8"))
 
-def encrypt_bytes(data: bytes, password: str) -> bytes:
-    salt = secrets.token_bytes(SALT_SIZE)
-    key = derive_key(password, salt)
-    aes = AESGCM(key)
-    nonce = secrets.token_bytes(NONCE_SIZE)
-    comp = zlib.compress(data, level=6)
-    ct = aes.encrypt(nonce, comp, None)
-    return HEADER_MAGIC + salt + nonce + ct
-
-def decrypt_bytes(blob: bytes, password: str) -> bytes:
-    if not blob.startswith(HEADER_MAGIC) or len(blob) < 4 + SALT_SIZE + NONCE_SIZE + 16:
-        raise ValueError("File bukan format .dma yang valid")
-    salt = blob[4:4 + SALT_SIZE]
-    nonce = blob[4 + SALT_SIZE:4 + SALT_SIZE + NONCE_SIZE]
-    ct = blob[4 + SALT_SIZE + NONCE_SIZE:]
-    key = derive_key(password, salt)
-    aes = AESGCM(key)
-    comp = aes.decrypt(nonce, ct, None)
-    return zlib.decompress(comp)
+# File .dma: format DMA3 (chunk streaming) ada di _dma_crypto.py; file DMA2 lama tetap bisa dibuka.
+# encrypt_bytes/decrypt_bytes di sana tetap tersedia untuk data kecil di memori.
 
 # --- Config Management ---
 
@@ -182,6 +184,9 @@ class TaskConfig:
     folder: Path
     password: str
     mode: str
+    vault: bool = False     # lock ke satu arsip .dmav (unlock otomatis jika vault ada)
+    manifest: Optional[LockManifest] = None     # diisi PlanWorker bersama plan (delta sudah dikonfirmasi)
+    plan: Optional[LockPlan] = None
 
 class Worker(QThread):
     progress = Signal(int)
@@ -195,69 +200,153 @@ class Worker(QThread):
     def run(self):
         try:
             if self.cfg.mode == 'lock':
-                self._lock_folder()
+                if self.cfg.vault:
+                    self._lock_vault()
+                else:
+                    self._lock_folder()
             else:
                 self._unlock_folder()
             self.finished.emit(True, "Selesai!")
         except Exception as e:
             self.finished.emit(False, f"Gagal: {e}")
 
-    def _iter_files(self, ext_filter=None):
-        files = []
-        for p in self.cfg.folder.rglob("*"):
-            if p.is_file():
-                if ext_filter is None or p.suffix.lower() in ext_filter:
-                    files.append(p)
-        return files
+    def _plan(self, mode):
+        # Biasanya plan sudah dibuat UI (ringkasan delta ditampilkan sebelum mulai)
+        if self.cfg.plan is not None:
+            manifest, plan = self.cfg.manifest, self.cfg.plan
+        else:
+            manifest = LockManifest(self.cfg.folder, SessionKeys(self.cfg.password))
+            plan = build_plan(manifest, mode)
+        # Sisa file sementara dari proses yang terhenti (crash/ditutup paksa)
+        for p in plan.partial:
+            p.unlink(missing_ok=True)
+        return manifest, plan
 
     def _lock_folder(self):
-        files = self._iter_files()
-        if not files:
-            self.status.emit("Folder kosong.")
+        manifest, plan = self._plan('lock')
+        if not plan.total:
+            self.status.emit("Tidak ada perubahan." if plan.unchanged else "Folder kosong.")
+            manifest.save()
             return
-        total = len(files)
+        self.status.emit(plan.summary())
+        total = plan.total
         done = 0
-        for f in files:
-            if f.suffix == ".dma":
+        if plan.drop:
+            # File asli kembali tanpa perubahan: .dma-nya masih berlaku, cukup dibuang
+            for p in self._remove_originals(plan.drop):
+                self.status.emit(f"FAIL: {p.name}")
+            done = len(plan.drop)
+            self.progress.emit(int(done * 100 / total))
+
+        # Enkripsi paralel; manifest dan hapus/trash file asli tetap di thread ini
+        try:
+            for f, rec, err in FilePool().run(plan.todo, manifest.lock_file):
+                try:
+                    if err:
+                        raise err
+                    manifest.record(*rec)
+                    if send2trash:
+                        send2trash(str(f))
+                    else:
+                        f.unlink(missing_ok=True)
+                    self.status.emit(f"LOCK: {f.name}")
+                except Exception as e:
+                    self.status.emit(f"FAIL: {f.name}")
                 done += 1
                 self.progress.emit(int(done * 100 / total))
-                continue
+        finally:
+            manifest.save()
+
+    def _remove_originals(self, paths):
+        """Buang file/folder asli yang sudah terkunci (folder dibuang utuh). Return path yang gagal."""
+        if send2trash:
+            try:
+                send2trash([str(p) for p in paths])
+                return []
+            except Exception:
+                pass    # ulangi per file yang masih ada supaya yang gagal diketahui
+        failed = []
+        for p in paths:
             try:
-                data = f.read_bytes()
-                blob = encrypt_bytes(data, self.cfg.password)
-                out = f.with_suffix(f.suffix + ".dma")
-                out.write_bytes(blob)
-                if send2trash:
-                    send2trash(str(f))
+                if send2trash and p.exists():
+                    send2trash(str(p))
+                elif p.is_dir() and not p.is_symlink():
+                    shutil.rmtree(p)
                 else:
-                    f.unlink(missing_ok=True)
-                self.status.emit(f"LOCK: {f.name}")
-            except Exception as e:
-                self.status.emit(f"FAIL: {f.name}")
-            done += 1
+                    p.unlink(missing_ok=True)
+            except Exception:
+                failed.append(p)
+        return failed
+
+    def _vault_progress(self, action):
+        def on_result(rel, err, done, total):
+            self.status.emit(f"{action if err is None else 'FAIL'}: {Path(rel).name}")
             self.progress.emit(int(done * 100 / total))
+        return on_result
+
+    def _lock_vault(self):
+        keys = SessionKeys(self.cfg.password)
+        ok, failed, not_removed = lock_folder_to_vault(self.cfg.folder, keys, self._remove_originals,
+                                                       self._vault_progress("LOCK"))
+        if not ok and not failed:
+            self.status.emit("Folder kosong.")
+        elif failed:
+            raise RuntimeError(f"{failed} file gagal masuk vault (file asli tetap ada)")
+        if not_removed:
+            raise RuntimeError(f"{not_removed} item asli gagal dibuang (isinya sudah aman di vault)")
 
     def _unlock_folder(self):
-        files = self._iter_files(ext_filter=['.dma'])
-        if not files:
-            self.status.emit("Tidak ada file .dma.")
+        manifest, plan = self._plan('unlock')
+        vault_result = unlock_vault(self.cfg.folder, manifest.keys, self._vault_progress("UNLOCK"))
+        if vault_result and vault_result[1]:
+            raise RuntimeError(f"{vault_result[1]} file gagal diekstrak dari vault")
+        if not plan.total:
+            if vault_result is None:
+                self.status.emit("Tidak ada file .dma.")
+            manifest.save()
             return
-        total = len(files)
+        total = plan.total
         done = 0
-        for f in files:
-            try:
-                blob = f.read_bytes()
-                data = decrypt_bytes(blob, self.cfg.password)
-                orig = Path(str(f)[:-4])
-                orig.parent.mkdir(parents=True, exist_ok=True)
-                orig.write_bytes(data)
-                f.unlink(missing_ok=True)
-                self.status.emit(f"UNLOCK: {orig.name}")
-            except Exception as e:
-                self.status.emit(f"FAIL: {f.name}")
+        # .dma yang file aslinya sudah ada dan sama: cukup dihapus
+        for f in plan.drop:
+            f.unlink(missing_ok=True)
             done += 1
+        if done:
             self.progress.emit(int(done * 100 / total))
 
+        try:
+            for f, orig, err in FilePool().run(plan.todo, manifest.unlock_file):
+                if err is None:
+                    self.status.emit(f"UNLOCK: {orig.name}")
+                else:
+                    self.status.emit(f"FAIL: {f.name}")
+                done += 1
+                self.progress.emit(int(done * 100 / total))
+        finally:
+            manifest.save()
+
+class PlanWorker(QThread):
+    """
+    Bandingkan folder dengan manifest di luar thread UI: PBKDF2, replay journal, scandir, dan
+    hash file yang mtime-nya berubah bisa lama di NAS. Hasil (cfg.manifest, cfg.plan) dikirim
+    balik lewat planned untuk dikonfirmasi UI.
+    """
+    planned = Signal(object)    # TaskConfig dengan manifest & plan terisi
+    failed = Signal(str)
+
+    def __init__(self, cfg: TaskConfig):
+        super().__init__()
+        self.cfg = cfg
+
+    def run(self):
+        try:
+            self.cfg.manifest = LockManifest(self.cfg.folder, SessionKeys(self.cfg.password))
+            self.cfg.plan = build_plan(self.cfg.manifest, self.cfg.mode)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.planned.emit(self.cfg)
+
 # --- Drop Area Widget ---
 
 class DropArea(QListWidget):
@@ -316,7 +405,8 @@ class DropArea(QListWidget):
         
         # Count files
         all_files = list(folder.rglob("*"))
-        files_normal = [f for f in all_files if f.is_file() and f.suffix.lower() != ".dma"]
+        files_normal = [f for f in all_files if f.is_file() and f.suffix.lower() not in (".dma", VAULT_EXT)
+                        and f.name != MANIFEST_NAME]
         files_locked = [f for f in all_files if f.is_file() and f.suffix.lower() == ".dma"]
         
         # Header
@@ -337,6 +427,12 @@ class DropArea(QListWidget):
         stat2 = QListWidgetItem(f"  File terkunci (.dma): {len(files_locked)}")
         stat2.setFlags(Qt.NoItemFlags)
         self.addItem(stat2)
+
+        vault = vault_path(folder)
+        if vault.exists():
+            stat3 = QListWidgetItem(f"  Vault ({VAULT_EXT}): {vault.stat().st_size / (1024 * 1024):.1f} MB")
+            stat3.setFlags(Qt.NoItemFlags)
+            self.addItem(stat3)
         
         # Preview (max 10 files)
         sep2 = QListWidgetItem("")
@@ -355,6 +451,96 @@ class DropArea(QListWidget):
             more.setFlags(Qt.NoItemFlags)
             self.addItem(more)
 
+# --- Browse Preview (tanpa unlock) ---
+
+class PreviewModel(QAbstractListModel):
+    """
+    Model grid preview file terkunci. QListView hanya meminta DecorationRole untuk item yang
+    terlihat, jadi preview didekripsi (thread pool) sebatas yang sedang di-scroll; hasilnya
+    di-cache terbatas (LRU) sebagai QPixmap.
+    """
+    CACHE_ITEMS = 600
+    loaded = Signal(int, object)
+
+    def __init__(self, previews: LockedPreviews):
+        super().__init__()
+        self.previews = previews
+        self._cache = OrderedDict()     # row -> QPixmap atau None (tidak ada preview)
+        self._pending = set()
+        self._pool = ThreadPoolExecutor(max_workers=2)
+        self.loaded.connect(self._on_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.previews)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return Path(self.previews.name(row)).name
+        if role == Qt.ToolTipRole:
+            return self.previews.name(row)
+        if role == Qt.DecorationRole:
+            if row in self._cache:
+                self._cache.move_to_end(row)
+                return self._cache[row]
+            if row not in self._pending:
+                self._pending.add(row)
+                self._pool.submit(self._load, row)
+        return None
+
+    def _load(self, row):
+        # Thread pool: hanya bytes JPEG; QPixmap dibuat di thread UI
+        try:
+            data = self.previews.preview(row)
+        except Exception:
+            data = None
+        self.loaded.emit(row, data)
+
+    def _on_loaded(self, row, data):
+        self._pending.discard(row)
+        pix = None
+        if data:
+            img = QImage.fromData(data)
+            if not img.isNull():
+                pix = QPixmap.fromImage(img)
+        self._cache[row] = pix
+        while len(self._cache) > self.CACHE_ITEMS:
+            self._cache.popitem(last=False)
+        idx = self.index(row)
+        self.dataChanged.emit(idx, idx, [Qt.DecorationRole])
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PreviewDialog(QDialog):
+    def __init__(self, previews: LockedPreviews, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Preview: {previews.folder.name} ({len(previews)} file terkunci)")
+        self.resize(900, 650)
+        lay = QVBoxLayout(self)
+
+        self.model = PreviewModel(previews)
+        view = QListView()
+        view.setObjectName("previews")
+        view.setViewMode(QListView.IconMode)
+        view.setResizeMode(QListView.Adjust)
+        view.setMovement(QListView.Static)
+        view.setUniformItemSizes(True)
+        view.setLayoutMode(QListView.Batched)
+        view.setIconSize(QSize(PREVIEW_SIZE * 3 // 4, PREVIEW_SIZE * 3 // 4))
+        view.setGridSize(QSize(PREVIEW_SIZE * 3 // 4 + 20, PREVIEW_SIZE * 3 // 4 + 40))
+        view.setModel(self.model)
+        lay.addWidget(view)
+
+        hint = QLabel("Preview didekripsi ke memori saja; file tetap terkunci.")
+        hint.setObjectName("hint")
+        lay.addWidget(hint)
+
+    def done(self, result):
+        self.model.close()
+        super().done(result)
+
 # --- Main UI ---
 
 class MainWindow(QMainWindow):
@@ -364,6 +550,7 @@ class MainWindow(QMainWindow):
         self.password = config.get("password", "")
         self.totp_secret = config.get("totp", "")
         self.worker = None
+        self.planner = None
         self.setWindowTitle("DMA Folder Locker V2")
         self.setMinimumSize(500, 450) # Increased size and made resizable
         self.resize(500, 500)
@@ -401,6 +588,14 @@ class MainWindow(QMainWindow):
         r2.addWidget(self.btn_unlock)
         lay.addLayout(r2)
 
+        self.btn_preview = QPushButton("PREVIEW")
+        self.btn_preview.setEnabled(False)
+        self.btn_preview.clicked.connect(self.show_previews)
+        lay.addWidget(self.btn_preview)
+
+        self.chk_vault = QCheckBox("Mode vault: kunci ke satu arsip .dmav")
+        lay.addWidget(self.chk_vault)
+
         # Progress
         self.pb = QProgressBar()
         self.pb.setValue(0)
@@ -417,12 +612,44 @@ class MainWindow(QMainWindow):
         if folder:
             self.btn_lock.setEnabled(True)
             self.btn_unlock.setEnabled(True)
+            self.btn_preview.setEnabled(True)
             self.lb_status.setText(f"Siap: {folder}")
         else:
             self.btn_lock.setEnabled(False)
             self.btn_unlock.setEnabled(False)
+            self.btn_preview.setEnabled(False)
             self.lb_status.setText("Drop folder untuk mulai")
 
+    def verify_totp(self) -> bool:
+        if not self.totp_secret:
+            return True
+        code, ok = QInputDialog.getText(self, "Keamanan",
+            "Masukkan Kode Authenticator (6 digit):", QLineEdit.Password)
+        if not ok or not code:
+            return False
+        if not pyotp.TOTP(self.totp_secret).verify(code):
+            QMessageBox.critical(self, "Akses Ditolak", "Kode OTP Salah/Expired!")
+            return False
+        return True
+
+    def show_previews(self):
+        folder = self.drop_area.folder
+        if not folder or not folder.exists():
+            QMessageBox.warning(self, "Error", "Folder tidak valid.")
+            return
+        # Preview memperlihatkan isi folder: perlu OTP seperti unlock
+        if not self.verify_totp():
+            return
+        try:
+            previews = LockedPreviews(folder, SessionKeys(self.password))
+        except Exception as e:
+            QMessageBox.critical(self, "Gagal", str(e))
+            return
+        if not len(previews):
+            QMessageBox.information(self, "Preview", "Tidak ada file terkunci di folder ini.")
+            return
+        PreviewDialog(previews, self).exec()
+
     def run(self, mode: str):
         folder = self.drop_area.folder
         if not folder or not folder.exists():
@@ -430,22 +657,44 @@ class MainWindow(QMainWindow):
             return
 
         # TOTP Check for Unlock
-        if mode == 'unlock' and self.totp_secret:
-            code, ok = QInputDialog.getText(self, "Keamanan", 
-                "Masukkan Kode Authenticator (6 digit):", QLineEdit.Password)
-            if not ok or not code:
-                return
-            
-            totp = pyotp.TOTP(self.totp_secret)
-            if not totp.verify(code):
-                QMessageBox.critical(self, "Akses Ditolak", "Kode OTP Salah/Expired!")
-                return
+        if mode == 'unlock' and not self.verify_totp():
+            return
+
+        cfg = TaskConfig(folder=folder, password=self.password, mode=mode, vault=self.chk_vault.isChecked())
+        if mode == 'lock' and cfg.vault:
+            self.start_worker(cfg)
+            return
+
+        # Mode per file: delta terhadap manifest dihitung di thread lain, konfirmasi di on_planned
+        self.lb_status.setText("Membandingkan dengan manifest...")
+        self.setEnabled(False)
+        self.planner = PlanWorker(cfg)
+        self.planner.planned.connect(self.on_planned)
+        self.planner.failed.connect(self.on_plan_failed)
+        self.planner.start()
 
+    def on_plan_failed(self, msg: str):
+        self.setEnabled(True)
+        self.lb_status.setText(msg)
+        QMessageBox.critical(self, "Gagal", msg)
+
+    def on_planned(self, cfg: TaskConfig):
+        self.setEnabled(True)
+        plan = cfg.plan
+        has_vault = cfg.mode == 'unlock' and vault_path(cfg.folder).exists()
+        self.lb_status.setText(plan.summary())
+        if not plan.total and not has_vault:
+            QMessageBox.information(self, "Tidak ada perubahan", plan.summary())
+            return
+        if plan.total and QMessageBox.question(
+                self, "Konfirmasi", f"{plan.summary()}\n\nLanjutkan?") != QMessageBox.Yes:
+            return
+        self.start_worker(cfg)
+
+    def start_worker(self, cfg: TaskConfig):
         self.pb.setValue(0)
         self.lb_status.setText("Memproses...")
         self.setEnabled(False)
-
-        cfg = TaskConfig(folder=folder, password=self.password, mode=mode)
         self.worker = Worker(cfg)
         self.worker.progress.connect(self.pb.setValue)
         self.worker.status.connect(self.lb_status.setText)
@@ -458,6 +707,7 @@ class MainWindow(QMainWindow):
         self.drop_area.reset_view()
         self.btn_lock.setEnabled(False)
         self.btn_unlock.setEnabled(False)
+        self.btn_preview.setEnabled(False)
         if ok:
             QMessageBox.information(self, "Selesai", msg)
         else:
@@ -4,20 +4,35 @@
 # - Dual Mode: Manual (Select per Photo) & Auto (First PSD for All)
 # - Unified UI with TextBox Input in DropZone
 # - BMachine Integration (Progress Reporting)
+# - Headless Auto Mode: --headless --master X --pilihan Y (NDJSON progress, tanpa GUI)
 # - Dark Theme & Modern UI
 
 import os
-import re
 import shutil
 import sys
 import json
 import threading
 import time
 import tempfile
+
+# Mode headless (tanpa GUI, untuk batch_wrapper.py): harus dicek sebelum import tkinter/PIL
+if __name__ == "__main__" and "--headless" in sys.argv[1:]:
+    from _bucin_auto import headless_main
+    sys.exit(headless_main(sys.argv[1:]))
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from PIL import Image, ImageTk
 
+from _bucin_preview import PreviewPrefetcher, exif_thumbnail, open_preview
+from _thumb_cache import shared_cache
+from _bucin_scan import DEBOUNCE_MS, FolderScanService
+from _bucin_commit import CommitQueue
+from _bucin_auto import (AutoCopyPool, collect_jpgs_with_relpath, collect_psd_masters,
+                         compute_target_name, plan_auto_jobs, write_resolution_report)
+from _bucin_report import PAGE_SIZE, STATUSES, ReportIndex
+from _psd_catalog import CATALOG, thumbnail_image
+
 # --- Optional Drag & Drop Support ---
 try:
     from tkinterdnd2 import DND_FILES, TkinterDnD
@@ -29,6 +44,11 @@ except ImportError:
 SETTINGS_FILE = os.path.join(os.path.expanduser("~"), ".psdbucin_v3_settings.json")
 DEFAULT_WIDTH = 1000
 DEFAULT_HEIGHT = 700
+# Tick update UI mode otomatis & jeda minimum antar penulisan file progress BMachine
+AUTO_TICK_MS = 100
+PROGRESS_INTERVAL = 0.25
+# Ukuran maksimum thumbnail template di tombol/daftar PSD
+MASTER_THUMB_SIZE = (96, 64)
 
 # Theme Constants
 COLOR_BG = "#18181b"          # Zinc-950
@@ -46,15 +66,17 @@ FONT_TITLE = ("Segoe UI", 16, "bold")
 FONT_BIG = ("Segoe UI", 24, "bold")
 FONT_HINT = ("Segoe UI", 9)
 
-# Regex
-ONLY_PAREN = re.compile(r'^\(\s*(\d+)\s*\)$')
-SPACE_FORM = re.compile(r'^(\d+)\s*\(\s*\d+\s*\)(?:\b.*)?$')
-TIGHT_FORM = re.compile(r'^\d+\(\s*(\d+)\s*\)$')
-
 
 # --- BMachine Integration ---
-def report_progress(current, total, filename):
-    """Tulis progress ke file temp agar BMachine bisa membacanya."""
+_last_progress = 0.0
+
+def report_progress(current, total, filename, force=False):
+    """Tulis progress ke file temp agar BMachine bisa membacanya (maks. ~4x/detik, posisi akhir/force selalu ditulis)."""
+    global _last_progress
+    now = time.monotonic()
+    if not force and current < total and now - _last_progress < PROGRESS_INTERVAL:
+        return
+    _last_progress = now
     try:
         progress_file = os.path.join(tempfile.gettempdir(), 'bmachine_progress.json')
         data = {'current': current, 'total': total, 'file': filename, 'status': 'processing'}
@@ -104,45 +126,6 @@ def save_settings(data):
         pass
 
 # --- Utility Functions ---
-def collect_psd_masters(master_dir):
-    masters = []
-    try:
-        for root, _, files in os.walk(master_dir):
-            for f in files:
-                if f.lower().endswith(('.psd', '.psb')):
-                    full_path = os.path.join(root, f)
-                    rel_path = os.path.relpath(full_path, master_dir)
-                    masters.append((rel_path, full_path))
-    except Exception:
-        return []
-        
-    masters.sort(key=lambda x: x[0].lower())
-    return masters
-
-def collect_jpgs_with_relpath(pilihan_dir):
-    jpgs = []
-    try:
-        for root, _, files in os.walk(pilihan_dir):
-            for fn in files:
-                if fn.lower().endswith(('.jpg', '.jpeg')):
-                    full = os.path.join(root, fn)
-                    rel = os.path.relpath(full, pilihan_dir)
-                    jpgs.append((full, rel))
-    except Exception:
-        return []
-    jpgs.sort(key=lambda x: x[1].lower())
-    return jpgs
-
-def compute_target_name(jpg_name):
-    n = os.path.splitext(jpg_name)[0].strip()
-    m = ONLY_PAREN.match(n)
-    if m: return m.group(1)
-    m = SPACE_FORM.match(n)
-    if m: return m.group(1)
-    m = TIGHT_FORM.match(n)
-    if m: return m.group(1)
-    return n
-
 def center_window(win):
     win.update_idletasks()
     w = win.winfo_width()
@@ -193,6 +176,7 @@ class DropZone(tk.Frame):
     def __init__(self, master, title, icon="📂", initial_path="", on_change=None, **kwargs):
         super().__init__(master, bg=COLOR_SURFACE, highlightbackground=COLOR_BORDER, highlightthickness=2, cursor="hand2", **kwargs)
         self.on_change = on_change
+        self._input_job = None
         self.path = initial_path
         self.title_text = title
         self.path = initial_path
@@ -242,6 +226,8 @@ class DropZone(tk.Frame):
         self.set_path(self.path) # Init display
 
     def destroy(self):
+        if self._input_job is not None:
+            self.after_cancel(self._input_job)
         if HAS_DND:
             try: self.drop_target_unregister()
             except: pass
@@ -267,6 +253,13 @@ class DropZone(tk.Frame):
             if os.path.isdir(path): self.set_path(path)
             
     def on_entry_input(self, event=None):
+        # Debounce: cek path (bisa lambat di NAS) setelah user berhenti mengetik
+        if self._input_job is not None:
+            self.after_cancel(self._input_job)
+        self._input_job = self.after(DEBOUNCE_MS, self._apply_entry_input)
+
+    def _apply_entry_input(self):
+        self._input_job = None
         path = self.entry.get().strip()
         if os.path.exists(path):
              self.path = path.replace("/", "\\")
@@ -456,9 +449,27 @@ class BucinAppV3:
         self.settings["window_x"] = self.root.winfo_x()
         self.settings["window_y"] = self.root.winfo_y()
         save_settings(self.settings)
+        if getattr(self, 'commit_queue', None):
+            # Jangan tinggalkan salinan setengah jalan di NAS
+            self.commit_queue.close(timeout=60)
         self.root.destroy()
             
     def clear_ui(self):
+        if getattr(self, '_report_search_job', None):
+            self.root.after_cancel(self._report_search_job)
+            self._report_search_job = None
+        if getattr(self, '_auto_tick', None):
+            self.root.after_cancel(self._auto_tick)
+            self._auto_tick = None
+        if getattr(self, '_commit_poll', None):
+            self.root.after_cancel(self._commit_poll)
+            self._commit_poll = None
+        if getattr(self, 'folder_scan', None):
+            self.folder_scan.close()
+            self.folder_scan = None
+        if getattr(self, 'prefetcher', None):
+            self.prefetcher.close()
+            self.prefetcher = None
         if hasattr(self, 'ui_root'):
              self.ui_root.destroy()
         
@@ -468,6 +479,10 @@ class BucinAppV3:
     # --- UI: Setup Page ---
     def setup_ui_setup(self):
         self.clear_ui()
+        # Scan folder di background; hasilnya dipakai ulang oleh prepare_data
+        self.folder_scan = FolderScanService(self.root, {"master": collect_psd_masters,
+                                                         "pilihan": collect_jpgs_with_relpath},
+                                             self.on_scan_done)
         
         # Main Grid
         self.ui_root.columnconfigure(0, weight=1)
@@ -523,44 +538,38 @@ class BucinAppV3:
         if not m or not p:
             self.lbl_status.config(text="Pilih kedua folder dulu...", fg="#52525b")
             self._set_buttons_state(False)
+            self.folder_scan.cancel()
             return
             
-        # Quick validation
-        if not os.path.isdir(m):
-             self.lbl_status.config(text="⚠️ Folder Master tidak valid", fg=COLOR_ACCENT_RED)
-             return
-        if not os.path.isdir(p):
-             self.lbl_status.config(text="⚠️ Folder Foto tidak valid", fg=COLOR_ACCENT_RED)
-             return
-             
-        # Count files (lightweight)
-        try:
-            # Recursive PSD count
-            n_psd = 0
-            for r, _, f in os.walk(m):
-                for x in f:
-                    if x.lower().endswith(('.psd', '.psb')): n_psd += 1
-            
-            # Recursive JPG count
-            n_jpg = 0
-            for r, _, f in os.walk(p):
-                for x in f:
-                    if x.lower().endswith(('.jpg','.jpeg')): n_jpg += 1
-                    
-            if n_psd == 0:
-                self.lbl_status.config(text="⚠️ Tidak ada PSD di folder Master", fg=COLOR_ACCENT_RED)
-                self._set_buttons_state(False)
-                return
-            if n_jpg == 0:
-                self.lbl_status.config(text="⚠️ Tidak ada JPG di folder Foto", fg=COLOR_ACCENT_RED)
-                self._set_buttons_state(False)
+        # Walk folder di background (debounce + batalkan scan lama), UI tetap responsif
+        self.lbl_status.config(text="⏳ Memindai folder...", fg="#a1a1aa")
+        self._set_buttons_state(False)
+        self.folder_scan.request({"master": m, "pilihan": p})
+
+    def on_scan_done(self, results):
+        masters, jpgs = results["master"], results["pilihan"]
+        if isinstance(masters, NotADirectoryError):
+            self.lbl_status.config(text="⚠️ Folder Master tidak valid", fg=COLOR_ACCENT_RED)
+            return
+        if isinstance(jpgs, NotADirectoryError):
+            self.lbl_status.config(text="⚠️ Folder Foto tidak valid", fg=COLOR_ACCENT_RED)
+            return
+        for res in (masters, jpgs):
+            if isinstance(res, Exception):
+                self.lbl_status.config(text=f"Error: {str(res)}", fg=COLOR_ACCENT_RED)
                 return
-                
-            self.lbl_status.config(text=f"Siap: {n_psd} Template • {n_jpg} Foto", fg=COLOR_ACCENT_GREEN)
-            self._set_buttons_state(True)
-            
-        except Exception as e:
-            self.lbl_status.config(text=f"Error: {str(e)}", fg=COLOR_ACCENT_RED)
+
+        if not masters:
+            self.lbl_status.config(text="⚠️ Tidak ada PSD di folder Master", fg=COLOR_ACCENT_RED)
+            self._set_buttons_state(False)
+            return
+        if not jpgs:
+            self.lbl_status.config(text="⚠️ Tidak ada JPG di folder Foto", fg=COLOR_ACCENT_RED)
+            self._set_buttons_state(False)
+            return
+
+        self.lbl_status.config(text=f"Siap: {len(masters)} Template • {len(jpgs)} Foto", fg=COLOR_ACCENT_GREEN)
+        self._set_buttons_state(True)
 
     def _set_buttons_state(self, enabled):
         state = "normal" if enabled else "disabled"
@@ -580,11 +589,17 @@ class BucinAppV3:
         if not os.path.exists(m) or not os.path.exists(p):
             raise ValueError("Salah satu folder tidak dapat diakses.")
         
-        self.psd_masters = collect_psd_masters(m)
+        # Hasil scan layar setup dipakai langsung; walk ulang hanya jika belum ada
+        scan = getattr(self, 'folder_scan', None)
+        self.psd_masters = scan.result("master", m) if scan else None
+        if self.psd_masters is None:
+            self.psd_masters = collect_psd_masters(m)
         if not self.psd_masters:
             raise ValueError("Tidak ditemukan file PSD di folder Master.")
             
-        self.jpgs = collect_jpgs_with_relpath(p)
+        self.jpgs = scan.result("pilihan", p) if scan else None
+        if self.jpgs is None:
+            self.jpgs = collect_jpgs_with_relpath(p)
         if not self.jpgs:
             raise ValueError("Tidak ditemukan file JPG di folder Foto.")
         
@@ -613,8 +628,23 @@ class BucinAppV3:
         self.current_idx = -1
         self.logs = []
         self.is_processing = False
+        # Salin master di background; slot self.logs diisi menyusul lewat poll_commits
+        self.commit_queue = CommitQueue(self.manual_process_thread)
+        self.failed_commits = []
+        self._commit_poll = self.root.after(100, self.poll_commits)
         self.original_image = None
         self.photo = None
+        # Preview: path aktif, ukuran canvas saat decode (None = masih thumbnail EXIF), rotasi manual
+        self._preview_path = None
+        self._preview_box = None
+        self._preview_reduced = False
+        self._preview_rot = 0
+        # Decode-ahead foto berikutnya di background (LRU kecil, ikut ukuran canvas)
+        self.prefetcher = PreviewPrefetcher([full for full, _ in self.jpgs], smart_rotate=False,
+                                            cache=shared_cache())
+        # Thumbnail template dari katalog PSD (header + resource 1036 saja), dimuat di background
+        self.master_photos = {}
+        threading.Thread(target=self.load_master_thumbs, args=(list(self.psd_masters),), daemon=True).start()
         self.psd_buttons = []
         self.shortcuts = self.settings.get("shortcuts", [str(i+1) for i in range(9)])
         
@@ -679,7 +709,15 @@ class BucinAppV3:
         cw = self.canvas.winfo_width()
         ch = self.canvas.winfo_height()
         if cw < 10 or ch < 10: return
-        
+        if self.prefetcher:
+            self.prefetcher.set_box((cw, ch))
+        
+        box = self._preview_box
+        if box and self._preview_reduced and (cw > box[0] or ch > box[1]):
+            # Canvas membesar (mis. maximize): decode ulang dengan skala draft yang lebih besar
+            try: self._decode_preview(self._preview_path, (cw, ch))
+            except Exception: pass
+
         iw, ih = self.original_image.size
         ratio = min(cw/iw, ch/ih)
         nw, nh = int(iw*ratio), int(ih*ratio)
@@ -709,15 +747,52 @@ class BucinAppV3:
         report_progress(self.current_idx, len(self.jpgs), "Manual Process")
 
         if self.current_idx >= len(self.jpgs):
-            self.finish_processing()
+            self.finish_manual()
             return
             
         full_jpg, rel_jpg = self.jpgs[self.current_idx]
         self.lbl_progress.config(text=f"{self.current_idx + 1}/{len(self.jpgs)}")
         self.lbl_filename.config(text=rel_jpg)
         
+        self._preview_path = full_jpg
+        self._preview_box = None
+        self._preview_rot = 0
+
+        self.prefetcher.request(self.current_idx)
+        box = (self.canvas.winfo_width(), self.canvas.winfo_height())
+        ready = self.prefetcher.get(self.current_idx, box)
+        if ready is not None:
+            # Sudah di-decode & di-scale oleh prefetcher: cukup buat PhotoImage
+            self.original_image, self._preview_reduced = ready
+            self._preview_box = box
+            self.update_image_display()
+        else:
+            # First paint instan dari thumbnail EXIF; preview asli (JPEG draft mode, hanya sebesar canvas)
+            # di-decode di tick berikutnya supaya thumbnail sempat tergambar dulu.
+            thumb = exif_thumbnail(full_jpg, smart_rotate=False)
+            if thumb is not None:
+                self.original_image = thumb
+                self.update_image_display()
+                self.root.after(1, lambda idx=self.current_idx: self._finish_preview(idx))
+            else:
+                self._finish_preview(self.current_idx)
+
+    def _decode_preview(self, full_jpg, box):
+        img, self._preview_reduced = open_preview(full_jpg, box, smart_rotate=False, cache=shared_cache())
+        for _ in range(self._preview_rot):
+            img = img.transpose(Image.ROTATE_270)
+        self._preview_box = box
+        self.original_image = img
+
+    def _finish_preview(self, idx):
+        if idx != self.current_idx or not hasattr(self, 'canvas'):
+            return  # Sudah pindah foto
         try:
-            self.original_image = Image.open(full_jpg)
+            self.root.update_idletasks()
+            cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
+            if cw < 10 or ch < 10:
+                cw, ch = DEFAULT_WIDTH, DEFAULT_HEIGHT
+            self._decode_preview(self._preview_path, (cw, ch))
             self.update_image_display()
         except Exception as e:
             self.canvas.delete("all")
@@ -739,6 +814,8 @@ class BucinAppV3:
                            bg=color, fg="white", relief="flat", activebackground=color, activeforeground="white",
                            cursor="hand2", padx=20, pady=10,
                            command=lambda n=name, p=path: self.manual_process_init(n, p))
+            if path in self.master_photos:
+                btn.config(image=self.master_photos[path], compound="top")
             btn.pack(side="left", padx=5)
             self.psd_buttons.append(btn)
             
@@ -747,31 +824,94 @@ class BucinAppV3:
                                  cursor="hand2", padx=20, pady=10, command=self.skip_current)
         self.btn_skip.pack(side="left", padx=15)
 
+    def load_master_thumbs(self, masters):
+        thumbs = {}
+        for _, path in masters:
+            try:
+                img = thumbnail_image(CATALOG.get(path))
+            except Exception:
+                img = None
+            if img is not None:
+                img.thumbnail(MASTER_THUMB_SIZE)
+                thumbs[path] = img
+        CATALOG.save()
+        if thumbs:
+            self.root.after(0, lambda: self.apply_master_thumbs(thumbs))
+
+    def apply_master_thumbs(self, thumbs):
+        # PhotoImage harus dibuat di thread Tk
+        self.master_photos = {path: ImageTk.PhotoImage(img) for path, img in thumbs.items()}
+        if hasattr(self, 'btn_container') and self.btn_container.winfo_exists():
+            self.render_buttons()
+
     def manual_process_init(self, name, path):
         if self.is_processing: return
-        self.is_processing = True
-        self.toggle_inputs(False)
-        threading.Thread(target=self.manual_process_thread, args=(name, path)).start()
-        
-    def manual_process_thread(self, name, path):
-        full_jpg, rel_jpg = self.jpgs[self.current_idx]
+        rel_jpg = self.jpgs[self.current_idx][1]
+        # Masuk antrean salin, UI langsung lanjut; status final menyusul di slot log ini
+        self.logs.append(("PENDING", rel_jpg, f"Menyalin -> {name}"))
+        self.commit_queue.submit((len(self.logs) - 1, name, path, rel_jpg))
+        self.advance_when_ready()
+
+    def advance_when_ready(self):
+        # Antrean salin penuh (NAS tertinggal): tahan input sampai ada slot kosong
+        if self.commit_queue.full():
+            if not self.is_processing:
+                self.is_processing = True
+                self.toggle_inputs(False)
+            self.root.after(50, self.advance_when_ready)
+            return
+        if self.is_processing:
+            self.is_processing = False
+            self.toggle_inputs(True)
+        self.load_next_image()
+
+    def manual_process_thread(self, job):
+        _, name, path, rel_jpg = job
         ext = os.path.splitext(path)[1].lower()
         tname = compute_target_name(os.path.basename(rel_jpg))
         tdir = os.path.join(self.master_dir, os.path.dirname(rel_jpg))
+        dst = os.path.join(tdir, f"{tname}{ext}")
         
         try:
             os.makedirs(tdir, exist_ok=True)
-            dst = os.path.join(tdir, f"{tname}{ext}")
             
             if os.path.exists(dst):
-                log = ("EXIST", rel_jpg, f"Sudah ada ({name})")
-            else:
-                shutil.copy2(path, dst)
-                log = ("OK", rel_jpg, f"Sukses -> {name}")
+                return ("EXIST", rel_jpg, f"Sudah ada ({name})")
+            shutil.copy2(path, dst)
+            return ("OK", rel_jpg, f"Sukses -> {name}")
         except Exception as e:
-            log = ("FAIL", rel_jpg, str(e))
-            
-        self.root.after(0, lambda: self.process_done(log))
+            # Salinan setengah jadi dihapus supaya retry tidak terbaca "Sudah ada"
+            try:
+                if os.path.exists(dst): os.remove(dst)
+            except Exception:
+                pass
+            return ("FAIL", rel_jpg, str(e))
+
+    def poll_commits(self):
+        for job, log in self.commit_queue.poll():
+            self.logs[job[0]] = log
+            if log[0] == "FAIL":
+                self.failed_commits.append(job)
+        self._commit_poll = self.root.after(100, self.poll_commits)
+
+    def finish_manual(self):
+        # Laporan baru dibuat setelah semua salinan di antrean selesai
+        if self.commit_queue.pending:
+            if not self.is_processing:
+                self.is_processing = True
+                self.toggle_inputs(False)
+            self.root.after(100, self.finish_manual)
+            return
+        failed, self.failed_commits = self.failed_commits, []
+        if failed and messagebox.askyesno("Gagal Menyalin",
+                                          f"{len(failed)} file gagal disalin.\n\nCoba salin ulang?"):
+            for job in failed:
+                self.logs[job[0]] = ("PENDING", job[3], f"Menyalin ulang -> {job[1]}")
+                self.commit_queue.submit(job)
+            self.root.after(100, self.finish_manual)
+            return
+        self.commit_queue.close()
+        self.finish_processing()
 
     def select_psd_by_index(self, idx):
         if not self.is_processing and 0 <= idx < len(self.psd_masters):
@@ -789,12 +929,6 @@ class BucinAppV3:
         self.logs.append(("SKIP", rel, "Dilewati user"))
         self.load_next_image()
         
-    def process_done(self, log):
-        self.logs.append(log)
-        self.is_processing = False
-        self.toggle_inputs(True)
-        self.load_next_image()
-        
     def open_settings(self):
         SettingsDialogV3(self.root, self.psd_masters, self.shortcuts, self.on_settings_saved)
 
@@ -835,81 +969,51 @@ class BucinAppV3:
         
         self.is_cancelled = False
         self.logs = []
+        self.auto_pool = AutoCopyPool()
         threading.Thread(target=self.auto_process_thread).start()
+        self._auto_tick = self.root.after(AUTO_TICK_MS, self.tick_auto)
         
     def cancel_auto(self):
         self.is_cancelled = True
         self.btn_cancel.config(text="MEMBATALKAN...", state="disabled")
 
     def auto_process_thread(self):
-        # Auto Mode Strategy: Smart Matching (Folder Class Based)
-        # 1. Build Map: { "Relative/Folder/Path": "Full/Path/To/Template.psd" }
-        psd_map = {}
-        fallback_psd = None
-        if self.psd_masters:
-             fallback_psd = self.psd_masters[0][1]
-
-        for rel_name, full_path in self.psd_masters:
-             # rel_name example: "KELAS A/Template.psd"
-             # dirname: "KELAS A"
-             p_dir = os.path.dirname(rel_name)
-             # Normalize for matching
-             p_dir_norm = p_dir.replace("\\", "/").strip().lower()
-             if p_dir_norm not in psd_map:
-                 psd_map[p_dir_norm] = full_path
-
-        total = len(self.jpgs)
-        
-        for i, (full_jpg, rel_jpg) in enumerate(self.jpgs):
-            if self.is_cancelled: break
-            
-            # Update UI
-            msg = f"Memproses {i+1}/{total}: {rel_jpg}"
-            self.root.after(0, lambda m=msg: self.lbl_auto_status.config(text=m))
-            report_progress(i+1, total, rel_jpg) # BMachine
-            
-            try:
-                # 2. Match JPG Folder to PSD Folder
-                # rel_jpg example: "KELAS A/Anak1.jpg" -> "KELAS A"
-                jpg_dir = os.path.dirname(rel_jpg)
-                jpg_dir_norm = jpg_dir.replace("\\", "/").strip().lower()
-                
-                selected_master = psd_map.get(jpg_dir_norm)
-                
-                # Fallback Logic
-                if not selected_master:
-                     # Try finding partial match? No, stick to explicit matching first.
-                     selected_master = fallback_psd
-                     
-                if not selected_master:
-                     raise Exception("No Master PSD found")
-
-                master_ext = os.path.splitext(selected_master)[1].lower()
-                master_name = os.path.basename(selected_master)
-
-                tname = compute_target_name(os.path.basename(rel_jpg))
-                tdir = os.path.join(self.master_dir, os.path.dirname(rel_jpg))
-                os.makedirs(tdir, exist_ok=True)
-                dst = os.path.join(tdir, f"{tname}{master_ext}")
-                
-                if os.path.exists(dst):
-                     self.logs.append(("EXIST", rel_jpg, f"Sudah ada"))
-                else:
-                    shutil.copy2(selected_master, dst)
-                    self.logs.append(("OK", rel_jpg, f"Sukses -> {master_name}"))
-                    
-            except Exception as e:
-                self.logs.append(("FAIL", rel_jpg, str(e)))
-                
-        self.root.after(0, self.finish_processing)
+        # Auto Mode Strategy: Smart Matching (Folder Class Based) -> daftar job, lalu salin paralel
+        self.resolution = []
+        try:
+            jobs = plan_auto_jobs(self.psd_masters, self.jpgs, self.master_dir, self.resolution)
+            write_resolution_report(self.resolution)
+            self.logs = self.auto_pool.run(jobs, lambda: self.is_cancelled)
+        finally:
+            # Selalu ke laporan (dan hentikan tick), juga jika planning/salin melempar error
+            self.root.after(0, self.finish_processing)
+
+    def tick_auto(self):
+        # Status UI & progress BMachine dari counter pool, bukan satu event per file.
+        # Dijadwalkan ulang sampai finish_processing menghentikannya (pool selesai/batal).
+        pool = self.auto_pool
+        if pool.total:
+            self.lbl_auto_status.config(text=f"Memproses {pool.done}/{pool.total}: {pool.last}")
+            report_progress(pool.done, pool.total, pool.last)
+        self._auto_tick = self.root.after(AUTO_TICK_MS, self.tick_auto)
         
     # --- Report ---
     def finish_processing(self):
+        # Mode otomatis: hentikan tick, lalu tulis posisi akhir pool (tick terakhir bisa belum jalan)
+        if getattr(self, '_auto_tick', None):
+            self.root.after_cancel(self._auto_tick)
+            self._auto_tick = None
+        pool = getattr(self, 'auto_pool', None)
+        if pool is not None and pool.total:
+            report_progress(pool.done, pool.total, pool.last, force=True)
         self.setup_ui_report()
         # Save BMachine result
         summary = [f"Mode: {'Manual' if hasattr(self, 'psd_buttons') else 'Otomatis'}", 
                    f"Total: {len(self.logs)}"] + \
                   [f"{s}: {f} ({d})" for s,f,d in self.logs]
+        # Mode otomatis: folder yang tidak punya template sendiri (pakai induk / fallback)
+        summary += [f"Template {e['rule']}: {e['folder'] or '.'} -> {os.path.basename(e['template'] or '-')}"
+                    for e in getattr(self, 'resolution', []) if e['rule'] != "exact"]
         write_bmachine_result("Laporan PSD Bucin", summary)
 
     def setup_ui_report(self):
@@ -920,11 +1024,10 @@ class BucinAppV3:
         self.ui_root.rowconfigure(1, weight=1)
         self.ui_root.rowconfigure(2, weight=0)
         
-        total = len(self.logs)
-        ok = sum(1 for l in self.logs if l[0] == "OK")
-        skip = sum(1 for l in self.logs if l[0] == "SKIP")
-        fail = sum(1 for l in self.logs if l[0] == "FAIL")
-        exist = sum(1 for l in self.logs if l[0] == "EXIST")
+        # Satu pass: jumlah per status + index filter/cari; Treeview hanya berisi satu halaman
+        self.report_index = ReportIndex(self.logs)
+        counts = self.report_index.counts
+        ok, skip, fail, exist = (counts[s] for s in STATUSES)
         
         # Header
         header = tk.Frame(self.ui_root, bg=COLOR_BG)
@@ -940,6 +1043,26 @@ class BucinAppV3:
         StatCard(cards, "Gagal", fail, COLOR_ACCENT_RED).pack(side="left", fill="x", expand=True, padx=5)
         StatCard(cards, "Sudah Ada", exist, "#60a5fa").pack(side="left", fill="x", expand=True, padx=5)
         
+        # Filter, cari & halaman
+        toolbar = tk.Frame(header, bg=COLOR_BG)
+        toolbar.pack(fill="x", pady=(10, 0))
+        
+        self.report_filter = ttk.Combobox(toolbar, values=("SEMUA",) + STATUSES, state="readonly", width=10, font=FONT_MAIN)
+        self.report_filter.set("SEMUA")
+        self.report_filter.pack(side="left", padx=5)
+        self.report_filter.bind("<<ComboboxSelected>>", lambda e: self.refresh_report())
+        
+        tk.Label(toolbar, text="Cari:", font=FONT_MAIN, bg=COLOR_BG, fg="#a1a1aa").pack(side="left", padx=(10, 5))
+        self.report_search = tk.Entry(toolbar, bg=COLOR_SURFACE, fg=COLOR_FG, insertbackground=COLOR_FG, relief="flat", font=FONT_MAIN)
+        self.report_search.pack(side="left", fill="x", expand=True, ipady=4)
+        self.report_search.bind("<KeyRelease>", self.on_report_search)
+        
+        tk.Button(toolbar, text="▶", command=lambda: self.report_page_step(1), bg=COLOR_SURFACE, fg="white",
+                  relief="flat", padx=10).pack(side="right", padx=(5, 0))
+        self.lbl_report_page = tk.Label(toolbar, text="", font=FONT_MAIN, bg=COLOR_BG, fg="#a1a1aa")
+        self.lbl_report_page.pack(side="right", padx=5)
+        tk.Button(toolbar, text="◀", command=lambda: self.report_page_step(-1), bg=COLOR_SURFACE, fg="white",
+                  relief="flat", padx=10).pack(side="right", padx=(10, 0))
         
         # Details
         tree_frame = tk.Frame(self.ui_root, bg=COLOR_SURFACE)
@@ -971,17 +1094,68 @@ class BucinAppV3:
         tree.tag_configure("FAIL", foreground=COLOR_ACCENT_RED)
         tree.tag_configure("EXIST", foreground="#60a5fa")
         
-        for stat, f, det in self.logs:
-            tree.insert("", "end", values=(stat, f, det), tags=(stat,))
-            
+        self.report_tree = tree
+        self.refresh_report()
             
         # Footer
         footer = tk.Frame(self.ui_root, bg=COLOR_BG)
         footer.grid(row=2, column=0, sticky="ew", padx=40, pady=20)
         
+        for fmt in ("csv", "json"):
+            tk.Button(footer, text=f"EKSPOR {fmt.upper()}", command=lambda f=fmt: self.export_report(f),
+                      bg=COLOR_SURFACE, fg="white", font=FONT_BOLD, relief="flat", padx=20, pady=10).pack(side="left", padx=(0, 10))
+        
         tk.Button(footer, text="KEMBALI KE MENU", command=self.setup_ui_setup, 
                   bg=COLOR_SURFACE, fg="white", font=FONT_BOLD, relief="flat", padx=20, pady=10).pack(side="right")
 
+    def refresh_report(self):
+        status = self.report_filter.get()
+        self.report_rows = self.report_index.query(None if status == "SEMUA" else status,
+                                                   self.report_search.get())
+        self.report_page = 0
+        self.render_report_page()
+
+    def render_report_page(self):
+        tree = self.report_tree
+        tree.delete(*tree.get_children())
+        for stat, f, det in self.report_index.page(self.report_rows, self.report_page):
+            tree.insert("", "end", values=(stat, f, det), tags=(stat,))
+        tree.yview_moveto(0)
+        n = len(self.report_rows)
+        start = self.report_page * PAGE_SIZE
+        self.lbl_report_page.config(text=f"{start + 1 if n else 0}-{min(n, start + PAGE_SIZE)} dari {n}")
+
+    def report_page_step(self, delta):
+        last = max(0, (len(self.report_rows) - 1) // PAGE_SIZE)
+        page = min(last, max(0, self.report_page + delta))
+        if page != self.report_page:
+            self.report_page = page
+            self.render_report_page()
+
+    def on_report_search(self, event=None):
+        # Debounce: filter ulang setelah user berhenti mengetik
+        if getattr(self, '_report_search_job', None):
+            self.root.after_cancel(self._report_search_job)
+        self._report_search_job = self.root.after(DEBOUNCE_MS, self._apply_report_search)
+
+    def _apply_report_search(self):
+        self._report_search_job = None
+        self.refresh_report()
+
+    def export_report(self, fmt):
+        path = filedialog.asksaveasfilename(defaultextension=f".{fmt}", initialfile=f"laporan_psd_bucin.{fmt}",
+                                            filetypes=[(fmt.upper(), f"*.{fmt}")])
+        if not path: return
+        try:
+            # Ekspor sesuai filter/cari yang sedang aktif
+            if fmt == "csv":
+                self.report_index.export_csv(path, self.report_rows)
+            else:
+                self.report_index.export_json(path, self.report_rows)
+            messagebox.showinfo("Ekspor Laporan", f"Laporan disimpan:\n{path}")
+        except Exception as e:
+            messagebox.showerror("Gagal Ekspor", str(e))
+
 class SettingsDialogV3(tk.Toplevel):
     def __init__(self, parent, masters, shortcuts, callback):
         super().__init__(parent, bg=COLOR_BG)
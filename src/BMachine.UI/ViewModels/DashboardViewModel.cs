@@ -985,7 +985,8 @@ public partial class DashboardViewModel : ObservableObject, IRecipient<OpenTextF
         // --- 1. FILTERING (Hide specific logs) ---
         if (line.Contains("Working Directory:") ||
             line.Contains("'config.json' tidak ditemukan") ||
-            line.Contains("Process exited with code"))
+            line.Contains("Process exited with code") ||
+            line.Contains("BENCHMARK_JSON:"))   // Ringkasan benchmark skrip Master: untuk tooling, bukan operator
         {
             return null;
         }
@@ -1004,7 +1005,20 @@ public partial class DashboardViewModel : ObservableObject, IRecipient<OpenTextF
         else if (msg.Contains("Input selected:")) msg = msg.Replace("Input selected:", "Path PILIHAN :");
         else if (msg.Contains("Using Default Output:")) msg = msg.Replace("Using Default Output:", "Output Lokal :");
         else if (msg.Contains("RunPythonProcess called. User:")) msg = msg.Replace("RunPythonProcess called. User:", "Nama User :");
-        
+        else if (msg.StartsWith("FOLDER_READY:"))
+        {
+            // Event dari skrip Master: satu folder output sudah lengkap & siap dibuka editor
+            try
+            {
+                using var doc = System.Text.Json.JsonDocument.Parse(msg.Substring("FOLDER_READY:".Length));
+                var root = doc.RootElement;
+                var folderPath = root.GetProperty("path").GetString() ?? "";
+                var folderName = System.IO.Path.GetFileName(folderPath.TrimEnd('\\', '/'));
+                line = msg = $"[SUCCESS] Folder siap: {folderName} ({root.GetProperty("copied").GetInt32()} file baru)";
+            }
+            catch { /* Tampilkan apa adanya */ }
+        }
+
         var level = LogLevel.Standard; // Default is Standard (White)
         
         // --- 3. DETECT LEVEL ---